@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+变化驱动的自适应采样：先按粗间隔（如 20 km）请求，再只对「两端不同」的区间二分加密，直到最小步长网格上相邻。
+
+等间距 --step 采样后 compress_river_pois.py 会删掉大部分行（连续点地址 / POI 相同），那些请求等于白付配额。
+这里在最小步长网格（即原 --step 的采样点）上按下标工作：
+  第 1 轮：下标 0, k, 2k, …, n-1（k = 粗间隔 / 最小步长）
+  之后每轮：对上一轮留下的区间 (lo, hi)，两端的变化键不同且 hi - lo > 1 时请求中点，拆成 (lo, mid)、(mid, hi)
+两端相同的区间视为整段不变，不再请求；任一端请求失败的区间本轮不拆（记为未决），--resume 重跑时按同样的轮次补上。
+同一轮的点彼此独立，可整批交给 poi_fetcher 并发请求。
+
+前提是区间两端相同则中间也相同；粗间隔内出现「A → B → A」的短暂变化会被漏掉，粗间隔越小越稳妥。
+
+用法:
+  sampler = AdaptiveSampler(len(grid), every=4)
+  while True:
+      batch = sampler.next_round()
+      if not batch:
+          break
+      for i in batch:
+          sampler.record(i, change_key_or_None_if_failed)
+"""
+
+_FAILED = object()
+
+
+class AdaptiveSampler:
+    def __init__(self, n: int, every: int):
+        if every < 1:
+            raise ValueError("every 须不小于 1")
+        self.n = n
+        self.every = every
+        coarse = list(range(0, n, every))
+        if n and coarse[-1] != n - 1:
+            coarse.append(n - 1)
+        self._first = coarse
+        self.intervals = list(zip(coarse, coarse[1:]))
+        self.keys = {}
+        self.rounds = 0
+        # 因端点请求失败而未加密的区间数（累计）
+        self.unresolved = 0
+
+    def record(self, i: int, key):
+        """记录下标 i 的变化键；key 为 None 表示请求失败。"""
+        self.keys[i] = _FAILED if key is None else key
+
+    def next_round(self) -> list[int]:
+        """下一轮需要请求的下标（升序）；空列表表示采样完成。"""
+        if self._first is not None:
+            batch, self._first = self._first, None
+            self.rounds += 1
+            return batch
+        mids, intervals = [], []
+        for lo, hi in self.intervals:
+            if hi - lo < 2:
+                continue
+            a, b = self.keys.get(lo, _FAILED), self.keys.get(hi, _FAILED)
+            if a is _FAILED or b is _FAILED:
+                self.unresolved += 1
+                continue
+            if a == b:
+                continue
+            mid = (lo + hi) // 2
+            mids.append(mid)
+            intervals += [(lo, mid), (mid, hi)]
+        self.intervals = intervals
+        if mids:
+            self.rounds += 1
+        return mids
+
+    @property
+    def requested(self) -> int:
+        return len(self.keys)
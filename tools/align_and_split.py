@@ -1,13 +1,60 @@
 import json
 import os
 import numpy as np
-from pyproj import Geod
 import sys
+import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-def process(master_base, spacing=50):
+from geodesy import GEOD
+from points_binary import binary_path, encode_points as encode_points_binary
+from points_shards import build_shards, index_path, shard_signature, stale_shards
+from river_lod import build_lod, write_lod
+from segment_cache import file_sha256
+from split_state import encode_points, load_state, save_state
+
+CONFIG_PATH = 'assets/json/rivers/rivers_config.json'
+# sections_km 的小数位：1e-3 km 即 1 m
+KM_DECIMALS = 3
+
+def section_boundaries(mapped_km, target_end_km):
+    """
+    每个 sub_section 的收尾点下标：修正里程首次达到该段截止里程的点，且至少比上一段收尾点靠后一个点。
+    返回长度与 target_end_km 相同的数组，>= len(mapped_km) 表示路径走完时该段仍未收尾。
+    """
+    first = np.searchsorted(mapped_km, target_end_km, side='left')
+    # b_j = max(first_j, b_{j-1} + 1)，令 c_j = b_j - j 即为 first_j - j 的前缀最大值
+    j = np.arange(len(first))
+    return np.maximum.accumulate(first - j) + j
+
+
+def section_ranges(n, ends):
+    """
+    各 sub_section 的点下标范围 (start, stop)：第 j 段为 [上一段收尾点, 本段收尾点]，
+    相邻两段共用收尾点以保证衔接平滑；路径走完后尚未开始的段为 None。
+    """
+    ranges = []
+    start = 0
+    for end in ends:
+        ranges.append((start, min(int(end), n - 1) + 1) if start < n else None)
+        start = int(end)
+    return ranges
+
+
+def split_sections(coords, mapped_km, target_end_km):
+    """按修正里程把点切成各 sub_section 的点列表（空段为 []）。"""
+    ranges = section_ranges(len(coords), section_boundaries(mapped_km, target_end_km))
+    return [coords[r[0]:r[1]].tolist() if r else [] for r in ranges]
+
+
+def process(master_base, spacing=50, incremental=True, with_km=False, binary=False, shards=False, lod=False):
     """
     master_base: 配置文件基础名，如 "yangtze" 或 "songhua_river"
+    incremental: 按 tools/out/split_state 中的边界表只重编码边界移动过的段，文件内容没变时不重写
+    with_km: 同时输出每点累计挑战里程 sections_km（默认不输出，点位文件与原格式逐字节相同）
+    binary: 同时输出同名 .bin 二进制点位
+    shards: 同时输出按 sub_section 切片的分片与索引（assets/json/rivers/shards/<base>/）
+    lod: 同时输出多分辨率 LOD 金字塔（assets/json/rivers/lod/<base>_lod.json）
     """
     master_path = f'assets/json/rivers/{master_base}_master.json'
     raw_path_in = f'assets/json/rivers/{master_base}_raw_path_{spacing}m.json'
@@ -35,11 +82,7 @@ def process(master_base, spacing=50):
             all_sub_sections.append(sub)
     
     # 计算每个 sub_section 的累计截止里程
-    acc = 0
-    for sub in all_sub_sections:
-        acc += sub['sub_section_length_km']
-        sub['target_end_km'] = acc
-        sub['points_list'] = [] # 临时存放点位
+    target_end_km = np.cumsum([sub['sub_section_length_km'] for sub in all_sub_sections])
 
     # 2. 加载 Raw GPS 路径
     if not os.path.exists(raw_path_in):
@@ -48,63 +91,177 @@ def process(master_base, spacing=50):
 
     with open(raw_path_in, 'r', encoding='utf-8') as f:
         gps_data = json.load(f)
-    coords = gps_data['coordinates']
-    
-    # 计算真实路径的累计里程
-    geod = Geod(ellps="WGS84")
-    real_dists = [0]
-    for i in range(len(coords)-1):
-        _, _, d = geod.inv(coords[i][0], coords[i][1], coords[i+1][0], coords[i+1][1])
-        real_dists.append(real_dists[-1] + d/1000.0)
-    
+    coords = np.asarray(gps_data['coordinates'], dtype=np.float64)[:, :2]
+
+    # 计算真实路径的累计里程：一次批量 geod.inv，逐步累加（cumsum 顺序求和，与逐点累加结果一致）
+    real_dists = np.zeros(len(coords))
+    if len(coords) > 1:
+        _, _, d = GEOD.inv(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+        np.cumsum(np.asarray(d) / 1000.0, out=real_dists[1:])
+
     # 3. 核心修正系数 (目标长度 / 实际长度)
-    k = target_total_km / real_dists[-1]
-    
+    k = float(target_total_km / real_dists[-1])
+
     # 4. 顺着路径“装填”分段 (按 sub_section)
-    curr_sub_idx = 0
-    for i, p in enumerate(coords):
-        mapped_km = real_dists[i] * k
-        
-        if curr_sub_idx < len(all_sub_sections):
-            all_sub_sections[curr_sub_idx]['points_list'].append([p[0], p[1]])
-            
-            # 越界判定
-            if mapped_km >= all_sub_sections[curr_sub_idx]['target_end_km']:
-                # 保证平滑，下一段开头包含上一段结尾点
-                if curr_sub_idx + 1 < len(all_sub_sections):
-                    all_sub_sections[curr_sub_idx + 1]['points_list'].append([p[0], p[1]])
-                curr_sub_idx += 1
-
-    # 5. 准备输出数据
-    points_data = {
+    mapped_km = real_dists * k
+    ranges = section_ranges(len(coords), section_boundaries(mapped_km, target_end_km))
+
+    # 5. 准备输出数据：sections_km 与 sections_points 逐点对应，为该点的累计挑战里程（已乘修正系数），
+    #    消费方可直接二分查找里程，不必按「段内等间距」反推。边界没动的段沿用上次的原文，只编码变更段
+    header = {
         "river_name": master_data['game_challenge_name'],
         "correction_coefficient": round(k, 6),
-        "sections_points": [sub['points_list'] for sub in all_sub_sections]
     }
+    columns = [("sections_points", coords, "")]
+    if with_km:
+        columns.append(("sections_km", np.round(mapped_km, KM_DECIMALS), f"{k!r}/{KM_DECIMALS}"))
+    raw_sha = file_sha256(raw_path_in)
+    state = load_state(points_out, raw_sha) if incremental else None
+    points_text, column_states, changed = encode_points(header, columns, ranges, state, points_out)
     
     # 更新 master 数据
     master_data['correction_coefficient'] = round(k, 6)
-    master_data['real_path_km'] = round(real_dists[-1], 2)
-    # 移除临时的辅助字段
-    for sub in all_sub_sections:
-        sub.pop('target_end_km', None)
-        sub.pop('points_list', None)
-
-    # 6. 保存文件
-    with open(master_path, 'w', encoding='utf-8') as f:
-        json.dump(master_data, f, ensure_ascii=False, indent=2)
-    
-    with open(points_out, 'w', encoding='utf-8') as f:
-        json.dump(points_data, f, ensure_ascii=False, separators=(',', ':'))
+    master_data['real_path_km'] = round(float(real_dists[-1]), 2)
+
+    # 6. 保存文件（内容没变的不重写，避免无意义的资源改动）
+    master_written = _write_if_changed(master_path, json.dumps(master_data, ensure_ascii=False, indent=2))
+    points_written = _write_if_changed(points_out, points_text)
+    km_tag = columns[1][2] if with_km else None
+    shard_sigs = [shard_signature(header, all_sub_sections[j] if j < len(all_sub_sections) else {}, km_tag)
+                  for j in range(len(ranges))] if shards else None
+    save_state(points_out, raw_sha, points_text, column_states, shard_sigs)
+    section_coords = [coords[r[0]:r[1]] if r else np.zeros((0, 2)) for r in ranges]
+    section_km = None
+    if with_km:
+        km = np.round(mapped_km, KM_DECIMALS)
+        section_km = [km[r[0]:r[1]] if r else np.zeros(0) for r in ranges]
+    if binary:
+        # 同内容的二进制容器（见 points_binary.py），与点位 JSON 同名 .bin
+        bin_data = {**header, "sections_points": section_coords}
+        if with_km:
+            bin_data["sections_km"] = section_km
+        bin_out = binary_path(points_out)
+        bin_written = _write_if_changed(bin_out, encode_points_binary(bin_data))
+    if shards:
+        # 每个 sub_section 一个小分片 + 索引；增量模式下边界没动、签名（km 开关、段 id、头字段）相同且分片已存在的段不重新编码
+        km = np.round(mapped_km, KM_DECIMALS) if with_km else None
+        index, shard_texts = build_shards(master_base, header, coords, km, ranges, all_sub_sections)
+        os.makedirs(os.path.dirname(index_path(master_base)), exist_ok=True)
+        old_sigs = (state or {}).get("shards") or []
+        shards_written = 0
+        for j, (path, text) in enumerate(shard_texts):
+            if (state is not None and j not in changed and j < len(old_sigs) and old_sigs[j] == shard_sigs[j]
+                    and os.path.isfile(path)):
+                continue
+            shards_written += _write_if_changed(path, text())
+        for path in stale_shards(master_base, len(ranges)):
+            os.remove(path)
+        _write_if_changed(index_path(master_base), json.dumps(index, ensure_ascii=False, separators=(',', ':')))
     
     print(f"✅ 处理完成！修正系数: {k:.4f}")
-    print(f"💾 已更新配置: {master_path}")
-    print(f"💾 已生成点位: {points_out}")
+    if state is None:
+        print(f"🔁 全量分割 {len(ranges)} 段")
+    elif changed:
+        print(f"🔁 增量分割：{len(changed)}/{len(ranges)} 段边界变化")
+        for j in changed:
+            name = all_sub_sections[j]['sub_section_name'] if j < len(all_sub_sections) else '(已删除)'
+            print(f"   - #{j} {name}")
+    else:
+        print(f"🔁 增量分割：{len(ranges)} 段边界均未变化")
+    print(f"💾 {'已更新' if master_written else '未变化'}配置: {master_path}")
+    print(f"💾 {'已生成' if points_written else '未变化'}点位: {points_out}")
+    if binary:
+        print(f"💾 {'已生成' if bin_written else '未变化'}二进制点位: {bin_out}")
+    if lod:
+        lod_out = write_lod(master_base, build_lod(header, section_coords))
+        print(f"💾 已生成 LOD 金字塔: {lod_out}")
+    if shards:
+        print(f"💾 分片: 写入 {shards_written}/{len(ranges)} 个，索引 {index_path(master_base)}")
+    return {
+        "points": int(sum(r[1] - r[0] for r in ranges if r)),
+        "sections": len(ranges),
+        "changed": len(changed) if state is not None else len(ranges),
+        "real_path_km": master_data['real_path_km'],
+        "coefficient": round(k, 6),
+    }
+
+
+def _write_if_changed(path, content):
+    """content 为 str 按 UTF-8 文本写，为 bytes 按二进制写；与现有文件相同则不写。"""
+    binary = isinstance(content, bytes)
+    if os.path.isfile(path):
+        with open(path, 'rb') as f:
+            if f.read() == (content if binary else content.encode('utf-8')):
+                return False
+    if binary:
+        with open(path, 'wb') as f:
+            f.write(content)
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+    return True
+
+
+def config_master_bases(config_path=CONFIG_PATH):
+    """rivers_config.json 中每条河的 master 基础名（master_json_path 去掉 _master.json）。"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        rivers = json.load(f).get('rivers') or []
+    bases = []
+    for r in rivers:
+        name = os.path.basename(r['master_json_path'])
+        bases.append(name[:-len('_master.json')] if name.endswith('_master.json') else os.path.splitext(name)[0])
+    return bases
+
+
+def _process_timed(args):
+    master_base, spacing, incremental, with_km, binary, shards, lod = args
+    t0 = time.perf_counter()
+    try:
+        summary = process(master_base, spacing, incremental, with_km, binary, shards, lod)
+        error = None if summary else "缺少输入文件"
+    except Exception as e:
+        summary, error = None, f"{type(e).__name__}: {e}"
+    return master_base, summary, error, time.perf_counter() - t0
+
+
+def process_all(spacing=50, jobs=None, incremental=True, with_km=False, binary=False, shards=False, lod=False):
+    """按 rivers_config.json 并行分割全部河流；单条失败只记录，不影响其他河流。"""
+    bases = config_master_bases()
+    jobs = min(jobs or os.cpu_count() or 1, len(bases)) or 1
+    t0 = time.perf_counter()
+    tasks = [(b, spacing, incremental, with_km, binary, shards, lod) for b in bases]
+    if jobs <= 1:
+        results = [_process_timed(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_process_timed, tasks))
+
+    print(f"\n{'河流':<16}{'状态':<6}{'用时(s)':>9}{'段数':>6}{'变更':>6}{'点数':>10}{'实测(km)':>12}{'修正系数':>10}")
+    for base, summary, error, elapsed in results:
+        if summary:
+            print(f"{base:<16}{'✅':<6}{elapsed:>9.2f}{summary['sections']:>6}{summary['changed']:>6}{summary['points']:>10}"
+                  f"{summary['real_path_km']:>12.2f}{summary['coefficient']:>10.4f}")
+        else:
+            print(f"{base:<16}{'❌':<6}{elapsed:>9.2f}  {error}")
+    failed = [r[0] for r in results if not r[1]]
+    print(f"⏱️ 共 {len(results)} 条，失败 {len(failed)} 条，总用时 {time.perf_counter() - t0:.2f} s")
+    return not failed
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='河流数据分割工具')
-    parser.add_argument('master_base', help='主配置文件基础名，如 "songhua_river"')
+    parser.add_argument('master_base', nargs='?', help='主配置文件基础名，如 "songhua_river"')
     parser.add_argument('--spacing', type=int, default=50, help='插值间隔（米），默认50')
+    parser.add_argument('--all', action='store_true', help='按 rivers_config.json 分割全部河流（多进程）')
+    parser.add_argument('--jobs', type=int, default=None, help='--all 时的并行进程数，默认 CPU 核数')
+    parser.add_argument('--full', action='store_true', help='忽略上次的边界表，全量重新编码')
+    parser.add_argument('--km', action='store_true', help='同时输出每点累计挑战里程 sections_km（约使点位文件增大 40%%）')
+    parser.add_argument('--binary', action='store_true', help='同时输出同名 .bin 二进制点位（见 points_binary.py）')
+    parser.add_argument('--shards', action='store_true', help='同时输出按 sub_section 的分片与索引（见 points_shards.py）')
+    parser.add_argument('--lod', action='store_true', help='同时输出多分辨率 LOD 金字塔（见 river_lod.py）')
     
     args = parser.parse_args()
-    process(args.master_base, args.spacing)
+    if args.all:
+        sys.exit(0 if process_all(args.spacing, args.jobs, not args.full, args.km, args.binary, args.shards, args.lod) else 1)
+    if not args.master_base:
+        parser.error('需要 master_base 或 --all')
+    process(args.master_base, args.spacing, not args.full, args.km, args.binary, args.shards, args.lod)
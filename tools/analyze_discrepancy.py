@@ -1,91 +1,162 @@
+#!/usr/bin/env python3
+"""
+江河里程差距诊断：对 rivers_config.json 中每条河的原始线段做断缝报告。
+
+所有线段端点建一棵 KD 树（endpoint_index.nearest_foreign_endpoints），
+每个端点一次批量查询出最近的「其他线段」端点，O(n log n)，数万段也能秒出：
+  - 最近外段端点超过阈值（默认 1 km）的端点即为未接上的端点（断缝 / 源头 / 入海口 / 支流末梢）
+  - 互为最近的一对未接端点视为合并时会被直线桥接的断缝，
+    按原始线段的整体弯曲系数（线长 / 首尾直线距离）估算桥接丢失的里程
+
+用法（在项目根目录）:
+  python3 tools/analyze_discrepancy.py                  # config 中全部河流
+  python3 tools/analyze_discrepancy.py --river yangtze --threshold-km 0.5 --top 20
+"""
+import argparse
 import json
-import numpy as np
-from pyproj import Geod
 import os
-import glob
-
-KEYWORDS = ['长江', '金沙江', '通天河', '沱沱河', 'part']
-
-def get_line_length(coords):
-    geod = Geod(ellps="WGS84")
-    if len(coords) < 2: return 0
-    _, _, dist = geod.inv([p[0] for p in coords[:-1]], [p[1] for p in coords[:-1]], 
-                          [p[0] for p in coords[1:]], [p[1] for p in coords[1:]])
-    return np.sum(dist)
-
-def extract_segments(f_path):
-    with open(f_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    segments = []
-    # 递归提取
-    def _walk(obj):
-        if isinstance(obj, dict):
-            if obj.get('type') == 'LineString': segments.append(obj['coordinates'])
-            elif obj.get('type') == 'MultiLineString': segments.extend(obj['coordinates'])
-            else:
-                for v in obj.values(): _walk(v)
-        elif isinstance(obj, list):
-            if len(obj) > 0 and isinstance(obj[0], (list, tuple)) and not isinstance(obj[0][0], list):
-                if len(obj) > 1: segments.append(obj)
-            else:
-                for v in obj: _walk(v)
-    _walk(data)
-    return segments
-
-def run_diagnostic():
-    files = []
-    for kw in KEYWORDS:
-        files.extend(glob.glob(f"{kw}*.geojson"))
-        files.extend(glob.glob(f"{kw}*.json"))
-    files = sorted(list(set(files)))
-    
-    print("=== 长江里程差距诊断报告 ===")
-    total_raw_len = 0
-    all_segments = []
-    
-    file_stats = []
-    for f in files:
-        if 'full_50m' in f or 'waterwaymap' in f: continue
-        segs = extract_segments(f)
-        f_len = sum(get_line_length(s) for s in segs)
-        total_raw_len += f_len
-        file_stats.append((f, f_len / 1000))
-        for s in segs:
-            avg_lng = np.mean([p[0] for p in s])
-            all_segments.append({'file': f, 'coords': s, 'len': get_line_length(s), 'lng': avg_lng})
-
-    # 按文件名打印长度
-    for name, length in sorted(file_stats, key=lambda x: x[1], reverse=True):
-        print(f"📄 文件: {name:<15} | 长度: {length:>8.2f} km")
-
-    print(f"\n全部原始片段总和: {total_raw_len/1000:.2f} km")
-    
-    # 查找断缝
-    all_segments.sort(key=lambda x: x['lng'])
-    print("\n--- 关键连接点分析 ---")
-    for i in range(len(all_segments) - 1):
-        s1 = all_segments[i]
-        s2 = all_segments[i+1]
-        
-        # 计算 s1 尾到 s2 头的距离
-        p1 = s1['coords'][-1]
-        p2 = s2['coords'][0]
-        geod = Geod(ellps="WGS84")
-        _, _, gap = geod.inv(p1[0], p1[1], p2[0], p2[1])
-        
-        if gap > 1000: # 超过 1 公里的裂缝
-            print(f"❌ 发现裂缝! {s1['file']} -> {s2['file']}")
-            print(f"   距离: {gap/1000:.2f} km (这段里程在合并时会变为直线，从而丢失)")
-
-    # 检查源头
-    source_p = all_segments[0]['coords'][0]
-    print(f"\n📍 当前数据最西端 (源头): {source_p}")
-    print("   注: 长江正源格拉丹冬约在 91.1°E, 33.4°N。如果你的数据没到这里，说明缺了源头。")
-    
-    # 检查入海口
-    mouth_p = all_segments[-1]['coords'][-1]
-    print(f"📍 当前数据最东端 (入海口): {mouth_p}")
-    print("   注: 长江口约在 121.9°E, 31.5°N。")
+import time
+
+import numpy as np
+
+from endpoint_index import nearest_foreign_endpoints
+from geodesy import distances
+from geojson_stream import find_source_files
+from segment_cache import default_jobs, load_segment_sets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, "assets", "json", "rivers", "rivers_config.json")
+SOURCE_DIR = os.path.join(ROOT, "tools")
+
+# 河流 id -> tools/ 下原始数据文件匹配模式（与 merge_rivers 的 pattern 写法一致）
+RIVER_SOURCES = {
+    "yangtze": "长江|金沙江|通天河|沱沱河|part",
+    "yellow_river": "黄河",
+    "songhua_river": "松花江",
+    "nu_river": "nu_river",
+    "mekong_river": "mekong_river",
+}
+
+
+def load_rivers() -> list[dict]:
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        return json.load(f).get("rivers") or []
+
+
+def gap_report(seg_sets, names, threshold_m: float = 1000.0) -> dict:
+    """
+    seg_sets: 每个源文件一个 SegmentSet；names: 对应文件名。
+    返回统计与未接端点列表（按缺口从大到小）。
+    """
+    starts, stops, seg_file, seg_local, lengths = [], [], [], [], []
+    for fi, segs in enumerate(seg_sets):
+        if len(segs) == 0:
+            continue
+        starts.append(segs.coords[segs.offsets[:-1]])
+        stops.append(segs.coords[segs.offsets[1:] - 1])
+        seg_file.append(np.full(len(segs), fi))
+        seg_local.append(np.arange(len(segs)))
+        lengths.append(segs.lengths)
+    if not starts:
+        return {"segments": 0, "raw_km": 0.0, "unmatched": [], "bridges": 0, "bridge_km": 0.0, "lost_km": 0.0}
+    starts, stops = np.concatenate(starts), np.concatenate(stops)
+    seg_file, seg_local = np.concatenate(seg_file), np.concatenate(seg_local)
+    lengths = np.concatenate(lengths)
+    n = len(lengths)
+    ends = np.empty((2 * n, 2))
+    ends[0::2], ends[1::2] = starts, stops
+
+    dist, nn = nearest_foreign_endpoints(ends)
+    open_rows = np.flatnonzero(dist > threshold_m)
+    open_rows = open_rows[np.argsort(-dist[open_rows], kind="stable")]
+
+    # 互为最近的未接端点对：合并时会被一条直线连起来
+    is_open = np.zeros(2 * n, dtype=bool)
+    is_open[open_rows] = True
+    mutual = open_rows[(nn[open_rows] >= 0) & (nn[nn[open_rows]] == open_rows) & (open_rows < nn[open_rows])]
+    mutual = mutual[is_open[nn[mutual]]]
+    bridged = np.zeros(2 * n, dtype=bool)
+    bridged[mutual] = True
+    bridged[nn[mutual]] = True
+    bridge_m = float(np.sum(dist[mutual]))
+    chord = distances(starts, stops)
+    sinuosity = float(np.sum(lengths) / np.sum(chord)) if np.sum(chord) > 0 else 1.0
+
+    unmatched = []
+    for r in open_rows:
+        seg = int(r // 2)
+        other = int(nn[r])
+        unmatched.append({
+            "file": names[seg_file[seg]],
+            "segment": int(seg_local[seg]),
+            "end": "start" if r % 2 == 0 else "end",
+            "point": np.round(ends[r], 6).tolist(),
+            "gap_km": round(float(dist[r]) / 1000.0, 3) if np.isfinite(dist[r]) else None,
+            "nearest_file": names[seg_file[other // 2]] if other >= 0 else None,
+            "nearest_point": np.round(ends[other], 6).tolist() if other >= 0 else None,
+            "bridged": bool(bridged[r]),
+        })
+    return {
+        "segments": n,
+        "raw_km": round(float(np.sum(lengths)) / 1000.0, 3),
+        "sinuosity": round(sinuosity, 4),
+        "unmatched": unmatched,
+        "bridges": len(mutual),
+        "bridge_km": round(bridge_m / 1000.0, 3),
+        # 直线桥接只覆盖首尾直线距离，真实河道约为其 sinuosity 倍
+        "lost_km": round(bridge_m * (sinuosity - 1.0) / 1000.0, 3),
+    }
+
+
+def run_diagnostic(river_ids=None, threshold_km: float = 1.0, top: int = 10,
+                   use_cache: bool = True, jobs: int | None = None) -> list[dict]:
+    results = []
+    for river in load_rivers():
+        rid = river.get("id")
+        if river_ids and rid not in river_ids:
+            continue
+        pattern = RIVER_SOURCES.get(rid)
+        files = find_source_files(pattern, root=SOURCE_DIR) if pattern else []
+        print(f"\n=== {river.get('name', rid)} ({rid}) 里程差距诊断 ===")
+        if not files:
+            print(f"⚠️ tools/ 下没有 {rid} 的原始数据（匹配模式: {pattern}），跳过")
+            continue
+        t0 = time.perf_counter()
+        seg_sets = load_segment_sets(files, use_cache=use_cache, jobs=jobs)
+        names = [os.path.basename(f) for f in files]
+        for name, segs in sorted(zip(names, seg_sets), key=lambda x: x[1].total_length, reverse=True):
+            print(f"📄 文件: {name:<28} | 线段: {len(segs):>5} | 长度: {segs.total_length / 1000:>9.2f} km")
+
+        r = gap_report(seg_sets, names, threshold_m=threshold_km * 1000.0)
+        elapsed = time.perf_counter() - t0
+        nominal = river.get("total_length_km")
+        print(f"\n全部原始片段总和: {r['raw_km']:.2f} km（config 标称 {nominal} km），共 {r['segments']} 段")
+        print(f"未接端点（最近外段端点 > {threshold_km:g} km）: {len(r['unmatched'])} 个")
+        for u in r["unmatched"][:top]:
+            mark = "🔗" if u["bridged"] else "❌"
+            gap = f"{u['gap_km']:.2f} km" if u["gap_km"] is not None else "无其他线段"
+            print(f"  {mark} {u['file']}#{u['segment']} {u['end']} {u['point']} -> {u['nearest_file']}  缺口 {gap}")
+        if len(r["unmatched"]) > top:
+            print(f"  ... 其余 {len(r['unmatched']) - top} 个见 --report")
+        print(f"直线桥接: {r['bridges']} 处，直线共 {r['bridge_km']:.2f} km；"
+              f"按弯曲系数 {r['sinuosity']:.3f} 估计丢失约 {r['lost_km']:.2f} km")
+        print(f"⏱️ 用时 {elapsed:.3f} s")
+        results.append({"id": rid, "name": river.get("name"), "files": names,
+                        "nominal_km": nominal, "elapsed_s": round(elapsed, 3), **r})
+    return results
+
 
 if __name__ == "__main__":
-    run_diagnostic()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="江河里程差距诊断（端点空间索引断缝报告）")
+    parser.add_argument('--river', action='append', help='只诊断指定河流 id，可重复；默认 config 中全部')
+    parser.add_argument('--threshold-km', type=float, default=1.0, help='最近外段端点超过该距离视为断缝，默认 1')
+    parser.add_argument('--top', type=int, default=10, help='每条河打印的最大断缝数')
+    parser.add_argument('--report', help='完整结果写成 JSON')
+    parser.add_argument('--no-cache', action='store_true', help='不读写线段解析缓存')
+    parser.add_argument('--jobs', type=int, default=default_jobs(), help='并行解析源文件的进程数')
+    args = parser.parse_args()
+    results = run_diagnostic(args.river, args.threshold_km, args.top, use_cache=not args.no_cache, jobs=args.jobs)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 报告: {args.report}")
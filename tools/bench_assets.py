@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+河流几何资源格式基准：对 rivers_config 中每条河，生成全部已支持的几何布局，
+  json      现行 *_points.json
+  binary    points_binary.py 的 .bin
+  polyline  polyline.py 的 Encoded Polyline（精度 6，无损）
+  shards    points_shards.py 的索引 + 每段分片
+  lod       river_lod.py 的 LOD 金字塔（另列各级体积）
+  store     river_store.py 的内存映射 .npy
+逐一测量：
+  体积       原始 / gzip(6) / zstd(3)（需 pip install zstandard，未安装时为 null）；多文件布局按单文件压缩后求和
+  解析耗时   Python 中把整条河读成可用数据的最短耗时（取 --repeat 次最优）
+  峰值 RSS   每种布局在独立子进程中解析，报告峰值与相对导入后基线的增量（MB）
+  随机段访问 从磁盘打开到拿到第 i 段坐标的耗时，随机 --samples 段的 p50 / p95（ms）
+结果写成 JSON 报告，便于在版本之间比较格式选择与回归。
+
+用法（在项目根目录）:
+  python3 tools/bench_assets.py                              # 全部河流，报告写到 tools/out/bench_assets.json（本地文件，不入库）
+  python3 tools/bench_assets.py --river yangtze --repeat 5 --report /tmp/bench.json
+  python3 tools/bench_assets.py --no-rss                     # 跳过子进程峰值 RSS 测量
+"""
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from points_binary import PointsBinary, encode_points
+from points_shards import build_shards, shard_path
+from polyline import _decode_arrays, encode_file
+from river_lod import build_lod
+from river_store import RiverStore, open_points, store_files
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, "assets", "json", "rivers", "rivers_config.json")
+DEFAULT_REPORT = os.path.join(ROOT, "tools", "out", "bench_assets.json")
+
+LAYOUTS = ("json", "binary", "polyline", "shards", "lod", "store")
+
+_SEPARATORS = (",", ":")
+
+
+def _zstd_compress():
+    """返回 bytes -> bytes 的 zstd 压缩函数；未安装 zstandard 时返回 None。"""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard.ZstdCompressor(level=3).compress
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write(path: str, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content if isinstance(content, bytes) else content.encode("utf-8"))
+
+
+def layout_files(layout: str, base: str, work_dir: str) -> list[str]:
+    """某布局在工作目录（store 为其自身目录）下的全部文件。"""
+    if layout == "store":
+        return store_files(base)
+    d = os.path.join(work_dir, layout)
+    return sorted(os.path.join(d, f) for f in os.listdir(d))
+
+
+def write_layouts(base: str, points_path: str, work_dir: str) -> dict:
+    """生成各布局文件到 work_dir/<layout>/，返回 LOD 各级的元数据（体积单列）。"""
+    raw = _read(points_path)
+    data = json.loads(raw)
+    header = {"river_name": data.get("river_name"), "correction_coefficient": data.get("correction_coefficient")}
+    sections = [np.asarray(s, dtype=np.float64).reshape(-1, 2) for s in data["sections_points"]]
+
+    _write(os.path.join(work_dir, "json", os.path.basename(points_path)), raw)
+    _write(os.path.join(work_dir, "binary", f"{base}_points.bin"), encode_points(data))
+    _write(os.path.join(work_dir, "polyline", f"{base}_polyline.json"),
+           json.dumps(encode_file(data), ensure_ascii=False, separators=_SEPARATORS))
+
+    # 分片：各段点首尾相接拼成一条，段范围互不重叠，与点位文件逐段一致
+    counts = np.array([len(s) for s in sections], dtype=np.int64)
+    offsets = np.r_[0, np.cumsum(counts)]
+    coords = np.concatenate(sections) if sections else np.zeros((0, 2))
+    km = None
+    if data.get("sections_km") and [len(s) for s in data["sections_km"]] == counts.tolist():
+        km = np.concatenate([np.asarray(s, dtype=np.float64) for s in data["sections_km"]])
+    ranges = [(int(a), int(b)) if b > a else None for a, b in zip(offsets[:-1], offsets[1:])]
+    index, shards = build_shards(base, header, coords, km, ranges, [])
+    shard_dir = os.path.join(work_dir, "shards")
+    _write(os.path.join(shard_dir, f"{base}_index.json"), json.dumps(index, ensure_ascii=False, separators=_SEPARATORS))
+    for path, text in shards:
+        _write(os.path.join(shard_dir, os.path.basename(path)), text())
+
+    lod = build_lod(header, sections)
+    _write(os.path.join(work_dir, "lod", f"{base}_lod.json"), json.dumps(lod, ensure_ascii=False, separators=_SEPARATORS))
+    levels = []
+    for lv in lod["levels"]:
+        text = json.dumps(lv["sections"], separators=_SEPARATORS).encode("utf-8")
+        levels.append({"resolution_m": lv["resolution_m"], "points": lv["points"],
+                       "bytes": len(text), "gzip_bytes": len(gzip.compress(text, 6))})
+
+    open_points(points_path)
+    return {"points": int(offsets[-1]), "sections": len(sections), "lod_levels": levels}
+
+
+def parse(layout: str, base: str, work_dir: str):
+    """把整条河读成可用数据（各段坐标数组或等价的 Python 结构）。"""
+    files = layout_files(layout, base, work_dir)
+    if layout in ("json", "lod"):
+        return json.loads(_read(files[0]))
+    if layout == "binary":
+        pb = PointsBinary(_read(files[0]))
+        return [pb.section(i) for i in range(len(pb))]
+    if layout == "polyline":
+        return _decode_arrays(json.loads(_read(files[0])))
+    if layout == "shards":
+        return [json.loads(_read(p)) for p in files]
+    # store 为内存映射，打开即可用，按需分页
+    return RiverStore(base)
+
+
+def access(layout: str, base: str, work_dir: str, i: int) -> np.ndarray:
+    """从磁盘打开到拿到第 i 段坐标。"""
+    d = os.path.join(work_dir, layout)
+    if layout == "json":
+        return np.asarray(json.loads(_read(layout_files(layout, base, work_dir)[0]))["sections_points"][i])
+    if layout == "binary":
+        return PointsBinary(_read(os.path.join(d, f"{base}_points.bin")), verify_crc=False).section(i)
+    if layout == "polyline":
+        return _decode_arrays({"sections_polyline": [json.loads(_read(os.path.join(d, f"{base}_polyline.json")))["sections_polyline"][i]]})[0]
+    if layout == "shards":
+        return np.asarray(json.loads(_read(os.path.join(d, os.path.basename(shard_path(base, i)))))["points"])
+    if layout == "lod":
+        # 取最细一级（levels 由细到粗排列）
+        return np.asarray(json.loads(_read(os.path.join(d, f"{base}_lod.json")))["levels"][0]["sections"][i])
+    return np.array(RiverStore(base).section(i))
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _proc_status_mb(key: str) -> float | None:
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Linux：写 5 到 clear_refs 把 VmHWM 重置为当前 RSS，排除导入阶段的峰值。"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _maxrss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+def _child(layout: str, base: str, work_dir: str):
+    """子进程入口：导入后记基线，解析一遍（store 触达全部页）后输出峰值。"""
+    if _reset_peak_rss() and _proc_status_mb("VmHWM") is not None:
+        baseline, peak_fn = _proc_status_mb("VmRSS"), lambda: _proc_status_mb("VmHWM")
+    else:
+        # 无法重置峰值时退回 ru_maxrss，基线含导入阶段的峰值，增量可能偏小
+        baseline, peak_fn = _maxrss_mb(), _maxrss_mb
+    data = parse(layout, base, work_dir)
+    if layout == "store":
+        float(np.asarray(data.coords).sum())
+    peak = peak_fn()
+    print(json.dumps({"baseline_mb": baseline, "peak_mb": peak}))
+
+
+def measure_rss(layout: str, base: str, work_dir: str) -> dict:
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "_child", layout, base, work_dir],
+                         capture_output=True, text=True, check=True)
+    r = json.loads(out.stdout.strip().splitlines()[-1])
+    if r["peak_mb"] is None:
+        return {"peak_rss_mb": None, "rss_delta_mb": None}
+    return {"peak_rss_mb": round(r["peak_mb"], 1), "rss_delta_mb": round(r["peak_mb"] - r["baseline_mb"], 1)}
+
+
+def bench_river(river: dict, work_dir: str, repeat: int, samples: int, rss: bool, zstd) -> dict:
+    points_path = os.path.join(ROOT, *river["points_json_path"].split("/"))
+    base = os.path.basename(points_path).replace("_points.json", "")
+    info = write_layouts(base, points_path, work_dir)
+    rng = random.Random(base)
+    picks = [rng.randrange(info["sections"]) for _ in range(samples)]
+    layouts = {}
+    for layout in LAYOUTS:
+        files = layout_files(layout, base, work_dir)
+        blobs = [_read(p) for p in files]
+        row = {
+            "files": len(files),
+            "bytes": sum(len(b) for b in blobs),
+            "gzip_bytes": sum(len(gzip.compress(b, 6)) for b in blobs),
+            "zstd_bytes": sum(len(zstd(b)) for b in blobs) if zstd else None,
+            "parse_ms": round(_best_of(lambda: parse(layout, base, work_dir), repeat) * 1000, 3),
+        }
+        times = []
+        for i in picks:
+            t0 = time.perf_counter()
+            access(layout, base, work_dir, i)
+            times.append((time.perf_counter() - t0) * 1000)
+        row["access_ms_p50"] = round(float(np.percentile(times, 50)), 3)
+        row["access_ms_p95"] = round(float(np.percentile(times, 95)), 3)
+        if rss:
+            row.update(measure_rss(layout, base, work_dir))
+        layouts[layout] = row
+    return {"river": river.get("id"), "base": base, "points": info["points"], "sections": info["sections"],
+            "layouts": layouts, "lod_levels": info["lod_levels"]}
+
+
+def print_table(result: dict):
+    print(f"\n📊 {result['river']} ({result['points']} 点 / {result['sections']} 段)")
+    print(f"  {'布局':<10}{'文件':>5}{'原始':>10}{'gzip':>10}{'zstd':>10}{'解析':>10}{'访问p50':>10}{'访问p95':>10}{'峰值RSS':>10}{'增量':>8}")
+    for name, r in result["layouts"].items():
+        zstd = f"{r['zstd_bytes'] / 1e6:>9.2f}M" if r["zstd_bytes"] is not None else f"{'-':>10}"
+        rss = (f"{r['peak_rss_mb']:>8.1f}MB{r['rss_delta_mb']:>6.1f}MB"
+               if r.get("peak_rss_mb") is not None else f"{'-':>10}{'-':>8}")
+        print(f"  {name:<10}{r['files']:>5}{r['bytes'] / 1e6:>9.2f}M{r['gzip_bytes'] / 1e6:>9.2f}M{zstd}"
+              f"{r['parse_ms']:>8.2f}ms{r['access_ms_p50']:>8.2f}ms{r['access_ms_p95']:>8.2f}ms{rss}")
+    levels = "，".join(f"{lv['resolution_m']} m {lv['points']} 点 {lv['bytes'] / 1e3:.0f} KB" for lv in result["lod_levels"])
+    print(f"  LOD 各级: {levels}")
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "_child":
+        _child(*sys.argv[2:])
+        return
+    parser = argparse.ArgumentParser(description="河流几何资源格式基准（体积 / 解析 / 峰值 RSS / 随机段访问）")
+    parser.add_argument("--river", action="append", help="河流 id，可多次指定；默认 config 中全部")
+    parser.add_argument("--repeat", type=int, default=3, help="解析耗时取最优的重复次数")
+    parser.add_argument("--samples", type=int, default=50, help="随机段访问次数")
+    parser.add_argument("--no-rss", action="store_true", help="不启动子进程测峰值 RSS")
+    parser.add_argument("--keep-dir", help="各布局文件写到该目录并保留（默认临时目录，结束后删除）")
+    parser.add_argument("--report", default=DEFAULT_REPORT, help="JSON 报告路径")
+    args = parser.parse_args()
+
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        rivers = json.load(f).get("rivers") or []
+    if args.river:
+        rivers = [r for r in rivers if r.get("id") in args.river]
+        if not rivers:
+            parser.error(f"未知河流: {', '.join(args.river)}")
+    zstd = _zstd_compress()
+    if zstd is None:
+        print("ℹ️ 未安装 zstandard，zstd 体积记为 null（pip install zstandard）")
+
+    results = []
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="bench_assets_") as tmp:
+        for river in rivers:
+            work_dir = os.path.join(args.keep_dir or tmp, river["id"])
+            result = bench_river(river, work_dir, args.repeat, args.samples, not args.no_rss, zstd)
+            print_table(result)
+            results.append(result)
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "samples": args.samples,
+        "zstd": zstd is not None,
+        "rivers": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 报告: {args.report}（耗时 {time.perf_counter() - t0:.1f} s）")
+
+
+if __name__ == "__main__":
+    main()
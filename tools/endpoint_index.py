@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+线段端点空间索引：把 [lng, lat] 投影到单位球面三维坐标后建 KD 树（scipy cKDTree），
+弦长与球面距离单调对应，可在 O(log n) 内回答「某点附近最近的线段端点」。
+
+索引只负责筛选候选，最终距离仍按 WGS84 椭球 geod.inv 精算，
+因此与逐段全扫描（merge_rivers 的 greedy 模式）选出的结果完全一致。
+已消费的线段通过 remove() 标记失效，失效过半时自动重建 KD 树。
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+from geodesy import EARTH_RADIUS_M, GEOD as _GEOD, HAVERSINE_MAX_REL_ERROR
+
+# 球面弧长与椭球测地距离最多相差 HAVERSINE_MAX_REL_ERROR，候选半径放宽到其近两倍即可不漏
+_ELLIPSOID_SLACK = 1.0 + 2 * HAVERSINE_MAX_REL_ERROR
+
+START, END = 0, 1
+
+
+def lnglat_to_xyz(coords) -> np.ndarray:
+    """[[lng, lat], ...] -> 单位球面 (N, 3) 坐标。"""
+    a = np.radians(np.asarray(coords, dtype=np.float64).reshape(-1, 2))
+    lng, lat = a[:, 0], a[:, 1]
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def chord_for_distance(dist_m: float) -> float:
+    """地表距离（米）对应的单位球弦长上界，用作 KD 树查询半径。"""
+    angle = min(dist_m * _ELLIPSOID_SLACK / EARTH_RADIUS_M, np.pi)
+    return 2.0 * np.sin(angle / 2.0)
+
+
+class SegmentEndpointIndex:
+    """
+    segments: [[[lng, lat], ...], ...]，每段取首尾两个端点入索引。
+    返回的 (seg_idx, end) 中 seg_idx 为传入列表下标，end 为 START / END。
+    """
+
+    def __init__(self, segments):
+        n = len(segments)
+        ends = np.empty((2 * n, 2), dtype=np.float64)
+        for i, s in enumerate(segments):
+            ends[2 * i] = s[0][:2]
+            ends[2 * i + 1] = s[-1][:2]
+        self._ends = ends
+        self._active = np.ones(n, dtype=bool)
+        self._n_active = n
+        self._build()
+
+    def __len__(self):
+        return self._n_active
+
+    def _build(self):
+        # 只对仍有效的端点建树，_rows 记录树内行号 -> 端点全局行号 (2*seg_idx + end)
+        self._rows = np.flatnonzero(np.repeat(self._active, 2))
+        self._tree = cKDTree(lnglat_to_xyz(self._ends[self._rows])) if len(self._rows) else None
+
+    def remove(self, seg_idx: int):
+        if not self._active[seg_idx]:
+            return
+        self._active[seg_idx] = False
+        self._n_active -= 1
+        if self._n_active * 2 * 2 <= len(self._rows):
+            self._build()
+
+    def _nearest_active_row(self, xyz, max_chord):
+        """按弦长找最近的有效端点行号，找不到返回 None。k 逐步翻倍以跳过已失效端点。"""
+        k = 8
+        total = len(self._rows)
+        while True:
+            k = min(k, total)
+            dists, idx = self._tree.query(xyz, k=k, distance_upper_bound=max_chord)
+            dists, idx = np.atleast_1d(dists), np.atleast_1d(idx)
+            for d, i in zip(dists, idx):
+                if not np.isfinite(d):
+                    return None
+                row = self._rows[i]
+                if self._active[row // 2]:
+                    return row
+            if k >= total:
+                return None
+            k *= 2
+
+    def nearest(self, point, max_dist_m: float) -> list[tuple[float, int, int]]:
+        """
+        返回距 point 测地距离最近的有效端点候选 [(dist_m, seg_idx, end), ...]（均 < max_dist_m）。
+        与最近距离相等或因椭球/球面差异可能更近的端点都会返回，由调用方按自身规则决胜。
+        """
+        if self._tree is None or self._n_active == 0:
+            return []
+        xyz = lnglat_to_xyz([point[:2]])[0]
+        row = self._nearest_active_row(xyz, chord_for_distance(max_dist_m))
+        if row is None:
+            return []
+        lng, lat = self._ends[row]
+        _, _, d_first = _GEOD.inv(point[0], point[1], lng, lat)
+        radius = chord_for_distance(min(d_first, max_dist_m))
+        rows = self._rows[self._tree.query_ball_point(xyz, radius)]
+        rows = rows[self._active[rows // 2]]
+        if len(rows) == 0:
+            rows = np.array([row])
+        pts = self._ends[rows]
+        n = len(rows)
+        _, _, dists = _GEOD.inv(np.full(n, point[0]), np.full(n, point[1]), pts[:, 0], pts[:, 1])
+        dists = np.atleast_1d(dists)
+        return [(float(d), int(r // 2), int(r % 2)) for d, r in zip(dists, rows) if d < max_dist_m]
+
+
+def nearest_foreign_endpoints(ends) -> tuple[np.ndarray, np.ndarray]:
+    """
+    ends: (2n, 2) 端点数组，行 2*i / 2*i+1 为第 i 段起点 / 终点（与 SegmentEndpointIndex 同布局）。
+    一次建树、批量查询，为每个端点找属于其他线段的最近端点，总代价 O(n log n)。
+    返回 (dist_m, row)：row 为最近外段端点的行号（无其他线段时为 -1、距离为 inf），
+    候选按球面弦长选出，距离按 WGS84 椭球精算。
+    """
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+    total = len(ends)
+    row = np.full(total, -1, dtype=np.int64)
+    dist = np.full(total, np.inf)
+    if total == 0:
+        return dist, row
+    tree = cKDTree(lnglat_to_xyz(ends))
+    xyz = tree.data
+    pending = np.arange(total)
+    k = 4
+    while len(pending):
+        k = min(k, total)
+        _, idx = tree.query(xyz[pending], k=k)
+        idx = idx.reshape(len(pending), k)
+        # 同一线段的两个端点（含自身）不算；多条线段交汇于一点时 k 逐步翻倍
+        foreign = (idx < total) & (idx // 2 != (pending // 2)[:, None])
+        found = foreign.any(axis=1)
+        first = np.argmax(foreign, axis=1)
+        row[pending[found]] = idx[found, first[found]]
+        if k >= total:
+            break
+        pending = pending[~found]
+        k *= 2
+    ok = row >= 0
+    if ok.any():
+        a, b = ends[ok], ends[row[ok]]
+        _, _, d = _GEOD.inv(a[:, 0], a[:, 1], b[:, 0], b[:, 1])
+        dist[ok] = np.atleast_1d(d)
+    return dist, row
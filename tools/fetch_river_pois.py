@@ -8,34 +8,40 @@
 用法:
   python3 fetch_river_pois.py --river yangtze --step 5 --key YOUR_AMAP_KEY
   python3 fetch_river_pois.py --river yangtze --step 5 --key YOUR_KEY --from 0 --to 2
+  python3 fetch_river_pois.py --river yangtze --step 5 --key YOUR_KEY --qps 3 --concurrency 6
+  python3 fetch_river_pois.py --river yangtze --step 5 --key YOUR_KEY --resume
+  python3 fetch_river_pois.py --river yangtze --step 1 --adaptive 20 --key YOUR_KEY
 
 参数:
   --key    高德 Web 服务 Key（必填）
   --river  河流 id（与 config 中 id 一致），如 yangtze / yellow_river / songhua_river
-  --step   采样间隔（公里），默认 5
+  --step   采样间隔（公里），默认 5；加 --adaptive 时为最小步长
+  --adaptive  自适应采样的粗间隔（公里）：先按该间隔请求，只对两端乡镇 / 区县 / POI 集合不同的区间二分加密，
+           结果与「--step 等间距全采再 compress」基本一致，请求数只是其一小部分
   --from / --to  采样段起止索引（含）
-  --delay  请求间隔秒数，默认 0.3
+  --delay  请求间隔秒数，默认 0.3（未指定 --qps 时按 1/delay 限速）
+  --qps    每秒请求数上限，按 Key 的实际配额填写
+  --concurrency  同时在途请求数，默认 4；结果仍按里程顺序写库
+  --pool-size / --timeout  每个主机的 keep-alive 连接数（默认同并发数）与单次请求超时
+  --no-cache / --cache-grid / --cache-ttl-days  本地响应缓存（tools/out/cache/geocode.db）：换 --step/--from/--to/--out 重跑时
+           已请求过的坐标直接由缓存重建，不联网、不占配额
   --out    输出 DB 路径
+  --resume 只补采任务表（poi_jobs）中 pending / failed 的点；中断或超配额后原命令加 --resume 重跑即可
   --points / --master  可选，覆盖 config 中的 JSON 路径
 """
 
 import argparse
 import json
 import os
-import ssl
 import sqlite3
-import time
 import urllib.parse
-import urllib.request
 
-# macOS 上 Python 常因证书链不完整导致 HTTPS 报 CERTIFICATE_VERIFY_FAILED
-def _http_context():
-    try:
-        import certifi
-        return ssl.create_default_context(cafile=certifi.where())
-    except ImportError:
-        # 未安装 certifi 时用未验证上下文，仅建议本地脚本使用；生产环境建议: pip install certifi
-        return ssl._create_unverified_context()
+from geocode_cache import add_cache_args, configure_from_args as configure_cache, get_cache
+from http_client import add_http_args, configure_from_args, get_client
+import poi_jobs
+from adaptive_sampler import AdaptiveSampler
+from poi_fetcher import FetchError, add_rate_args, fetch_ordered, resolve_qps
+from river_store import open_points
 
 # 项目根目录（脚本在 tools/ 下）
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -77,27 +83,14 @@ def load_master_section_lengths(master_path: str) -> list[tuple[float, float]]:
 
 
 def load_points_with_distance_km(points_path: str, section_lengths: list[tuple[float, float]]) -> list[tuple[float, float, float]]:
-    """返回 [(lat, lon, distance_km), ...]，按路径顺序。section_lengths 每项为 (section_length_km, accumulated_length_km)，accumulated 为该段终点累计里程。"""
-    with open(points_path, "r", encoding="utf-8") as f:
-        p = json.load(f)
-    sections = p["sections_points"]
-    if len(sections) != len(section_lengths):
-        raise ValueError(f"sections_points 数量 {len(sections)} 与 master 中 sub_sections 数量 {len(section_lengths)} 不一致")
-    out = []
-    for i, section in enumerate(sections):
-        sec_len, acc_end = section_lengths[i]
-        acc_start = 0.0 if i == 0 else section_lengths[i - 1][1]
-        n = len(section)
-        for j, pt in enumerate(section):
-            lng = float(pt[0])
-            lat = float(pt[1])
-            if n <= 1:
-                dist = acc_start
-            else:
-                ratio = j / (n - 1)
-                dist = acc_start + ratio * sec_len
-            out.append((lat, lng, dist))
-    return out
+    """
+    返回 [(lat, lon, distance_km), ...]，按路径顺序。section_lengths 每项为 (section_length_km, accumulated_length_km)，accumulated 为该段终点累计里程。
+    点位文件带 sections_km（align_and_split 输出的逐点累计挑战里程）时直接使用；否则按段内等间距反推。
+    坐标经 river_store 内存映射读取（首次自动构建，之后不再解析整份 JSON）。
+    """
+    store = open_points(points_path)
+    coords = store.coords
+    return list(zip(coords[:, 1].tolist(), coords[:, 0].tolist(), store.distance_km(section_lengths).tolist()))
 
 
 def sample_by_km(points: list[tuple[float, float, float]], step_km: float) -> list[tuple[float, float, float]]:
@@ -130,29 +123,54 @@ def sample_by_km(points: list[tuple[float, float, float]], step_km: float) -> li
     return sampled
 
 
-def _reverse_geocode_amap(lat: float, lon: float, key: str) -> dict | None:
-    """高德逆地理 extensions=all，返回与表列一一对应的平铺字典（无 JSON 列）。"""
+AMAP_PROVIDER = "amap_regeo"
+JOB_SOURCE = "amap"
+# 影响响应内容的请求参数（不含 Key 与坐标），同时作为缓存键的一部分
+AMAP_PARAMS = {"extensions": "all", "radius": 1000}
+
+
+def _amap_from_cache(lat: float, lon: float) -> dict | None:
+    """只查本地响应缓存：命中时由缓存的原始响应重建整行，不联网；未命中返回 None。"""
+    body = get_cache().get(AMAP_PROVIDER, lat, lon, AMAP_PARAMS)
+    return None if body is None else _parse_amap_regeo(json.loads(body)["regeocode"])
+
+
+def _reverse_geocode_amap(lat: float, lon: float, key: str, cached: bool = True) -> dict:
+    """
+    高德逆地理 extensions=all，返回与表列一一对应的平铺字典（无 JSON 列）；失败抛 FetchError（原因记入任务表）。
+    cached=False 时跳过缓存读取（调用方已查过）。
+    """
+    if cached:
+        out = _amap_from_cache(lat, lon)
+        if out is not None:
+            return out
     location = f"{lon},{lat}"
-    url = f"https://restapi.amap.com/v3/geocode/regeo?key={urllib.parse.quote(key)}&location={location}&extensions=all&radius=1000"
+    url = f"https://restapi.amap.com/v3/geocode/regeo?key={urllib.parse.quote(key)}&location={location}&" + urllib.parse.urlencode(AMAP_PARAMS)
     try:
-        req = urllib.request.Request(url, headers={"User-Agent": "RivtrekPOI/1.0"})
-        with urllib.request.urlopen(req, timeout=15, context=_http_context()) as resp:
-            data = json.loads(resp.read().decode())
+        # 共享客户端：SSL 上下文只建一次，同一主机的 keep-alive 连接复用
+        body = get_client().get(url).body
+        data = json.loads(body.decode("utf-8"))
     except Exception as e:
         msg = str(e)
         print(f"  [WARN] amap request failed for ({lat}, {lon}): {e}")
         if "CERTIFICATE_VERIFY_FAILED" in msg or "SSL" in msg:
             print("  若遇 SSL 证书错误，可执行: pip install certifi")
-        return None
+        raise FetchError(f"请求失败: {e}") from e
     status = data.get("status")
     info = data.get("info", "")
     if status != "1":
         print(f"  [WARN] 高德返回异常 status={status!r} info={info!r} → 请检查 Key 是否有效、是否超出日配额、控制台是否勾选「Web 服务」")
-        return None
+        raise FetchError(f"status={status} info={info}")
     if "regeocode" not in data or not data["regeocode"]:
         print(f"  [WARN] 高德无 regeocode status={status!r} info={info!r}")
-        return None
-    r = data["regeocode"]
+        raise FetchError(f"无 regeocode status={status} info={info}")
+    # 只缓存成功的响应；失败（超配额、Key 无效等）下次照常重试
+    get_cache().put(AMAP_PROVIDER, lat, lon, AMAP_PARAMS, body)
+    return _parse_amap_regeo(data["regeocode"])
+
+
+def _parse_amap_regeo(r: dict) -> dict:
+    """regeocode 对象 → 平铺字典；网络响应与缓存响应走同一解析。"""
     out = {"formatted_address": r.get("formatted_address")}
     ac = r.get("addressComponent")
     if isinstance(ac, dict):
@@ -213,6 +231,24 @@ def _scalar(v):
     return v
 
 
+def _change_key(result) -> tuple | None:
+    """自适应采样比较区间两端用：区县 + 乡镇 + 周边 POI 集合（按 id，不看随坐标变化的距离）；失败返回 None。"""
+    if result is None or isinstance(result, Exception):
+        return None
+    pois = json.loads(result["pois_json"]) if result.get("pois_json") else []
+    return (_scalar(result.get("district")), _scalar(result.get("township")),
+            frozenset(p.get("id") or p.get("name") for p in pois))
+
+
+def _stored_result(conn, numeric_id: int, distance_km: float) -> dict | None:
+    """river_pois 中已有的一行（--resume 跳过的点），字段名与 _reverse_geocode_amap 的结果一致。"""
+    row = conn.execute(
+        "SELECT district, township, pois_json FROM river_pois WHERE numeric_id=? AND distance_km=?",
+        (numeric_id, distance_km),
+    ).fetchone()
+    return None if row is None else {"district": row[0], "township": row[1], "pois_json": row[2]}
+
+
 def main():
     parser = argparse.ArgumentParser(description="采集河流路径 POI 写入 SQLite（高德逆地理→表列直接映射）")
     parser.add_argument("--key", required=True, help="高德 Web 服务 Key")
@@ -220,11 +256,20 @@ def main():
     parser.add_argument("--step", type=float, default=5.0, help="采样间隔(km)")
     parser.add_argument("--from", dest="from_index", type=int, default=0, help="采样段起点(含)")
     parser.add_argument("--to", dest="to_index", type=int, default=None, help="采样段终点(含)，不填表示到末尾")
-    parser.add_argument("--delay", type=float, default=0.3, help="请求间隔(秒)")
+    parser.add_argument("--delay", type=float, default=0.3, help="请求间隔(秒)；未指定 --qps 时按 1/delay 限速")
     parser.add_argument("--out", default=None, help="输出 db 路径")
     parser.add_argument("--points", default=None, help="覆盖 config 中的 points JSON 路径")
     parser.add_argument("--master", default=None, help="覆盖 config 中的 master JSON 路径")
+    parser.add_argument("--resume", action="store_true", help="只请求任务表中未完成（pending / failed）的点")
+    parser.add_argument("--adaptive", type=float, default=None, metavar="KM",
+                        help="自适应采样的粗间隔(km)，如 20：只在乡镇 / 区县 / POI 集合变化处二分加密到 --step")
+    add_rate_args(parser)
+    add_http_args(parser)
+    add_cache_args(parser)
     args = parser.parse_args()
+    qps = resolve_qps(args)
+    client = configure_from_args(args, default_pool_size=args.concurrency)
+    cache = configure_cache(args)
 
     rivers = load_rivers_config()
     river_cfg = get_river_by_id(rivers, args.river)
@@ -255,15 +300,10 @@ def main():
     else:
         to_i = len(full_sampled)
     sampled = full_sampled[from_i:to_i]
-    print(f"  高德逆地理  按 {args.step} km 采样共 {len(full_sampled)} 个点；本次第 {from_i}～{to_i - 1} 个，共 {len(sampled)} 次请求")
-
-    if sampled:
-        lat0, lon0, _ = sampled[0]
-        probe = _reverse_geocode_amap(lat0, lon0, args.key)
-        if probe is None:
-            print("  [提示] 首点逆地理返回空，后续请求可能均为空。请检查 Key、配额与「Web 服务」权限。")
-        else:
-            print(f"  首点探路成功: {probe.get('formatted_address') or '(无地址)'}")
+    if args.adaptive:
+        print(f"  高德逆地理  自适应：粗间隔 {args.adaptive:g} km，最小步长 {args.step} km 网格共 {len(full_sampled)} 个点；本次第 {from_i}～{to_i - 1} 个（{len(sampled)} 个）")
+    else:
+        print(f"  高德逆地理  按 {args.step} km 采样共 {len(full_sampled)} 个点；本次第 {from_i}～{to_i - 1} 个，共 {len(sampled)} 次请求")
 
     river_slug = river_cfg["id"]  # 字符型 id，如 yangtze
     cols = (
@@ -293,15 +333,21 @@ def main():
     """)
         conn.commit()
 
+    # 任务表：登记本次计划的每个点；--resume 只请求上次未完成（pending / failed）的点
+    poi_jobs.ensure_table(conn)
+    planned = [(lat, lon, round(dist_km, 2)) for lat, lon, dist_km in sampled]
+
     placeholders = ",".join(["?"] * len(cols))
     insert = f"INSERT OR REPLACE INTO river_pois ({','.join(cols)}) VALUES ({placeholders})"
-    for i, (lat, lon, dist_km) in enumerate(sampled):
-        if i > 0:
-            time.sleep(args.delay)
-        result = _reverse_geocode_amap(lat, lon, args.key)
-        d = round(dist_km, 2)
-        if result is None:
-            row = (numeric_id, river_slug, d, lat, lon) + (None,) * (len(cols) - 5)
+    state = {"probed": False, "todo": 0, "planned": []}
+    totals = {"requests": 0, "cached": 0, "elapsed_s": 0.0}
+    results = {}  # distance_km -> 结果或异常，自适应采样据此比较区间两端
+
+    def write(i, item, result):
+        lat, lon, d = item
+        if isinstance(result, Exception):
+            # 失败不写空行（与「此处无地址」区分开），只记入任务表，--resume 时重试
+            poi_jobs.mark(conn, numeric_id, JOB_SOURCE, d, poi_jobs.FAILED, str(result))
         else:
             row = (
                 numeric_id, river_slug, d, lat, lon,
@@ -309,13 +355,84 @@ def main():
                 _scalar(result.get("district")), _scalar(result.get("adcode")), _scalar(result.get("township")), _scalar(result.get("towncode")),
                 result.get("pois_json"),
             )
-        conn.execute(insert, row)
+            conn.execute(insert, row)
+            has_data = _scalar(result.get("formatted_address")) or result.get("pois_json")
+            poi_jobs.mark(conn, numeric_id, JOB_SOURCE, d, poi_jobs.OK if has_data else poi_jobs.EMPTY)
+        results[d] = result
         if (i + 1) % 100 == 0:
             conn.commit()
-            print(f"  已请求 {i + 1}/{len(sampled)}")
+            print(f"  已请求 {i + 1}/{state['todo']}")
+
+    def fetch_points(items):
+        """登记并请求一批点，按顺序写库；整次运行的第一个待请求点先单独探路。"""
+        todo = poi_jobs.plan(conn, numeric_id, JOB_SOURCE, items, resume=args.resume)
+        state["planned"] += items
+        state["todo"] = len(todo)
+        if args.resume and len(todo) < len(items):
+            print(f"  --resume: 已完成 {len(items) - len(todo)} 个，待请求 {len(todo)} 个")
+        first = 0
+        if todo and not state["probed"]:
+            state["probed"] = True
+            lat0, lon0, _ = todo[0]
+            try:
+                probe = _reverse_geocode_amap(lat0, lon0, args.key)
+                print(f"  首点探路成功: {probe.get('formatted_address') or '(无地址)'}")
+            except FetchError as e:
+                probe = e
+                print("  [提示] 首点逆地理失败，后续请求可能均失败。请检查 Key、配额与「Web 服务」权限。")
+            write(0, todo[0], probe)
+            first = 1
+        # 其余交给并发引擎：令牌桶按 --qps 放行、--concurrency 个请求在途，结果按顺序回调写库
+        stats = fetch_ordered(
+            todo[first:],
+            lambda item: _reverse_geocode_amap(item[0], item[1], args.key, cached=False),
+            lambda i, item, result: write(i + first, item, result),
+            qps=qps, concurrency=args.concurrency, burst=args.burst,
+            lookup=lambda item: _amap_from_cache(item[0], item[1]),
+        )
+        for k in totals:
+            totals[k] += stats[k]
+
+    def known_result(item):
+        """本次拿到的结果；--resume 跳过的已完成点从 river_pois 读回。"""
+        d = item[2]
+        return results[d] if d in results else _stored_result(conn, numeric_id, d)
+
+    print(f"  并发请求: {qps:g} QPS，在途 {args.concurrency}")
+    try:
+        if args.adaptive:
+            # 自适应：先按粗间隔请求，再只对两端乡镇 / 区县 / POI 集合不同的区间二分，直到 --step 网格上相邻
+            sampler = AdaptiveSampler(len(planned), every=max(1, round(args.adaptive / args.step)))
+            while True:
+                batch = sampler.next_round()
+                if not batch:
+                    break
+                print(f"  第 {sampler.rounds} 轮: {len(batch)} 个点")
+                fetch_points([planned[i] for i in batch])
+                conn.commit()
+                for i in batch:
+                    sampler.record(i, _change_key(known_result(planned[i])))
+        else:
+            fetch_points(planned)
+    finally:
+        # 中途 Ctrl-C 也把已拿到的结果与任务状态落盘，未提交的点仍为 pending
+        conn.commit()
+    qps_real = totals["requests"] / totals["elapsed_s"] if totals["elapsed_s"] > 0 else 0.0
+    print(f"  请求 {totals['requests']} 次（缓存命中 {totals['cached']}），用时 {totals['elapsed_s']:.1f} s（实际 {qps_real:.2f} QPS）")
+    if args.adaptive:
+        pct = sampler.requested / len(planned) * 100 if planned else 0.0
+        print(f"  🎯 自适应采样 {sampler.rounds} 轮：采样 {sampler.requested} 个点，等间距 {args.step:g} km 需 {len(planned)} 个（{pct:.0f}%）")
+        if sampler.unresolved:
+            print(f"  ⚠️ {sampler.unresolved} 个区间因端点请求失败未加密，原命令加 --resume 重跑补齐")
+    print(client.format_stats())
+    print(cache.format_stats())
+    counts = poi_jobs.summary(conn, numeric_id, JOB_SOURCE, state["planned"])
+    print(poi_jobs.format_summary(counts))
 
-    conn.commit()
     conn.close()
+    if poi_jobs.unfinished(counts):
+        # 失败点不写空行，非零退出让调用方知道这份 DB 还不能直接发布
+        raise SystemExit(f"❌ SQLite 已写入但有缺口（{poi_jobs.unfinished(counts)} 个点缺失）: {out_path}")
     print(f"完成。SQLite 已写入: {out_path}")
 
 
@@ -8,34 +8,35 @@
 用法:
   python3 fetch_river_pois_overseas.py --river mekong --step 5 --geoapify-key YOUR_GEOAPIFY_KEY
   python3 fetch_river_pois_overseas.py --river salween --step 5 --geoapify-key YOUR_KEY --from 0 --to 2
+  python3 fetch_river_pois_overseas.py --river mekong --step 5 --geoapify-key YOUR_KEY --qps 5 --concurrency 8
 
 参数:
   --geoapify-key    Geoapify API Key（必填，免费申请: https://www.geoapify.com/）
   --river           河流 id（与 config 中 id 一致），如 mekong / salween
   --step            采样间隔（公里），默认 5
   --from / --to     采样段起止索引（含）
-  --delay           请求间隔秒数，默认 0.3
+  --delay           请求间隔秒数，默认 0.3（未指定 --qps 时按 1/delay 限速）
+  --qps             每秒请求数上限，按 Geoapify 套餐的实际配额填写
+  --concurrency     同时在途请求数，默认 4；结果仍按里程顺序写库
+  --pool-size / --timeout  每个主机的 keep-alive 连接数（默认同并发数）与单次请求超时
+  --no-cache / --cache-grid / --cache-ttl-days  本地响应缓存（tools/out/cache/geocode.db），已请求过的坐标不再联网
   --out             输出 DB 路径
+  --resume          只补采任务表（poi_jobs）中 pending / failed 的点；中断或超配额后原命令加 --resume 重跑即可
   --points / --master  可选，覆盖 config 中的 JSON 路径
 """
 
 import argparse
 import json
 import os
-import ssl
 import sqlite3
-import time
 import urllib.parse
-import urllib.request
 from typing import Dict, List, Tuple, Optional
 
-# macOS 证书兼容
-def _http_context():
-    try:
-        import certifi
-        return ssl.create_default_context(cafile=certifi.where())
-    except ImportError:
-        return ssl._create_unverified_context()
+from geocode_cache import add_cache_args, configure_from_args as configure_cache, get_cache
+from http_client import HttpError, add_http_args, configure_from_args, get_client
+import poi_jobs
+from poi_fetcher import FetchError, add_rate_args, fetch_ordered, resolve_qps
+from river_store import open_points
 
 # 项目根目录（与原脚本保持一致）
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -79,26 +80,10 @@ def load_master_section_lengths(master_path: str) -> list[tuple[float, float]]:
     return rows
 
 def load_points_with_distance_km(points_path: str, section_lengths: list[tuple[float, float]]) -> list[tuple[float, float, float]]:
-    with open(points_path, "r", encoding="utf-8") as f:
-        p = json.load(f)
-    sections = p["sections_points"]
-    if len(sections) != len(section_lengths):
-        raise ValueError(f"sections_points 数量 {len(sections)} 与 master 中 sub_sections 数量 {len(section_lengths)} 不一致")
-    out = []
-    for i, section in enumerate(sections):
-        sec_len, acc_end = section_lengths[i]
-        acc_start = 0.0 if i == 0 else section_lengths[i - 1][1]
-        n = len(section)
-        for j, pt in enumerate(section):
-            lng = float(pt[0])
-            lat = float(pt[1])
-            if n <= 1:
-                dist = acc_start
-            else:
-                ratio = j / (n - 1)
-                dist = acc_start + ratio * sec_len
-            out.append((lat, lng, dist))
-    return out
+    # 坐标经 river_store 内存映射读取；有逐点累计里程 sections_km 时直接使用，不再按段内等间距反推
+    store = open_points(points_path)
+    coords = store.coords
+    return list(zip(coords[:, 1].tolist(), coords[:, 0].tolist(), store.distance_km(section_lengths).tolist()))
 
 def sample_by_km(points: list[tuple[float, float, float]], step_km: float) -> list[tuple[float, float, float]]:
     if not points:
@@ -146,10 +131,34 @@ def _scalar(v):
     return v
 
 # -------------------------- 校正后的海外逆地理/POI核心逻辑 --------------------------
-def _reverse_geocode_geoapify(lat: float, lon: float, api_key: str) -> Dict | None:
+GEOAPIFY_PROVIDER = "geoapify_reverse"
+JOB_SOURCE = "geoapify"
+# 影响响应内容的请求参数（不含 apiKey 与坐标），同时作为缓存键的一部分
+GEOAPIFY_PARAMS = {
+    "format": "json",
+    "include": "pois",          # 核心：同时返回POI
+    "pois_radius": 1000,        # POI搜索半径（米）
+    "pois_limit": 20,           # 最多返回20个POI
+    "pois_categories": "tourism,commercial,amenity,transport,natural"  # POI类型
+}
+
+
+def _geoapify_from_cache(lat: float, lon: float) -> Dict | None:
+    """只查本地响应缓存：命中时由缓存的原始响应重建整行，不联网；未命中返回 None。"""
+    body = get_cache().get(GEOAPIFY_PROVIDER, lat, lon, GEOAPIFY_PARAMS)
+    return None if body is None else _parse_geoapify(json.loads(body), lat, lon)
+
+
+def _reverse_geocode_geoapify(lat: float, lon: float, api_key: str, cached: bool = True) -> Dict:
     """
-    终极版：单次请求获取地址+POI（只算1次配额），解决超限问题
+    终极版：单次请求获取地址+POI（只算1次配额），解决超限问题；先查本地响应缓存，cached=False 时跳过（调用方已查过）
+    失败抛 FetchError（原因记入任务表）
     """
+    if cached:
+        out = _geoapify_from_cache(lat, lon)
+        if out is not None:
+            return out
+
     # 1. 格式化经纬度
     lat_str = f"{lat:.6f}"
     lon_str = f"{lon:.6f}"
@@ -159,11 +168,7 @@ def _reverse_geocode_geoapify(lat: float, lon: float, api_key: str) -> Dict | No
         "lat": lat_str,
         "lon": lon_str,
         "apiKey": api_key,
-        "format": "json",
-        "include": "pois",          # 核心：同时返回POI
-        "pois_radius": 1000,        # POI搜索半径（米）
-        "pois_limit": 20,           # 最多返回20个POI
-        "pois_categories": "tourism,commercial,amenity,transport,natural"  # POI类型
+        **GEOAPIFY_PARAMS,
     })
     # 只用这1个URL，同时获取地址+POI，只算1次请求！
     request_url = f"https://api.geoapify.com/v1/geocode/reverse?{params}"
@@ -176,22 +181,30 @@ def _reverse_geocode_geoapify(lat: float, lon: float, api_key: str) -> Dict | No
     }
 
     try:
-        # 只发1次请求！
-        req = urllib.request.Request(request_url, headers=headers, method="GET")
-        with urllib.request.urlopen(req, timeout=15, context=_http_context()) as resp:
-            if resp.getcode() != 200:
-                print(f"  [WARN] 请求状态码: {resp.getcode()}")
-                return None
-            data = json.loads(resp.read().decode("utf-8"))
-
-    except urllib.error.HTTPError as e:
-        error_detail = e.read().decode("utf-8") if hasattr(e, "read") else "无详细信息"
-        print(f"  [ERROR] Geoapify HTTP {e.code} 错误: {error_detail} | 坐标 ({lat}, {lon})")
-        return None
+        # 只发1次请求！共享客户端复用 SSL 上下文与 keep-alive 连接
+        resp = get_client().get(request_url, headers=headers)
+        if resp.status != 200:
+            print(f"  [WARN] 请求状态码: {resp.status}")
+            raise FetchError(f"HTTP {resp.status}")
+        data = resp.json()
+
+    except FetchError:
+        raise
+    except HttpError as e:
+        error_detail = e.text() or "无详细信息"
+        print(f"  [ERROR] Geoapify HTTP {e.status} 错误: {error_detail} | 坐标 ({lat}, {lon})")
+        raise FetchError(f"HTTP {e.status}: {error_detail[:200]}") from e
     except Exception as e:
         print(f"  [ERROR] 请求异常: {str(e)} | 坐标 ({lat}, {lon})")
-        return None
+        raise FetchError(f"请求异常: {e}") from e
+
+    # 只缓存成功的响应；配额超限等错误下次照常重试
+    get_cache().put(GEOAPIFY_PROVIDER, lat, lon, GEOAPIFY_PARAMS, resp.body)
+    return _parse_geoapify(data, lat, lon)
 
+
+def _parse_geoapify(data: Dict, lat: float, lon: float) -> Dict:
+    """响应 JSON → 与高德对齐的平铺字典；网络响应与缓存响应走同一解析。"""
     # -------------------------- 解析地址+POI（单次请求返回） --------------------------
     out = {"formatted_address": None, "pois_json": None}
     
@@ -245,11 +258,18 @@ def main():
     parser.add_argument("--step", type=float, default=5.0, help="采样间隔(km)")
     parser.add_argument("--from", dest="from_index", type=int, default=0, help="采样段起点(含)")
     parser.add_argument("--to", dest="to_index", type=int, default=None, help="采样段终点(含)，不填表示到末尾")
-    parser.add_argument("--delay", type=float, default=0.3, help="请求间隔(秒)")
+    parser.add_argument("--delay", type=float, default=0.3, help="请求间隔(秒)；未指定 --qps 时按 1/delay 限速")
     parser.add_argument("--out", default=None, help="输出 db 路径")
     parser.add_argument("--points", default=None, help="覆盖 config 中的 points JSON 路径")
     parser.add_argument("--master", default=None, help="覆盖 config 中的 master JSON 路径")
+    parser.add_argument("--resume", action="store_true", help="只请求任务表中未完成（pending / failed）的点")
+    add_rate_args(parser)
+    add_http_args(parser)
+    add_cache_args(parser)
     args = parser.parse_args()
+    qps = resolve_qps(args)
+    client = configure_from_args(args, default_pool_size=args.concurrency)
+    cache = configure_cache(args)
 
     # 加载河流配置（与原脚本一致）
     rivers = load_rivers_config()
@@ -285,15 +305,6 @@ def main():
     sampled = full_sampled[from_i:to_i]
     print(f"  海外逆地理  按 {args.step} km 采样共 {len(full_sampled)} 个点；本次第 {from_i}～{to_i - 1} 个，共 {len(sampled)} 次请求")
 
-    # 首点探路（验证API Key）
-    if sampled:
-        lat0, lon0, _ = sampled[0]
-        probe = _reverse_geocode_geoapify(lat0, lon0, args.geoapify_key)
-        if probe is None:
-            print("  [提示] 首点逆地理返回空，后续请求可能均为空。请检查 Geoapify Key 是否有效、是否超出配额。")
-        else:
-            print(f"  首点探路成功: {probe.get('formatted_address') or '(无地址)'}")
-
     # -------------------------- 替换原脚本中的写入逻辑 --------------------------
     # SQLite 表结构（与原脚本完全一致）
     river_slug = river_cfg["id"]
@@ -348,21 +359,40 @@ def main():
     insert_sql = f"INSERT OR IGNORE INTO river_pois ({','.join(cols)}) VALUES ({','.join(['?']*len(cols))})"
 
     cur = conn.cursor()
-    for i, (lat, lon, dist_km) in enumerate(sampled):
-        if i > 0:
-            time.sleep(args.delay)
-        
+    # 先查出需要请求的点（无记录或地址为空），已有非空数据（高德采集的国内数据）的点不占请求配额
+    todo = []
+    for lat, lon, dist_km in sampled:
         d = round(dist_km, 2)
-        # 先检查该记录是否为空，非空则跳过（保留高德数据）
         if is_record_empty(cur, numeric_id, d):
-            # 调用校正后的海外逆地理函数
-            result = _reverse_geocode_geoapify(lat, lon, args.geoapify_key)
-            
-            if result is None:
-                # 海外查询也失败，保留null（不修改）
-                print(f"  [SKIP] 坐标 ({lat}, {lon}) 查询失败，保留空值")
-                continue
-            
+            todo.append((lat, lon, d))
+        else:
+            print(f"  [SKIP] 坐标 ({lat}, {lon}) 距离 {d}km 已有数据，跳过")
+    # 任务表：登记本次计划的点；--resume 只请求上次未完成（pending / failed）的点
+    poi_jobs.ensure_table(conn)
+    planned = todo
+    todo = poi_jobs.plan(conn, numeric_id, JOB_SOURCE, planned, resume=args.resume)
+    if args.resume:
+        print(f"  --resume: 已完成 {len(planned) - len(todo)} 个")
+    print(f"  待请求 {len(todo)}/{len(sampled)} 个点")
+
+    # 首点探路（验证API Key），结果直接写入
+    probe = None
+    if todo:
+        lat0, lon0, _ = todo[0]
+        try:
+            probe = _reverse_geocode_geoapify(lat0, lon0, args.geoapify_key)
+            print(f"  首点探路成功: {probe.get('formatted_address') or '(无地址)'}")
+        except FetchError as e:
+            probe = e
+            print("  [提示] 首点逆地理失败，后续请求可能均失败。请检查 Geoapify Key 是否有效、是否超出配额。")
+
+    def write(i, item, result):
+        lat, lon, d = item
+        if isinstance(result, Exception):
+            # 海外查询也失败，保留原行（不修改），失败原因记入任务表，--resume 时重试
+            print(f"  [FAIL] 坐标 ({lat}, {lon}) 查询失败: {result}")
+            poi_jobs.mark(conn, numeric_id, JOB_SOURCE, d, poi_jobs.FAILED, str(result))
+        else:
             # 构造更新数据
             update_data = (
                 river_slug,
@@ -380,7 +410,7 @@ def main():
                 d
             )
             cur.execute(update_sql, update_data)
-            
+
             # 如果UPDATE影响行数为0（无记录），则执行INSERT
             if cur.rowcount == 0:
                 insert_data = (
@@ -397,18 +427,39 @@ def main():
                     result.get("pois_json"),
                 )
                 cur.execute(insert_sql, insert_data)
-            
+
             print(f"  [UPDATE] 坐标 ({lat}, {lon}) 距离 {d}km → {result.get('formatted_address') or '无地址'}")
-        else:
-            # 已有非空数据（高德采集的国内数据），跳过
-            print(f"  [SKIP] 坐标 ({lat}, {lon}) 距离 {d}km 已有数据，跳过")
-        
+            has_data = _scalar(result.get("formatted_address")) or result.get("pois_json")
+            poi_jobs.mark(conn, numeric_id, JOB_SOURCE, d, poi_jobs.OK if has_data else poi_jobs.EMPTY)
+
         if (i + 1) % 100 == 0:
             conn.commit()
-            print(f"  已处理 {i + 1}/{len(sampled)} 个点")
+            print(f"  已处理 {i + 1}/{len(todo)} 个点")
+
+    try:
+        # 首点用探路结果；其余交给并发引擎：令牌桶按 --qps 放行、--concurrency 个请求在途，结果按顺序回调写库
+        if todo:
+            write(0, todo[0], probe)
+        print(f"  并发请求: {qps:g} QPS，在途 {args.concurrency}")
+        stats = fetch_ordered(
+            todo[1:],
+            lambda item: _reverse_geocode_geoapify(item[0], item[1], args.geoapify_key, cached=False),
+            lambda i, item, result: write(i + 1, item, result),
+            qps=qps, concurrency=args.concurrency, burst=args.burst,
+            lookup=lambda item: _geoapify_from_cache(item[0], item[1]),
+        )
+    finally:
+        # 中途 Ctrl-C 也把已拿到的结果与任务状态落盘，未提交的点仍为 pending
+        conn.commit()
+    print(f"  请求 {stats['requests']} 次（缓存命中 {stats['cached']}），用时 {stats['elapsed_s']:.1f} s（实际 {stats['qps']:.2f} QPS）")
+    print(client.format_stats())
+    print(cache.format_stats())
+    counts = poi_jobs.summary(conn, numeric_id, JOB_SOURCE, planned)
+    print(poi_jobs.format_summary(counts))
 
-    conn.commit()
     conn.close()
+    if poi_jobs.unfinished(counts):
+        raise SystemExit(f"❌ SQLite 已更新但有缺口（{poi_jobs.unfinished(counts)} 个点仍缺地址 / POI）: {out_path}")
     print(f"完成。SQLite 已更新: {out_path}")
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+逆地理响应缓存（SQLite）：fetch_river_pois / fetch_river_pois_overseas / test_poi_three_points / test_geoapify 共用。
+
+键：服务商 + 量化到网格的经纬度（默认 1e-5°，约 1 m）+ 请求参数哈希（radius、categories 等，不含 Key）。
+值：zlib 压缩的原始响应体与抓取时间；超过 TTL（默认 90 天）视为未命中，重新请求后覆盖。
+只缓存服务商判定成功的响应（高德 status=1、HTTP 200 等），失败不入库，下次照常重试。
+换 --step、--from/--to 或输出 DB 重跑时，已请求过的坐标直接由缓存重建整行，不联网、不占配额、不受 QPS 限速。
+
+库文件：tools/out/cache/geocode.db（本地缓存，不入库）。
+
+用法（在项目根目录）:
+  python3 tools/geocode_cache.py              # 各服务商条数、体积、过期数与累计命中率
+  python3 tools/geocode_cache.py --purge      # 删除过期条目并 VACUUM
+  python3 tools/geocode_cache.py --clear      # 清空
+脚本侧用 add_cache_args(parser) 增加 --cache / --no-cache / --cache-grid / --cache-ttl-days，再 configure_from_args(args)。
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(ROOT, "tools", "out", "cache", "geocode.db")
+DEFAULT_GRID_DEG = 1e-5
+DEFAULT_TTL_DAYS = 90.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    provider TEXT NOT NULL,
+    grid_e7 INTEGER NOT NULL,
+    lat_q INTEGER NOT NULL,
+    lon_q INTEGER NOT NULL,
+    params_hash TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (provider, grid_e7, lat_q, lon_q, params_hash)
+);
+CREATE TABLE IF NOT EXISTS stats (
+    provider TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    stores INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def params_hash(params: dict | None) -> str:
+    """请求参数（不含 Key 与坐标）的稳定哈希。"""
+    text = json.dumps(params or {}, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class GeocodeCache:
+    """线程安全（单连接 + 锁），poi_fetcher 的工作线程可直接调用 get / put。"""
+
+    def __init__(self, path: str = DEFAULT_PATH, grid_deg: float = DEFAULT_GRID_DEG, ttl_days: float = DEFAULT_TTL_DAYS):
+        if grid_deg <= 0:
+            raise ValueError("grid_deg 须大于 0")
+        self.path = path
+        self.grid_deg = grid_deg
+        self.grid_e7 = int(round(grid_deg * 1e7))
+        self.ttl_s = ttl_days * 86400 if ttl_days and ttl_days > 0 else None
+        os.makedirs(os.path.dirname(os.path.abspath(path)) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        # 本次运行的计数：{provider: {"hits", "misses", "expired", "stores"}}
+        self.counters = {}
+
+    def _key(self, provider: str, lat: float, lon: float, params: dict | None):
+        return (provider, self.grid_e7, int(round(lat / self.grid_deg)), int(round(lon / self.grid_deg)), params_hash(params))
+
+    def _count(self, provider: str, name: str):
+        c = self.counters.setdefault(provider, {"hits": 0, "misses": 0, "expired": 0, "stores": 0})
+        c[name] += 1
+
+    def get(self, provider: str, lat: float, lon: float, params: dict | None = None) -> bytes | None:
+        """命中且未过期返回原始响应体，否则 None（计为 miss）。"""
+        key = self._key(provider, lat, lon, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, body FROM responses WHERE provider=? AND grid_e7=? AND lat_q=? AND lon_q=? AND params_hash=?",
+                key,
+            ).fetchone()
+            if row is None:
+                self._count(provider, "misses")
+                return None
+            if self.ttl_s is not None and time.time() - row[0] > self.ttl_s:
+                self._count(provider, "misses")
+                self._count(provider, "expired")
+                return None
+            self._count(provider, "hits")
+        return zlib.decompress(row[1])
+
+    def put(self, provider: str, lat: float, lon: float, params: dict | None, body: bytes):
+        key = self._key(provider, lat, lon, params)
+        blob = zlib.compress(body, 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (provider, grid_e7, lat_q, lon_q, params_hash, fetched_at, body) VALUES (?,?,?,?,?,?,?)",
+                key + (time.time(), blob),
+            )
+            self._conn.commit()
+            self._count(provider, "stores")
+
+    def format_stats(self) -> str:
+        lines = []
+        for provider, c in self.counters.items():
+            total = c["hits"] + c["misses"]
+            rate = c["hits"] / total * 100 if total else 0.0
+            lines.append(f"  🗃️ 缓存 {provider}: 命中 {c['hits']} / 未命中 {c['misses']}（其中过期 {c['expired']}），"
+                         f"命中率 {rate:.0f}%，新写入 {c['stores']}")
+        return "\n".join(lines) or "  🗃️ 缓存未被使用"
+
+    def close(self):
+        """把本次计数累加进 stats 表并关闭连接。"""
+        with self._lock:
+            if self._conn is None:
+                return
+            for provider, c in self.counters.items():
+                self._conn.execute("INSERT OR IGNORE INTO stats (provider) VALUES (?)", (provider,))
+                self._conn.execute(
+                    "UPDATE stats SET hits = hits + ?, misses = misses + ?, stores = stores + ? WHERE provider = ?",
+                    (c["hits"], c["misses"], c["stores"], provider),
+                )
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+
+class NullCache:
+    """--no-cache 时的占位：永远未命中、不写入。"""
+
+    counters = {}
+
+    def get(self, provider, lat, lon, params=None):
+        return None
+
+    def put(self, provider, lat, lon, params, body):
+        pass
+
+    def format_stats(self) -> str:
+        return "  🗃️ 缓存已关闭（--no-cache）"
+
+    def close(self):
+        pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _close_cache():
+    if _cache is not None:
+        _cache.close()
+
+
+atexit.register(_close_cache)
+
+
+def get_cache():
+    """进程级共享缓存（默认路径、网格与 TTL）。"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GeocodeCache()
+        return _cache
+
+
+def configure(path: str | None = DEFAULT_PATH, grid_deg: float = DEFAULT_GRID_DEG, ttl_days: float = DEFAULT_TTL_DAYS):
+    """按参数重建共享缓存；path 为 None 表示关闭缓存。"""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = GeocodeCache(path, grid_deg, ttl_days) if path else NullCache()
+        return _cache
+
+
+def add_cache_args(parser):
+    parser.add_argument("--cache", default=DEFAULT_PATH, help="逆地理响应缓存库路径，默认 tools/out/cache/geocode.db")
+    parser.add_argument("--no-cache", action="store_true", help="不读写响应缓存")
+    parser.add_argument("--cache-grid", type=float, default=DEFAULT_GRID_DEG, help=f"缓存键的经纬度网格(度)，默认 {DEFAULT_GRID_DEG:g}（约 1 m）")
+    parser.add_argument("--cache-ttl-days", type=float, default=DEFAULT_TTL_DAYS, help=f"缓存有效期(天)，0 表示永不过期，默认 {DEFAULT_TTL_DAYS:g}")
+
+
+def configure_from_args(args):
+    return configure(None if args.no_cache else args.cache, args.cache_grid, args.cache_ttl_days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逆地理响应缓存：摘要 / 清理")
+    parser.add_argument("--db", default=DEFAULT_PATH, help="缓存库路径")
+    parser.add_argument("--ttl-days", type=float, default=DEFAULT_TTL_DAYS, help="判断过期用的有效期(天)")
+    parser.add_argument("--purge", action="store_true", help="删除过期条目并 VACUUM")
+    parser.add_argument("--clear", action="store_true", help="清空全部条目与统计")
+    args = parser.parse_args()
+    if not os.path.isfile(args.db):
+        print(f"缓存库不存在: {args.db}")
+        return
+    conn = sqlite3.connect(args.db)
+    conn.executescript(_SCHEMA)
+    cutoff = time.time() - args.ttl_days * 86400 if args.ttl_days > 0 else float("-inf")
+    if args.clear:
+        conn.execute("DELETE FROM responses")
+        conn.execute("DELETE FROM stats")
+        conn.commit()
+        conn.execute("VACUUM")
+        print("🧹 已清空")
+    elif args.purge:
+        n = conn.execute("DELETE FROM responses WHERE fetched_at < ?", (cutoff,)).rowcount
+        conn.commit()
+        conn.execute("VACUUM")
+        print(f"🧹 删除过期条目 {n} 条")
+    stats = {r[0]: r[1:] for r in conn.execute("SELECT provider, hits, misses, stores FROM stats")}
+    rows = conn.execute(
+        "SELECT provider, COUNT(*), SUM(LENGTH(body)), SUM(fetched_at < ?), MIN(fetched_at), MAX(fetched_at) FROM responses GROUP BY provider",
+        (cutoff,),
+    ).fetchall()
+    print(f"🗃️ {args.db}（{os.path.getsize(args.db) / 1e6:.2f} MB）")
+    for provider, n, size, expired, oldest, newest in rows:
+        hits, misses, stores = stats.get(provider, (0, 0, 0))
+        rate = hits / (hits + misses) * 100 if hits + misses else 0.0
+        print(f"   {provider:<16} {n:>7} 条  {size / 1e6:>7.2f} MB 压缩  过期 {expired}  "
+              f"{time.strftime('%Y-%m-%d', time.localtime(oldest))} ~ {time.strftime('%Y-%m-%d', time.localtime(newest))}  "
+              f"累计命中率 {rate:.0f}%（{hits}/{hits + misses}）")
+    if not rows:
+        print("   （无条目）")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+流式读取 GeoJSON 中的线要素：逐个 Feature 解析，按 LineString（MultiLineString 拆成多条）
+产出 float64 (N, 2) 数组，峰值内存取决于最大的单个几何而非整个文件。
+
+支持的输入：
+  - GeoJSONSeq / 行分隔 JSON（.geojsons / .geojsonl / .jsonl / .ndjson，或以 RS 0x1E 开头）：逐行解析
+  - FeatureCollection：定位顶层 "features" 数组后用 JSONDecoder.raw_decode 一个个解出 Feature，
+    缓冲区不够时按块续读（块大小翻倍，超大几何也只需少量重试）
+  - 其他结构（裸 Geometry、{"coordinates": [...]} 等）：整体 json.load 后递归提取，与旧 _walk 行为一致
+
+用法:
+  for coords in iter_segments("tools/mekong_river.geojson"): ...
+  for path in find_source_files("通天河|沱沱河|长江*"): ...
+"""
+import glob
+import json
+import os
+import re
+
+import numpy as np
+
+SEQ_EXTENSIONS = (".geojsons", ".geojsonl", ".jsonl", ".ndjson")
+_RS = "\x1e"
+_CHUNK = 1 << 16
+_FEATURES_RE = re.compile(r'"features"\s*:\s*\[')
+_DECODER = json.JSONDecoder()
+
+
+def find_source_files(pattern: str, root: str = "tools") -> list[str]:
+    """按 "a|b*" 模式匹配 root 下的 .geojson / .json 原始数据（不带通配符的项视为前缀），排除已生成的路径文件。"""
+    files = []
+    for p in pattern.split('|'):
+        glob_p = p if '*' in p or '?' in p else f"{p}*"
+        files.extend(glob.glob(os.path.join(root, f"{glob_p}.geojson")))
+        files.extend(glob.glob(os.path.join(root, f"{glob_p}.json")))
+    return [f for f in sorted(set(files)) if '_raw_path_' not in f and '_points' not in f]
+
+
+def _to_array(line) -> np.ndarray:
+    try:
+        a = np.asarray(line, dtype=np.float64)
+    except ValueError:
+        a = None
+    if a is None or a.ndim != 2:
+        # 同一条线里 [lng, lat] 与 [lng, lat, z] 混用（合法 GeoJSON）：逐点截取前两维
+        try:
+            a = np.asarray([p[:2] for p in line], dtype=np.float64).reshape(-1, 2)
+        except (TypeError, ValueError):
+            return np.zeros((0, 2))
+    if a.shape[0] == 0:
+        return np.zeros((0, 2))
+    return np.ascontiguousarray(a[:, :2])
+
+
+def _walk(obj):
+    """递归提取任意结构中的线：LineString / MultiLineString / 裸坐标数组。"""
+    if isinstance(obj, dict):
+        if obj.get('type') == 'LineString':
+            yield _to_array(obj['coordinates'])
+        elif obj.get('type') == 'MultiLineString':
+            for line in obj['coordinates']:
+                yield _to_array(line)
+        else:
+            for v in obj.values():
+                if isinstance(v, (dict, list)):
+                    yield from _walk(v)
+    elif isinstance(obj, list):
+        if len(obj) > 0 and isinstance(obj[0], list) and len(obj[0]) > 0 and not isinstance(obj[0][0], list):
+            yield _to_array(obj)
+        else:
+            for v in obj:
+                if isinstance(v, (dict, list)):
+                    yield from _walk(v)
+
+
+def _iter_seq(f):
+    for line in f:
+        line = line.strip().lstrip(_RS)
+        if line:
+            yield json.loads(line)
+
+
+def _iter_features(f, buf):
+    """buf 为已读入、位于 "features": [ 之后的文本；逐个产出数组元素。"""
+    pos, eof, chunk = 0, False, _CHUNK
+    while True:
+        # 跳过空白与逗号
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            more = f.read(chunk)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+        if pos >= len(buf) or buf[pos] == ']':
+            return
+        try:
+            obj, end = _DECODER.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more = f.read(chunk)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            chunk *= 2
+            continue
+        chunk = _CHUNK
+        yield obj
+        buf, pos = buf[end:], 0
+
+
+def iter_features(path: str):
+    """逐个产出文件中的 GeoJSON 对象：Seq 文件每行一个，FeatureCollection 每个 Feature 一个，其他结构整体一个。"""
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(_CHUNK)
+        if path.endswith(SEQ_EXTENSIONS) or head.lstrip().startswith(_RS):
+            f.seek(0)
+            yield from _iter_seq(f)
+            return
+        m = _FEATURES_RE.search(head)
+        while m is None and len(head) < (1 << 22):
+            more = f.read(_CHUNK)
+            if not more:
+                break
+            head += more
+            m = _FEATURES_RE.search(head)
+        if m is None:
+            # 非 FeatureCollection：只有一个几何，整体解析不会比流式更占内存
+            yield json.loads(head + f.read())
+            return
+        yield from _iter_features(f, head[m.end():])
+
+
+def iter_segments(path: str, min_points: int = 2):
+    """逐条产出线的 (N, 2) float64 坐标数组，少于 min_points 个点的线跳过。"""
+    for obj in iter_features(path):
+        for seg in _walk(obj):
+            if len(seg) >= min_points:
+                yield seg
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+河流几何质检：对任意原始线段集合或已生成的点位文件，全部用数组运算完成以下检查，
+12 万点量级的整条长江一秒内出结果（取代 debug_seg0.py / analyze_songhua.py 的逐点循环）。
+
+  - 重复点：相邻完全相同的顶点；不相邻但坐标（6 位小数）重复的顶点
+  - 折返尖刺：p1→p2→p3 中 p1、p3 几乎重合（d13 < 0.1 × (d12 + d23)），即走过去又折回来
+  - 锯齿：相邻两个顶点都急转（> 90°）且方向相反
+  - 自相交：经纬度平面上的均匀网格索引筛出候选边对，再做线段相交判定（不相邻的边才算）
+  - 长度统计：每条线点数、总长、相邻点间距的最小/中位/平均/最大值
+
+可选 --clean 输出清洗后的 GeoJSON（去相邻重复点、删折返尖刺顶点）。
+
+用法（在项目根目录）:
+  python3 tools/geom_qa.py "松花江"                       # 按 tools/ 下原始数据模式匹配
+  python3 tools/geom_qa.py --river yangtze                # rivers_config 中的点位文件，各段首尾相接检查
+  python3 tools/geom_qa.py --file assets/json/rivers/x_raw_path_50m.json --clean out.geojson
+  python3 tools/geom_qa.py "松花江 000304728411" --segment 0
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from geodesy import as_lnglat, distances, segment_lengths
+from geojson_stream import find_source_files, iter_segments
+from segment_cache import load_segment_set
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, "assets", "json", "rivers", "rivers_config.json")
+
+SPIKE_RATIO = 0.1
+ZIGZAG_TURN_DEG = 90.0
+# 单条边最多登记的网格数；超过的长边（如 --join 跨越稀疏数据的桥接边）改为逐条与包围盒相交的边比对
+MAX_EDGE_CELLS = 64
+
+
+def duplicate_vertices(c: np.ndarray) -> tuple[np.ndarray, int]:
+    """返回 (与前一点完全相同的顶点下标, 不相邻重复出现的顶点个数)。"""
+    if len(c) < 2:
+        return np.zeros(0, dtype=np.int64), 0
+    consecutive = np.flatnonzero(np.all(c[1:] == c[:-1], axis=1)) + 1
+    # 6 位小数网格上的经纬度合成一个 int64 键：经度偏移后占高位，纬度占低 28 位
+    q = np.round(c * 1e6).astype(np.int64)
+    keys = (q[:, 0] + 180_000_000) << 28 | (q[:, 1] + 90_000_000)
+    keep = np.ones(len(c), dtype=bool)
+    keep[consecutive] = False
+    kept = keys[keep]
+    return consecutive, int(len(kept) - len(np.unique(kept)))
+
+
+def spike_vertices(c: np.ndarray, ratio: float = SPIKE_RATIO) -> np.ndarray:
+    """折返尖刺的中间顶点下标：三点中首尾距离远小于两段之和（比值判定，用 haversine 近似即可）。"""
+    if len(c) < 3:
+        return np.zeros(0, dtype=np.int64)
+    d = distances(c[:-1], c[1:], fast=True)
+    d12, d23 = d[:-1], d[1:]
+    d13 = distances(c[:-2], c[2:], fast=True)
+    span = d12 + d23
+    return np.flatnonzero((span > 0) & (d13 < span * ratio)) + 1
+
+
+def _local_xy(c: np.ndarray) -> np.ndarray:
+    """等距圆柱投影到以平均纬度为基准的平面；是经纬度的仿射变换，不改变相交关系。"""
+    lat0 = np.radians(np.mean(c[:, 1])) if len(c) else 0.0
+    return np.column_stack((c[:, 0] * np.cos(lat0), c[:, 1]))
+
+
+def turn_angles(c: np.ndarray) -> np.ndarray:
+    """每个内部顶点的有符号转角（度，左转为正），长度 N-2；零长度边处为 0。"""
+    if len(c) < 3:
+        return np.zeros(0)
+    xy = _local_xy(c)
+    v = np.diff(xy, axis=0)
+    heading = np.arctan2(v[:, 1], v[:, 0])
+    turn = np.degrees(np.angle(np.exp(1j * (heading[1:] - heading[:-1]))))
+    zero = np.all(v[1:] == 0, axis=1) | np.all(v[:-1] == 0, axis=1)
+    turn[zero] = 0.0
+    return turn
+
+
+def zigzag_vertices(c: np.ndarray, min_turn_deg: float = ZIGZAG_TURN_DEG) -> np.ndarray:
+    """锯齿顶点下标：该点与下一点都急转且转向相反。"""
+    turn = turn_angles(c)
+    if len(turn) < 2:
+        return np.zeros(0, dtype=np.int64)
+    sharp = np.abs(turn) > min_turn_deg
+    flip = np.sign(turn[1:]) * np.sign(turn[:-1]) < 0
+    return np.flatnonzero(sharp[1:] & sharp[:-1] & flip) + 1
+
+
+def _orient(ax, ay, bx, by, cx, cy):
+    return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+
+def self_intersections(c: np.ndarray, cell_factor: float = 4.0, max_cells: int = MAX_EDGE_CELLS) -> np.ndarray:
+    """
+    返回自相交的边对 (K, 2)（边 i 为 c[i]→c[i+1]，只报不相邻的边）。
+    网格边长取中位边长的 cell_factor 倍，每条边登记到其包围盒覆盖的全部格子，
+    同格子内的边两两成为候选，再用方向判定做严格相交测试。
+    覆盖超过 max_cells 个格子的长边不进网格（否则一条边就可能展开成海量格子），
+    单独与全部边做一次包围盒筛选，候选同样进入相交测试。
+    """
+    if len(c) < 4:
+        return np.zeros((0, 2), dtype=np.int64)
+    xy = _local_xy(c)
+    a, b = xy[:-1], xy[1:]
+    n = len(a)
+    seg_len = np.hypot(*(b - a).T)
+    cell = max(float(np.median(seg_len[seg_len > 0])) if np.any(seg_len > 0) else 1e-6, 1e-9) * cell_factor
+    origin = xy.min(axis=0)
+    lo = np.floor((np.minimum(a, b) - origin) / cell).astype(np.int64)
+    hi = np.floor((np.maximum(a, b) - origin) / cell).astype(np.int64)
+    span = hi - lo + 1
+    # 每条边覆盖的格子数，展开成 (格子, 边) 登记表；长边不登记
+    counts = span[:, 0] * span[:, 1]
+    long_edges = np.flatnonzero(counts > max_cells)
+    counts[long_edges] = 0
+    edge = np.repeat(np.arange(n), counts)
+    k = np.arange(len(edge)) - np.repeat(np.cumsum(counts) - counts, counts)
+    gx = lo[edge, 0] + k % span[edge, 0]
+    gy = lo[edge, 1] + k // span[edge, 0]
+    ncol = int(hi[:, 0].max()) + 2
+    key = gy * ncol + gx
+    order = np.lexsort((edge, key))
+    key, edge = key[order], edge[order]
+    pairs = []
+    offset = 1
+    while offset < len(key):
+        same = key[offset:] == key[:-offset]
+        if not same.any():
+            break
+        pairs.append(np.column_stack((edge[:-offset][same], edge[offset:][same])))
+        offset += 1
+    if len(long_edges):
+        bb_lo, bb_hi = np.minimum(a, b), np.maximum(a, b)
+        for e in long_edges:
+            other = np.flatnonzero((bb_lo[:, 0] <= bb_hi[e, 0]) & (bb_hi[:, 0] >= bb_lo[e, 0])
+                                   & (bb_lo[:, 1] <= bb_hi[e, 1]) & (bb_hi[:, 1] >= bb_lo[e, 1]))
+            pairs.append(np.column_stack((np.minimum(other, e), np.maximum(other, e))))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    p = np.concatenate(pairs)
+    p = p[p[:, 1] - p[:, 0] > 1]
+    # 同一对边可能在多个格子里重复出现，合成一维键去重
+    key = np.unique(p[:, 0] * n + p[:, 1])
+    p = np.column_stack((key // n, key % n))
+    if len(p) == 0:
+        return p
+    i, j = p[:, 0], p[:, 1]
+    o1 = _orient(a[i, 0], a[i, 1], b[i, 0], b[i, 1], a[j, 0], a[j, 1])
+    o2 = _orient(a[i, 0], a[i, 1], b[i, 0], b[i, 1], b[j, 0], b[j, 1])
+    o3 = _orient(a[j, 0], a[j, 1], b[j, 0], b[j, 1], a[i, 0], a[i, 1])
+    o4 = _orient(a[j, 0], a[j, 1], b[j, 0], b[j, 1], b[i, 0], b[i, 1])
+    hit = (o1 * o2 < 0) & (o3 * o4 < 0)
+    return p[hit]
+
+
+def length_stats(c: np.ndarray) -> dict:
+    steps = segment_lengths(c)
+    if len(steps) == 0:
+        return {"points": len(c), "length_km": 0.0}
+    return {
+        "points": len(c),
+        "length_km": round(float(np.sum(steps)) / 1000.0, 3),
+        "step_min_m": round(float(steps.min()), 2),
+        "step_median_m": round(float(np.median(steps)), 2),
+        "step_mean_m": round(float(steps.mean()), 2),
+        "step_max_m": round(float(steps.max()), 2),
+    }
+
+
+def check_line(coords) -> dict:
+    c = as_lnglat(coords)
+    consecutive, repeated = duplicate_vertices(c)
+    spikes = spike_vertices(c)
+    zigzags = zigzag_vertices(c)
+    crossings = self_intersections(c)
+    return {
+        **length_stats(c),
+        "duplicate_consecutive": len(consecutive),
+        "duplicate_repeated": repeated,
+        "spikes": len(spikes),
+        "zigzags": len(zigzags),
+        "self_intersections": len(crossings),
+        "spike_samples": c[spikes[:5]].tolist(),
+        "intersection_samples": [[int(x), int(y)] for x, y in crossings[:5]],
+    }
+
+
+def clean_line(coords, max_passes: int = 5) -> np.ndarray:
+    """去相邻重复点并删除折返尖刺顶点，反复几轮直到不再变化。"""
+    c = as_lnglat(coords)
+    for _ in range(max_passes):
+        consecutive, _ = duplicate_vertices(c)
+        keep = np.ones(len(c), dtype=bool)
+        keep[consecutive] = False
+        c = c[keep]
+        spikes = spike_vertices(c)
+        if len(spikes) == 0:
+            break
+        # 相邻的尖刺顶点只删前一个，避免把一段折线整段删空
+        spikes = spikes[np.insert(np.diff(spikes) > 1, 0, True)]
+        keep = np.ones(len(c), dtype=bool)
+        keep[spikes] = False
+        c = c[keep]
+    return c
+
+
+def join_lines(lines) -> np.ndarray:
+    """按顺序首尾相接（后一条与前一条共用的衔接点只保留一个）。"""
+    pieces = []
+    for line in lines:
+        c = as_lnglat(line)
+        if pieces and len(c) and np.array_equal(c[0], pieces[-1][-1]):
+            c = c[1:]
+        if len(c):
+            pieces.append(c)
+    return np.concatenate(pieces) if pieces else np.zeros((0, 2))
+
+
+def _river_points_path(river_id: str) -> str:
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        rivers = json.load(f).get("rivers") or []
+    for r in rivers:
+        if r.get("id") == river_id:
+            return os.path.join(ROOT, *r["points_json_path"].split("/"))
+    raise SystemExit(f"未知河流: {river_id}，config 中现有 id: {[r.get('id') for r in rivers]}")
+
+
+def load_lines(args) -> list[tuple[str, np.ndarray]]:
+    if args.river:
+        path = _river_points_path(args.river)
+        with open(path, "r", encoding="utf-8") as f:
+            sections = json.load(f)["sections_points"]
+        return [(f"{args.river} (全程 {len(sections)} 段首尾相接)", join_lines(sections))]
+    if args.file:
+        lines = [(f"{os.path.basename(args.file)}#{i}", s) for i, s in enumerate(iter_segments(args.file))]
+    else:
+        lines = []
+        for path in find_source_files(args.pattern):
+            segs = load_segment_set(path)
+            lines.extend((f"{os.path.basename(path)}#{i}", s) for i, s in enumerate(segs))
+    if args.segment is not None:
+        lines = [lines[args.segment]]
+    if args.join:
+        return [("joined", join_lines([c for _, c in lines]))]
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="河流几何质检（重复点 / 折返 / 锯齿 / 自相交 / 长度统计）")
+    parser.add_argument("pattern", nargs="?", help='tools/ 下原始数据匹配模式，如 "松花江" 或 "通天河|长江*"')
+    parser.add_argument("--river", help="检查 rivers_config 中该河流的点位文件")
+    parser.add_argument("--file", help="检查任意 GeoJSON / 路径 JSON 文件")
+    parser.add_argument("--segment", type=int, default=None, help="只检查第 i 条线")
+    parser.add_argument("--join", action="store_true", help="把所有线按顺序首尾相接后作为一条检查")
+    parser.add_argument("--clean", help="输出清洗后的 GeoJSON 路径")
+    parser.add_argument("--report", help="把质检结果写成 JSON")
+    args = parser.parse_args(argv)
+    if not (args.pattern or args.river or args.file):
+        parser.error("需要 pattern、--river 或 --file 之一")
+
+    t0 = time.perf_counter()
+    lines = load_lines(args)
+    report = []
+    for name, coords in lines:
+        r = check_line(coords)
+        report.append({"name": name, **r})
+        print(f"📐 {name}: {r['points']} 点, {r['length_km']:.2f} km | 相邻重复 {r['duplicate_consecutive']}, "
+              f"非相邻重复 {r['duplicate_repeated']}, 折返 {r['spikes']}, 锯齿 {r['zigzags']}, 自相交 {r['self_intersections']}")
+        if r["points"] >= 2:
+            print(f"   间距(m): min {r['step_min_m']}  中位 {r['step_median_m']}  平均 {r['step_mean_m']}  max {r['step_max_m']}")
+    total_pts = sum(r["points"] for r in report)
+    print(f"⏱️ 共 {len(report)} 条线 / {total_pts} 点，用时 {time.perf_counter() - t0:.3f} s")
+
+    if args.clean:
+        features = []
+        for name, coords in lines:
+            c = clean_line(coords)
+            features.append({"type": "Feature", "properties": {"name": name},
+                             "geometry": {"type": "LineString", "coordinates": np.round(c, 7).tolist()}})
+        with open(args.clean, "w", encoding="utf-8") as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"🧹 清洗结果: {args.clean}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 质检报告: {args.report}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+逆地理 / 翻译脚本共用的 HTTP 客户端（仅标准库）：
+
+- SSL 上下文全进程只建一次：装了 certifi 用其证书包；否则退回未验证上下文（与各脚本原有行为一致，仅建议本地使用，提示一次）。
+  装了 certifi 时证书校验失败的主机，可用 --insecure 显式关闭校验。
+- 按 (协议, 主机, 端口) 维护 keep-alive 连接池，每个主机最多 pool_size 条连接；
+  请求结束放回池中，后续请求复用，省掉每个采样点一次 TCP + TLS 握手。
+  复用的连接若已被服务端关闭，自动换新连接重发一次。
+- 支持 gzip 响应、环境变量中的 HTTP(S) 代理（CONNECT 隧道）。
+- 每个主机记录请求数、新建 / 复用连接数、失败数与逐次耗时，stats() / format_stats() 输出 p50 / p95 与建连耗时。
+- 状态码 >= 400 抛 HttpError（带 status 与响应体）。
+
+用法:
+  from http_client import get_client
+  resp = get_client().get("https://restapi.amap.com/v3/geocode/regeo", params={...})
+  data = resp.json()
+脚本侧用 add_http_args(parser) 增加 --pool-size / --timeout / --insecure，再 configure_from_args(args)。
+"""
+import gzip
+import http.client
+import json
+import ssl
+import threading
+import time
+import urllib.parse
+import urllib.request
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_TIMEOUT = 15.0
+DEFAULT_POOL_SIZE = 4
+USER_AGENT = "RivtrekPOI/1.0"
+
+# 复用连接被服务端关掉时的典型异常，换新连接重发
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError,
+                 BrokenPipeError, ConnectionAbortedError)
+
+
+@lru_cache(maxsize=None)
+def ssl_context(verify: bool = True) -> ssl.SSLContext:
+    """全进程共用的 SSL 上下文；macOS 上 Python 常因证书链不完整报 CERTIFICATE_VERIFY_FAILED，优先用 certifi。
+    verify=False 时不校验证书（--insecure）。"""
+    if not verify:
+        print("  [提示] --insecure：HTTPS 不校验证书")
+        return ssl._create_unverified_context()
+    try:
+        import certifi
+        return ssl.create_default_context(cafile=certifi.where())
+    except ImportError:
+        # 未安装 certifi 时用未验证上下文，仅建议本地脚本使用；生产环境建议: pip install certifi
+        print("  [提示] 未安装 certifi，HTTPS 不校验证书（pip install certifi）")
+        return ssl._create_unverified_context()
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, reason: str, body: bytes, url: str):
+        super().__init__(f"HTTP {status} {reason}")
+        self.status = status
+        self.reason = reason
+        self.body = body
+        self.url = url
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+
+class Response:
+    def __init__(self, status: int, headers, body: bytes, elapsed_ms: float, reused: bool):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.elapsed_ms = elapsed_ms
+        self.reused = reused
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding)
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8"))
+
+
+class _HostStats:
+    __slots__ = ("requests", "new_connections", "reused", "errors", "latency_ms", "connect_ms")
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.reused = 0
+        self.errors = 0
+        self.latency_ms = []
+        self.connect_ms = []
+
+
+class HttpClient:
+    """线程安全；各线程并发请求同一主机时最多占用 pool_size 条连接，超出的请求等待空闲连接。"""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT, headers: dict | None = None,
+                 verify: bool = True):
+        if pool_size < 1:
+            raise ValueError("pool_size 须不小于 1")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.verify = verify
+        self.headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip", **(headers or {})}
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = {}
+        self._stats = {}
+
+    # -------------------------- 连接池 --------------------------
+    def _host_key(self, parts):
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        return scheme, parts.hostname, port
+
+    def _new_connection(self, key, timeout):
+        scheme, host, port = key
+        proxy = _proxy_for(scheme, host)
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        kwargs = {"context": ssl_context(self.verify)} if scheme == "https" else {}
+        if proxy and scheme == "https":
+            conn = cls(proxy.hostname, proxy.port or 80, timeout=timeout, **kwargs)
+            conn.set_tunnel(host, port)
+        elif proxy:
+            # 明文 HTTP 经代理：直连代理，请求行用绝对 URL
+            conn = cls(proxy.hostname, proxy.port or 80, timeout=timeout)
+        else:
+            conn = cls(host, port, timeout=timeout, **kwargs)
+        return conn
+
+    def _acquire(self, key, timeout):
+        with self._lock:
+            slots = self._slots.get(key)
+            if slots is None:
+                slots = self._slots[key] = threading.BoundedSemaphore(self.pool_size)
+                self._idle[key] = []
+                self._stats[key] = _HostStats()
+        slots.acquire()
+        with self._lock:
+            idle = self._idle[key]
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        return self._new_connection(key, timeout), False
+
+    def _release(self, key, conn, keep: bool):
+        if keep:
+            with self._lock:
+                self._idle[key].append(conn)
+        else:
+            conn.close()
+        self._slots[key].release()
+
+    # -------------------------- 请求 --------------------------
+    def request(self, method: str, url: str, params: dict | None = None, headers: dict | None = None,
+                body: bytes | None = None, timeout: float | None = None) -> Response:
+        if params:
+            url = url + ("&" if "?" in url else "?") + urllib.parse.urlencode(params)
+        parts = urllib.parse.urlsplit(url)
+        key = self._host_key(parts)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        if key[0] == "http" and _proxy_for(key[0], key[1]):
+            path = url
+        hdrs = {**self.headers, **(headers or {})}
+        timeout = self.timeout if timeout is None else timeout
+
+        t0 = time.perf_counter()
+        conn, reused = self._acquire(key, timeout)
+        stats = self._stats[key]
+        keep = False
+        try:
+            for attempt in range(2):
+                try:
+                    connect_ms = None
+                    if conn.sock is None:
+                        t_conn = time.perf_counter()
+                        conn.connect()
+                        connect_ms = (time.perf_counter() - t_conn) * 1000
+                    conn.request(method, path, body=body, headers=hdrs)
+                    resp = conn.getresponse()
+                    data = resp.read()
+                    break
+                except _STALE_ERRORS:
+                    # 只有复用的旧连接才值得重发一次；新连接失败直接抛出
+                    conn.close()
+                    if not reused or attempt:
+                        raise
+                    conn, reused = self._new_connection(key, timeout), False
+            if resp.getheader("Content-Encoding", "").lower() == "gzip":
+                data = gzip.decompress(data)
+            keep = not resp.will_close
+        except Exception:
+            with self._lock:
+                stats.requests += 1
+                stats.errors += 1
+            raise
+        finally:
+            self._release(key, conn, keep)
+
+        elapsed = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            stats.requests += 1
+            stats.latency_ms.append(elapsed)
+            if reused:
+                stats.reused += 1
+            else:
+                stats.new_connections += 1
+            if connect_ms is not None:
+                stats.connect_ms.append(connect_ms)
+            if resp.status >= 400:
+                stats.errors += 1
+        if resp.status >= 400:
+            raise HttpError(resp.status, resp.reason, data, url)
+        return Response(resp.status, resp.headers, data, elapsed, reused)
+
+    def get(self, url: str, params: dict | None = None, headers: dict | None = None, timeout: float | None = None) -> Response:
+        return self.request("GET", url, params=params, headers=headers, timeout=timeout)
+
+    def get_json(self, url: str, params: dict | None = None, headers: dict | None = None, timeout: float | None = None):
+        return self.get(url, params=params, headers=headers, timeout=timeout).json()
+
+    # -------------------------- 统计 --------------------------
+    def stats(self) -> dict:
+        """{主机: {requests, new_connections, reused, errors, p50_ms, p95_ms, mean_ms, connect_mean_ms}}"""
+        out = {}
+        with self._lock:
+            for (scheme, host, port), s in self._stats.items():
+                lat = np.asarray(s.latency_ms) if s.latency_ms else None
+                out[f"{scheme}://{host}:{port}"] = {
+                    "requests": s.requests,
+                    "new_connections": s.new_connections,
+                    "reused": s.reused,
+                    "errors": s.errors,
+                    "mean_ms": float(lat.mean()) if lat is not None else None,
+                    "p50_ms": float(np.percentile(lat, 50)) if lat is not None else None,
+                    "p95_ms": float(np.percentile(lat, 95)) if lat is not None else None,
+                    "connect_mean_ms": float(np.mean(s.connect_ms)) if s.connect_ms else None,
+                }
+        return out
+
+    def format_stats(self) -> str:
+        lines = []
+        for host, s in self.stats().items():
+            line = (f"  🌐 {host}: {s['requests']} 次请求，新建连接 {s['new_connections']}，复用 {s['reused']}，失败 {s['errors']}")
+            if s["p50_ms"] is not None:
+                line += f"，耗时 p50 {s['p50_ms']:.0f} ms / p95 {s['p95_ms']:.0f} ms"
+            if s["connect_mean_ms"] is not None:
+                line += f"，建连平均 {s['connect_mean_ms']:.0f} ms"
+            lines.append(line)
+        return "\n".join(lines) or "  🌐 无 HTTP 请求"
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for conn in idle:
+                    conn.close()
+                idle.clear()
+
+
+def _proxy_for(scheme: str, host: str):
+    """按 http_proxy / https_proxy / no_proxy 环境变量取代理，与 urllib 的行为一致。"""
+    proxies = urllib.request.getproxies()
+    proxy = proxies.get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    return urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """进程级共享客户端（默认池大小与超时），各脚本与 poi_fetcher 的工作线程共用。"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def configure(pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT, verify: bool = True) -> HttpClient:
+    """按参数重建共享客户端（旧池中的空闲连接关闭）。"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(pool_size=pool_size, timeout=timeout, verify=verify)
+        return _client
+
+
+def add_http_args(parser, default_timeout: float = DEFAULT_TIMEOUT):
+    parser.add_argument("--pool-size", type=int, default=None, help="每个主机的 keep-alive 连接数上限（默认与并发数一致）")
+    parser.add_argument("--timeout", type=float, default=default_timeout, help=f"单次请求超时(秒)，默认 {default_timeout:g}")
+    parser.add_argument("--insecure", action="store_true", help="HTTPS 不校验证书（装了 certifi 后证书校验失败的主机用）")
+
+
+def configure_from_args(args, default_pool_size: int = DEFAULT_POOL_SIZE) -> HttpClient:
+    return configure(pool_size=args.pool_size or default_pool_size, timeout=args.timeout, verify=not args.insecure)
@@ -1,75 +1,36 @@
 import json
 import numpy as np
-from pyproj import Geod
-from scipy.interpolate import interp1d
 import os
-import glob
-import heapq
 import argparse
 
-def get_line_length(coords):
-    if len(coords) < 2: return 0
-    geod = Geod(ellps="WGS84")
-    lons, lats = [p[0] for p in coords], [p[1] for p in coords]
-    _, _, dists = geod.inv(lons[:-1], lats[:-1], lons[1:], lats[1:])
-    return np.sum(dists)
+from endpoint_index import SegmentEndpointIndex, START, END
+from geodesy import distance, line_length, resample
+from geojson_stream import find_source_files
+from segment_cache import default_jobs, load_segment_sets
+from simplify import douglas_peucker, format_stats, line_stats, merge_stats
+from river_graph import extract_main_stem
 
-def get_dist(p1, p2):
-    geod = Geod(ellps="WGS84")
-    _, _, d = geod.inv(p1[0], p1[1], p2[0], p2[1])
-    return d
+# 衔接阈值 50km，适应可能的断缺
+MAX_GAP_M = 50000
 
-def smart_merge(pattern, output_base, spacing=50):
-    output_file = f'assets/json/rivers/{output_base}_raw_path_{spacing}m.json'
-    print(f"🚀 重新重构：长路径拓扑提取模式")
-    
-    files = []
-    for p in pattern.split('|'):
-        glob_p = p if '*' in p or '?' in p else f"{p}*"
-        files.extend(glob.glob(f"tools/{glob_p}.geojson"))
-        files.extend(glob.glob(f"tools/{glob_p}.json"))
-    files = sorted(list(set(files)))
-    
-    all_segments = []
-    for f_path in files:
-        if '_raw_path_' in f_path or '_points' in f_path: continue
-        with open(f_path, 'r', encoding='utf-8') as f:
-            data = json.load(f); file_segs = []
-            def _walk(obj):
-                if isinstance(obj, dict):
-                    if obj.get('type') == 'LineString': file_segs.append(obj['coordinates'])
-                    elif obj.get('type') == 'MultiLineString': file_segs.extend(obj['coordinates'])
-                    else: [ _walk(v) for v in obj.values() if isinstance(v, (dict, list)) ]
-                elif isinstance(obj, list):
-                    if len(obj) > 0 and isinstance(obj[0], list) and not isinstance(obj[0][0], list): file_segs.append(obj)
-                    else: [ _walk(v) for v in obj if isinstance(v, (dict, list)) ]
-            _walk(data)
-            for s in file_segs:
-                if len(s) >= 2: all_segments.append({"coords": s, "len": get_line_length(s), "file": os.path.basename(f_path)})
-
-    if not all_segments: return
 
-    # 逻辑核心：全量拓扑拼接（种子增长法，但允许更聪明的方向选择）
-    # 选最长的一段作为主干种子
-    all_segments.sort(key=lambda x: x['len'], reverse=True)
-    current_main = list(all_segments.pop(0)['coords'])
-    
+def _chain_greedy(current_main, segments):
+    """逐段全扫描：每轮对剩余所有线段算四种衔接距离，O(n²) 次测地计算，作为 index 模式的对照基准。"""
+    segments = list(segments)
     while True:
-        changed = False
         head, tail = current_main[0], current_main[-1]
         
         best_match_idx = -1
-        best_d = 50000 # 50km 阈值，适应可能的断缺
+        best_d = MAX_GAP_M
         target_pos = "" # 'head' or 'tail'
         should_reverse = False
         
-        for i, seg in enumerate(all_segments):
-            s = seg['coords']
+        for i, s in enumerate(segments):
             # 四种衔接可能
-            d_tail_start = get_dist(tail, s[0])
-            d_tail_end = get_dist(tail, s[-1])
-            d_head_end = get_dist(head, s[-1])
-            d_head_start = get_dist(head, s[0])
+            d_tail_start = distance(tail, s[0])
+            d_tail_end = distance(tail, s[-1])
+            d_head_end = distance(head, s[-1])
+            d_head_start = distance(head, s[0])
             
             opts = [
                 (d_tail_start, 'tail', False),
@@ -82,32 +43,115 @@ def smart_merge(pattern, output_base, spacing=50):
             if d < best_d:
                 best_d, best_match_idx, target_pos, should_reverse = d, i, pos, rev
         
-        if best_match_idx != -1:
-            match_seg = all_segments.pop(best_match_idx)['coords']
-            if should_reverse: match_seg = match_seg[::-1]
-            
-            if target_pos == 'tail':
-                current_main.extend(match_seg[1:])
-            else:
-                current_main = match_seg[:-1] + current_main
-            changed = True
-        else:
+        if best_match_idx == -1:
+            return current_main
+        match_seg = segments.pop(best_match_idx)
+        current_main = _attach(current_main, match_seg, target_pos, should_reverse)
+
+
+# (端点, 衔接位置) -> (greedy 中四种衔接的先后次序, 衔接位置, 是否翻转)，次序用于等距时决胜
+_INDEX_OPTS = {
+    ('tail', START): (0, 'tail', False),
+    ('tail', END): (1, 'tail', True),
+    ('head', END): (2, 'head', False),
+    ('head', START): (3, 'head', True),
+}
+
+
+def _chain_indexed(current_main, segments):
+    """
+    端点 KD 树版本：每轮只查主干首尾附近的候选端点，O(n log n)。
+    决胜规则与 greedy 一致（距离最小 → 线段排序靠前 → 四种衔接的先后次序），拼出的链完全相同。
+    """
+    index = SegmentEndpointIndex(segments)
+    while len(index):
+        best = None
+        for pos, p in (('tail', current_main[-1]), ('head', current_main[0])):
+            for d, i, end in index.nearest(p, MAX_GAP_M):
+                order, target_pos, rev = _INDEX_OPTS[(pos, end)]
+                key = (d, i, order)
+                if best is None or key < best[0]:
+                    best = (key, i, target_pos, rev)
+        if best is None:
             break
+        _, i, target_pos, rev = best
+        index.remove(i)
+        current_main = _attach(current_main, segments[i], target_pos, rev)
+    return current_main
+
+
+def _attach(current_main, match_seg, target_pos, should_reverse):
+    # match_seg 可能是 (N, 2) 数组，头部拼接须先转 list，避免数组 + 列表变成逐元素相加
+    if should_reverse: match_seg = match_seg[::-1]
+    if target_pos == 'tail':
+        current_main.extend(match_seg[1:])
+        return current_main
+    return list(match_seg[:-1]) + current_main
+
+def smart_merge(pattern, output_base, spacing=50, mode='index', snap_m=30.0, gap_m=MAX_GAP_M, source=None, mouth=None, interp='linear', use_cache=True, jobs=None, simplify_m=0.0):
+    output_file = f'assets/json/rivers/{output_base}_raw_path_{spacing}m.json'
+    print(f"🚀 重新重构：长路径拓扑提取模式")
+    
+    all_segments = []
+    files = find_source_files(pattern)
+    # 各文件并行解析测长（按内容哈希读缓存，命中时跳过 JSON 解析），坐标直接是 (N, 2) 数组
+    for f_path, segs in zip(files, load_segment_sets(files, use_cache=use_cache, jobs=jobs)):
+        for s, length in zip(segs, segs.lengths):
+            all_segments.append({"coords": s, "len": length, "file": os.path.basename(f_path)})
+
+    if not all_segments: return
+
+    if mode == 'graph':
+        # 图模式：端点吸附成节点，Dijkstra 取源头→入海口主干，可处理辫状河道与支流断头
+        current_main, stats = extract_main_stem(
+            [s['coords'] for s in all_segments], [s['len'] for s in all_segments],
+            snap_m=snap_m, gap_m=gap_m, source=source, mouth=mouth)
+        print(f"🕸️ 河网图: {stats['nodes']} 节点, {stats['edges']} 条边 (桥接 {stats['bridges']}), "
+              f"{stats['components']} 个连通分量；主干 {stats['path_edges']} 条边")
+        if len(current_main) == 0: return
+        print(f"   主干起点: {current_main[0].tolist()}  终点: {current_main[-1].tolist()}")
+    else:
+        # 逻辑核心：全量拓扑拼接（种子增长法，但允许更聪明的方向选择）
+        # 选最长的一段作为主干种子
+        all_segments.sort(key=lambda x: x['len'], reverse=True)
+        current_main = list(all_segments.pop(0)['coords'])
+        chain = _chain_greedy if mode == 'greedy' else _chain_indexed
+        current_main = chain(current_main, [s['coords'] for s in all_segments])
 
-    total_km = get_line_length(current_main)
+    total_km = line_length(current_main)
     print(f"✅ 合并完成！总里程: {total_km/1000:.2f} km")
 
-    # 插值与输出
-    coords = np.array(current_main); mask = np.ones(len(coords), dtype=bool); mask[1:] = np.any(np.diff(coords, axis=0) != 0, axis=1); coords = coords[mask]
-    actual_dists = [0]; geod = Geod(ellps="WGS84")
-    for i in range(len(coords)-1): _, _, d = geod.inv(coords[i][0], coords[i][1], coords[i+1][0], coords[i+1][1]); actual_dists.append(actual_dists[-1] + d)
-    target_d = np.arange(0, actual_dists[-1], spacing); f_lng = interp1d(actual_dists, coords[:, 0], kind='linear', fill_value="extrapolate"); f_lat = interp1d(actual_dists, coords[:, 1], kind='linear', fill_value="extrapolate")
-    final_points = [[round(float(f_lng(d)), 6), round(float(f_lat(d)), 6)] for d in target_d]
+    # 插值与输出：整条路径一次性数组插值，6 位小数取整后直接序列化
+    final = np.round(resample(current_main, spacing, geodesic=(interp == 'geodesic')), 6)
+    if simplify_m > 0:
+        # 平直河段不需要每 spacing 米一个点：在误差容差内删点，得到随弯曲度变化的自适应密度
+        keep = douglas_peucker(final, simplify_m)
+        print(f"✂️ 简化 (容差 {simplify_m:g} m): {format_stats(merge_stats([line_stats(final, keep)]))}")
+        final = final[keep]
+    final_points = final.tolist()
     
     res = {"river_name": f"{output_base} combined", "total_km": round(total_km/1000, 2), "point_count": len(final_points), "coordinates": final_points}
     with open(output_file, 'w', encoding='utf-8') as f: json.dump(res, f, ensure_ascii=False, separators=(',', ':'))
     print(f"💾 落地文件: {output_file}")
 
+def _lnglat(text):
+    lng, lat = (float(v) for v in text.split(','))
+    return [lng, lat]
+
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(); parser.add_argument('pattern'); parser.add_argument('output_base'); parser.add_argument('--spacing', type=int, default=50); args = parser.parse_args()
-    smart_merge(args.pattern, args.output_base, args.spacing)
+    parser = argparse.ArgumentParser(); parser.add_argument('pattern'); parser.add_argument('output_base'); parser.add_argument('--spacing', type=int, default=50)
+    parser.add_argument('--mode', choices=['index', 'greedy', 'graph'], default='index',
+                        help='index: 端点 KD 树拼接（默认）；greedy: 逐段全扫描；graph: 河网图 Dijkstra 主干提取')
+    parser.add_argument('--snap-m', type=float, default=30.0, help='graph 模式端点吸附容差(米)，默认 30')
+    parser.add_argument('--gap-km', type=float, default=MAX_GAP_M / 1000, help='graph 模式允许直连桥接的最大断缺(km)，默认 50')
+    parser.add_argument('--source', type=_lnglat, default=None, help='graph 模式源头坐标 "lng,lat"，决定输出方向')
+    parser.add_argument('--mouth', type=_lnglat, default=None, help='graph 模式入海口坐标 "lng,lat"')
+    parser.add_argument('--interp', choices=['linear', 'geodesic'], default='linear',
+                        help='重采样插值方式：linear 经纬度线性插值（默认）；geodesic 沿测地线插值')
+    parser.add_argument('--no-cache', action='store_true', help='不读写 tools/out/cache 下的线段解析缓存')
+    parser.add_argument('--jobs', type=int, default=default_jobs(), help='并行解析源文件的进程数，1 为单进程，默认 CPU 核数')
+    parser.add_argument('--simplify-m', type=float, default=0.0, help='重采样后按该容差(米) Douglas–Peucker 简化，0 为不简化')
+    args = parser.parse_args()
+    smart_merge(args.pattern, args.output_base, args.spacing, args.mode,
+                snap_m=args.snap_m, gap_m=args.gap_km * 1000, source=args.source, mouth=args.mouth, interp=args.interp,
+                use_cache=not args.no_cache, jobs=args.jobs, simplify_m=args.simplify_m)
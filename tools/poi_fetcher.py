@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+逆地理批量请求引擎（asyncio）：N 个请求同时在途，令牌桶按 QPS 放行，结果按输入顺序交给写库回调。
+
+- 令牌桶：rate = 服务商真实 QPS 配额，容量 burst（默认 1，即严格匀速，任意 1 秒窗口不超过配额）；
+  桶初始为空，紧跟在探路请求之后也不会超额。
+- 在途上限：concurrency 个工作协程，各自把阻塞的 HTTP 调用放进同样大小的线程池；
+  单个请求慢只占一个槽位，其余槽位继续按令牌发请求，总耗时由 QPS 决定而非「延迟 × 点数」。
+- 缓存直通：可选 lookup(item) 先查本地响应缓存（geocode_cache），命中的点不拿令牌、不进线程池，直接进重排缓冲。
+- 失败原因：fetch 抛出的异常（约定为 FetchError，带可读原因）原样作为结果交给 on_result，由调用方记入任务表（poi_jobs）；
+- 顺序写入：结果先进重排缓冲，按下标连续交给 on_result（在事件循环线程、即调用方线程执行，可直接用 sqlite 连接）；
+  为防队头请求卡住时缓冲无限增长，领先已写位置超过 window 个的请求暂不发出。
+
+fetch_river_pois.py / fetch_river_pois_overseas.py 通过 --qps / --concurrency 使用。
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FetchError(Exception):
+    """单个点请求失败（网络错误、服务商返回异常等），消息即记入任务表的 error。"""
+
+
+class TokenBucket:
+    """令牌桶限速器：每秒补 rate 个令牌，最多存 burst 个；acquire 拿到一个令牌才返回。"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate 须大于 0")
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self.tokens = 0.0
+        self.last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    async def acquire(self):
+        # 排队拿令牌，先到先得
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def _run(items, fetch, on_result, qps, concurrency, burst, window, lookup):
+    bucket = TokenBucket(qps, burst)
+    loop = asyncio.get_running_loop()
+    results = {}
+    state = {"next_fetch": 0, "next_write": 0, "cached": 0}
+    cond = asyncio.Condition()
+    errors = []
+
+    def flush():
+        while state["next_write"] in results:
+            i = state["next_write"]
+            on_result(i, items[i], results.pop(i))
+            state["next_write"] += 1
+
+    async def worker(pool):
+        while True:
+            async with cond:
+                # 领先已写位置过多时等待，限制重排缓冲大小
+                await cond.wait_for(lambda: state["next_fetch"] >= len(items)
+                                    or state["next_fetch"] < state["next_write"] + window)
+                if state["next_fetch"] >= len(items):
+                    return
+                i = state["next_fetch"]
+                state["next_fetch"] += 1
+            # 缓存命中只是一次本地 SQLite 查询，不占配额，跳过令牌桶
+            result = lookup(items[i]) if lookup is not None else None
+            if result is not None:
+                state["cached"] += 1
+            else:
+                await bucket.acquire()
+                try:
+                    result = await loop.run_in_executor(pool, fetch, items[i])
+                except Exception as e:
+                    # 失败不中断整批：异常作为结果交给 on_result，由调用方记录原因
+                    errors.append((i, e))
+                    result = e
+            async with cond:
+                results[i] = result
+                flush()
+                cond.notify_all()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        await asyncio.gather(*(worker(pool) for _ in range(min(concurrency, len(items)) or 1)))
+    return errors, state["cached"]
+
+
+def fetch_ordered(items, fetch, on_result, qps: float, concurrency: int = 4, burst: int = 1, window: int | None = None,
+                  lookup=None) -> dict:
+    """
+    items: 待请求的输入列表；fetch(item) -> 结果（阻塞函数，在线程池中执行，失败抛 FetchError）；
+    lookup(item) -> 缓存中的结果或 None（未命中），可选；
+    on_result(index, item, result) 按 items 顺序逐个回调，失败时 result 为 fetch 抛出的异常。返回 {"requests", "cached", "errors", "elapsed_s", "qps"}，
+    requests 只计真正发出的网络请求，qps 为其实际速率。
+    """
+    items = list(items)
+    if concurrency < 1:
+        raise ValueError("concurrency 须不小于 1")
+    t0 = time.perf_counter()
+    errors, cached = asyncio.run(_run(items, fetch, on_result, qps, concurrency, burst, window or concurrency * 4, lookup)) if items else ([], 0)
+    elapsed = time.perf_counter() - t0
+    requests = len(items) - cached
+    return {
+        "requests": requests,
+        "cached": cached,
+        "errors": len(errors),
+        "elapsed_s": elapsed,
+        "qps": requests / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def add_rate_args(parser, default_concurrency: int = 4):
+    """--qps / --concurrency / --burst；未指定 --qps 时由调用方按 --delay 推算（兼容旧用法）。"""
+    parser.add_argument("--qps", type=float, default=None, help="每秒请求数上限（按服务商配额填写）；不填则取 1/--delay")
+    parser.add_argument("--concurrency", type=int, default=default_concurrency, help=f"同时在途请求数，默认 {default_concurrency}")
+    parser.add_argument("--burst", type=int, default=1, help="令牌桶容量，默认 1（严格匀速）")
+
+
+def resolve_qps(args) -> float:
+    if args.qps is not None:
+        if args.qps <= 0:
+            raise SystemExit("--qps 须大于 0")
+        return args.qps
+    if args.delay <= 0:
+        raise SystemExit("--delay 为 0 时请用 --qps 指定速率")
+    return 1.0 / args.delay
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+POI 采集任务表（断点续跑）：在输出 DB 中建 poi_jobs 表，记录每个计划采样点的状态。
+
+  pending  已计划、尚未得到结果（含上次运行中途退出未提交的点）
+  ok       请求成功且有地址或 POI，river_pois 已写入
+  empty    请求成功但服务商无地址、无 POI（真实的「这里什么都没有」），river_pois 写入空行
+  failed   请求失败（超配额、网络错误、Key 无效等），记录 error 与 attempts，river_pois 不写空行
+
+主键 (numeric_id, distance_km, source)：distance_km 与 river_pois 一致（保留 2 位小数）；
+source 区分高德（amap）与海外（geoapify），海外脚本补全高德 empty 的点时两者状态互不覆盖。
+状态与 river_pois 在同一连接、同一事务中提交，进程中途退出时未提交的点仍为 pending。
+
+fetch_river_pois.py / fetch_river_pois_overseas.py 加 --resume：只请求本次采样计划中 pending / failed 的点；
+本次计划中仍有 pending / failed 时两个脚本以非零状态退出，提示 DB 有缺口。
+
+用法（在项目根目录）:
+  python3 tools/poi_jobs.py --db tools/out/rivtrek_base.db             # 各河流、各来源的状态统计
+  python3 tools/poi_jobs.py --db tools/out/rivtrek_base.db --failed    # 列出失败点与原因
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PENDING, OK, EMPTY, FAILED = "pending", "ok", "empty", "failed"
+STATUSES = (PENDING, OK, EMPTY, FAILED)
+DONE = (OK, EMPTY)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS poi_jobs (
+    numeric_id INTEGER NOT NULL,
+    distance_km REAL NOT NULL,
+    source TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL,
+    PRIMARY KEY (numeric_id, distance_km, source)
+)
+"""
+
+
+def ensure_table(conn):
+    conn.execute(_SCHEMA)
+    conn.commit()
+
+
+def plan(conn, numeric_id: int, source: str, items, resume: bool) -> list:
+    """
+    items: [(lat, lon, distance_km 已保留 2 位), ...]，登记为本次计划并返回需要请求的点。
+    resume=False：全部重置为 pending 并全部返回；resume=True：只返回尚未 ok / empty 的点（新点登记为 pending）。
+    """
+    now = time.time()
+    if resume:
+        conn.executemany(
+            "INSERT OR IGNORE INTO poi_jobs (numeric_id, distance_km, source, latitude, longitude, status, updated_at) VALUES (?,?,?,?,?,?,?)",
+            [(numeric_id, d, source, lat, lon, PENDING, now) for lat, lon, d in items],
+        )
+        done = {r[0] for r in conn.execute(
+            f"SELECT distance_km FROM poi_jobs WHERE numeric_id=? AND source=? AND status IN ({','.join('?' * len(DONE))})",
+            (numeric_id, source) + DONE,
+        )}
+        todo = [it for it in items if it[2] not in done]
+    else:
+        conn.executemany(
+            "INSERT INTO poi_jobs (numeric_id, distance_km, source, latitude, longitude, status, updated_at) VALUES (?,?,?,?,?,?,?) "
+            "ON CONFLICT (numeric_id, distance_km, source) DO UPDATE SET status=excluded.status, error=NULL, updated_at=excluded.updated_at",
+            [(numeric_id, d, source, lat, lon, PENDING, now) for lat, lon, d in items],
+        )
+        todo = list(items)
+    conn.commit()
+    return todo
+
+
+def mark(conn, numeric_id: int, source: str, distance_km: float, status: str, error: str | None = None):
+    """记录一次请求结果（attempts + 1）；不单独提交，随调用方的批量提交一起落盘。"""
+    conn.execute(
+        "UPDATE poi_jobs SET status=?, error=?, attempts=attempts + 1, updated_at=? WHERE numeric_id=? AND distance_km=? AND source=?",
+        (status, error, time.time(), numeric_id, distance_km, source),
+    )
+
+
+def summary(conn, numeric_id: int, source: str, items=None) -> dict:
+    """{status: count}；传 items 时只统计这些点（本次采样计划）。"""
+    counts = dict.fromkeys(STATUSES, 0)
+    rows = conn.execute("SELECT distance_km, status FROM poi_jobs WHERE numeric_id=? AND source=?", (numeric_id, source))
+    wanted = None if items is None else {it[2] for it in items}
+    for d, status in rows:
+        if wanted is None or d in wanted:
+            counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def unfinished(counts: dict) -> int:
+    """failed + pending：river_pois 在这些里程处没有行。"""
+    return counts[FAILED] + counts[PENDING]
+
+
+def format_summary(counts: dict) -> str:
+    line = f"  📋 任务: ok {counts[OK]} / empty {counts[EMPTY]} / failed {counts[FAILED]} / pending {counts[PENDING]}"
+    n = unfinished(counts)
+    if n:
+        line += (f"\n  ⚠️ 仍有 {n} 个点未完成，DB 在这些里程处缺行，getNearestPoi 的覆盖不连续；"
+                 f"原命令加 --resume 重跑即可只补这些点")
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="POI 采集任务表：状态统计 / 失败点")
+    parser.add_argument("--db", default=os.path.join(ROOT, "tools", "out", "rivtrek_base.db"), help="输出 DB 路径")
+    parser.add_argument("--failed", action="store_true", help="列出失败点与原因")
+    args = parser.parse_args()
+    if not os.path.isfile(args.db):
+        raise SystemExit(f"文件不存在: {args.db}")
+    conn = sqlite3.connect(args.db)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='poi_jobs'").fetchone():
+        print("该 DB 尚无 poi_jobs 表（未用带任务表的脚本采集过）")
+        return
+    rows = conn.execute("SELECT numeric_id, source, status, COUNT(*) FROM poi_jobs GROUP BY numeric_id, source, status ORDER BY numeric_id, source")
+    grouped = {}
+    for numeric_id, source, status, n in rows:
+        g = grouped.setdefault((numeric_id, source), dict.fromkeys(STATUSES, 0))
+        g[status] = n
+    for (numeric_id, source), counts in grouped.items():
+        print(f"🏞️ numeric_id={numeric_id} {source}")
+        print(format_summary(counts))
+    if args.failed:
+        for numeric_id, source, d, lat, lon, attempts, error in conn.execute(
+            "SELECT numeric_id, source, distance_km, latitude, longitude, attempts, error FROM poi_jobs WHERE status=? ORDER BY numeric_id, source, distance_km",
+            (FAILED,),
+        ):
+            print(f"  ❌ {numeric_id} {source} {d:>9.2f} km ({lat:.5f}, {lon:.5f}) 尝试 {attempts} 次: {error}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+点位文件的二进制容器（.bin），与 *_points.json 内容一一对应，编解码全部是 NumPy 数组运算。
+
+布局（小端）:
+  header   magic "RVPT" | version u16 | flags u16 | section_count u32 | point_count u32
+           | correction_coefficient f64 | name_len u16 | river_name (UTF-8)
+  table    每段 point_count u32 | coord_offset u32 | coord_length u32
+           [ | km_offset u32 | km_length u32 ]（flags & FLAG_KM）
+  data     各段数据块，offset 相对 data 起点
+  crc      CRC32 u32，覆盖之前的全部字节（flags & FLAG_CRC）
+
+坐标：经纬度 × 1e6 取整为 int32 定点（与 JSON 的 6 位小数等价），段内按点交错 lng, lat，
+与前一点作差（段首点与 0 作差即绝对值），zigzag 后按 LEB128 varint 写出。
+里程列（sections_km）：× 1000 取整为米，段内同样 delta + zigzag + varint。
+任一段可按偏移表直接定位解码，不需要读前面的段。
+
+用法（在项目根目录）:
+  python3 tools/points_binary.py encode assets/json/rivers/yangtze_points.json      # 输出同名 .bin
+  python3 tools/points_binary.py decode assets/json/rivers/yangtze_points.bin -o /tmp/y.json
+  python3 tools/points_binary.py validate assets/json/rivers/*_points.json          # 编码→解码逐点比对
+  python3 tools/points_binary.py bench                                            # config 中全部河流
+"""
+import argparse
+import gzip
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, "assets", "json", "rivers", "rivers_config.json")
+
+MAGIC = b"RVPT"
+VERSION = 1
+FLAG_CRC = 1
+FLAG_KM = 2
+
+COORD_SCALE = 1_000_000
+KM_SCALE = 1000
+
+_HEADER = struct.Struct("<4sHHIIdH")
+_ENTRY = struct.Struct("<III")
+_ENTRY_KM = struct.Struct("<IIIII")
+_MAX_VARINT_BYTES = 10
+
+
+def zigzag(v: np.ndarray) -> np.ndarray:
+    v = v.astype(np.int64)
+    return ((v << 1) ^ (v >> 63)).astype(np.uint64)
+
+
+def unzigzag(z: np.ndarray) -> np.ndarray:
+    z = z.astype(np.uint64)
+    return (z >> np.uint64(1)).astype(np.int64) ^ -(z & np.uint64(1)).astype(np.int64)
+
+
+def varint_encode(z: np.ndarray) -> bytes:
+    """无符号整数数组 -> LEB128 字节串（每字节低 7 位为数据，最高位表示后面还有字节）。"""
+    z = np.asarray(z, dtype=np.uint64)
+    if len(z) == 0:
+        return b""
+    nbytes = np.ones(len(z), dtype=np.int64)
+    for k in range(1, _MAX_VARINT_BYTES):
+        nbytes += z >= np.uint64(1 << (7 * k))
+    pos = np.cumsum(nbytes) - nbytes
+    out = np.zeros(int(nbytes.sum()), dtype=np.uint8)
+    for k in range(int(nbytes.max())):
+        m = nbytes > k
+        byte = (z[m] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        byte |= np.where(nbytes[m] > k + 1, np.uint64(0x80), np.uint64(0))
+        out[pos[m] + k] = byte.astype(np.uint8)
+    return out.tobytes()
+
+
+def varint_decode(buf) -> np.ndarray:
+    """LEB128 字节串 -> uint64 数组。"""
+    b = np.frombuffer(buf, dtype=np.uint8)
+    if len(b) == 0:
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(b < 0x80)
+    if len(ends) == 0 or ends[-1] != len(b) - 1:
+        raise ValueError("varint 数据被截断")
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    width = ends - starts + 1
+    out = np.zeros(len(ends), dtype=np.uint64)
+    for k in range(int(width.max())):
+        m = width > k
+        out[m] |= (b[starts[m] + k].astype(np.uint64) & np.uint64(0x7F)) << np.uint64(7 * k)
+    return out
+
+
+def _encode_deltas(q: np.ndarray) -> bytes:
+    """(N, C) 整数数组按行作差（首行与 0 作差）后展平编码。"""
+    d = np.diff(q, axis=0, prepend=np.zeros((1, q.shape[1]), dtype=q.dtype))
+    return varint_encode(zigzag(d.ravel()))
+
+
+def _decode_deltas(buf, columns: int) -> np.ndarray:
+    return np.cumsum(unzigzag(varint_decode(buf)).reshape(-1, columns), axis=0)
+
+
+def encode_points(data: dict, crc: bool = True, with_km: bool = True) -> bytes:
+    """点位 dict（json.load 的结果，或 sections_points 为数组列表）-> .bin 字节串。"""
+    sections = [np.asarray(s, dtype=np.float64).reshape(-1, 2) for s in data["sections_points"]]
+    kms = data.get("sections_km") if with_km else None
+    flags = (FLAG_CRC if crc else 0) | (FLAG_KM if kms is not None else 0)
+    name = str(data.get("river_name", "")).encode("utf-8")
+
+    blobs, table = [], []
+    offset = 0
+    for i, s in enumerate(sections):
+        coord = _encode_deltas(np.round(s * COORD_SCALE).astype(np.int64))
+        entry = [len(s), offset, len(coord)]
+        blobs.append(coord)
+        offset += len(coord)
+        if kms is not None:
+            km = _encode_deltas(np.round(np.asarray(kms[i], dtype=np.float64) * KM_SCALE).astype(np.int64).reshape(-1, 1))
+            entry += [offset, len(km)]
+            blobs.append(km)
+            offset += len(km)
+        table.append(entry)
+
+    entry_struct = _ENTRY_KM if kms is not None else _ENTRY
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, flags, len(sections), sum(len(s) for s in sections),
+                     float(data.get("correction_coefficient", 1.0)), len(name)),
+        name,
+        b"".join(entry_struct.pack(*e) for e in table),
+        *blobs,
+    ]
+    body = b"".join(parts)
+    if crc:
+        body += struct.pack("<I", zlib.crc32(body))
+    return body
+
+
+class PointsBinary:
+    """已读入的 .bin：头部与偏移表即时解析，各段数据按需解码。"""
+
+    def __init__(self, buf, verify_crc: bool = True):
+        buf = memoryview(buf)
+        magic, version, flags, n_sections, n_points, coef, name_len = _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("不是点位二进制文件（magic 不符）")
+        if version != VERSION:
+            raise ValueError(f"不支持的版本: {version}")
+        end = len(buf)
+        if flags & FLAG_CRC:
+            end -= 4
+            if verify_crc:
+                (stored,) = struct.unpack_from("<I", buf, end)
+                if zlib.crc32(buf[:end]) != stored:
+                    raise ValueError("CRC 校验失败")
+        pos = _HEADER.size
+        self.river_name = bytes(buf[pos:pos + name_len]).decode("utf-8")
+        pos += name_len
+        self.flags = flags
+        self.correction_coefficient = coef
+        self.point_count = n_points
+        self.has_km = bool(flags & FLAG_KM)
+        width = 5 if self.has_km else 3
+        self.table = np.frombuffer(buf, dtype="<u4", count=n_sections * width, offset=pos).reshape(n_sections, width)
+        self._data = buf[pos + self.table.nbytes:end]
+
+    def __len__(self):
+        return len(self.table)
+
+    def section(self, i: int) -> np.ndarray:
+        """第 i 段坐标 (N, 2) float64。"""
+        n, off, length = (int(v) for v in self.table[i, :3])
+        q = _decode_deltas(self._data[off:off + length], 2)
+        if len(q) != n:
+            raise ValueError(f"第 {i} 段点数不符: {len(q)} != {n}")
+        return q / COORD_SCALE
+
+    def section_km(self, i: int) -> np.ndarray | None:
+        if not self.has_km:
+            return None
+        off, length = (int(v) for v in self.table[i, 3:5])
+        return _decode_deltas(self._data[off:off + length], 1)[:, 0] / KM_SCALE
+
+    def to_dict(self) -> dict:
+        """还原为与点位 JSON 相同结构的 dict（数组仍为 NumPy）。"""
+        out = {
+            "river_name": self.river_name,
+            "correction_coefficient": self.correction_coefficient,
+            "sections_points": [self.section(i) for i in range(len(self))],
+        }
+        if self.has_km:
+            out["sections_km"] = [self.section_km(i) for i in range(len(self))]
+        return out
+
+
+def read_points_binary(path: str, verify_crc: bool = True) -> PointsBinary:
+    with open(path, "rb") as f:
+        return PointsBinary(f.read(), verify_crc=verify_crc)
+
+
+def decode_points(buf, verify_crc: bool = True) -> dict:
+    return PointsBinary(buf, verify_crc=verify_crc).to_dict()
+
+
+def binary_path(points_path: str) -> str:
+    return os.path.splitext(points_path)[0] + ".bin"
+
+
+def validate(data: dict, buf: bytes) -> list[str]:
+    """逐段比对原始点位与解码结果；返回问题列表，空表示一致（6 位小数坐标、3 位小数里程应完全相等）。"""
+    errors = []
+    dec = decode_points(buf)
+    if dec["river_name"] != data.get("river_name", ""):
+        errors.append("river_name 不一致")
+    if dec["correction_coefficient"] != float(data.get("correction_coefficient", 1.0)):
+        errors.append("correction_coefficient 不一致")
+    if len(dec["sections_points"]) != len(data["sections_points"]):
+        return errors + ["段数不一致"]
+    for i, (a, b) in enumerate(zip(data["sections_points"], dec["sections_points"])):
+        a = np.asarray(a, dtype=np.float64).reshape(-1, 2)
+        if a.shape != b.shape:
+            errors.append(f"第 {i} 段点数不一致")
+        elif not np.array_equal(a, b):
+            diff = float(np.max(np.abs(a - b)))
+            if diff > 0.5 / COORD_SCALE:
+                errors.append(f"第 {i} 段坐标偏差 {diff:.2e}°")
+    if "sections_km" in data:
+        for i, (a, b) in enumerate(zip(data["sections_km"], dec.get("sections_km") or [])):
+            if not np.array_equal(np.asarray(a, dtype=np.float64), b):
+                errors.append(f"第 {i} 段里程不一致")
+    return errors
+
+
+def _config_points_paths() -> list[str]:
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        rivers = json.load(f).get("rivers") or []
+    return [os.path.join(ROOT, *r["points_json_path"].split("/")) for r in rivers]
+
+
+def _best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench(paths) -> list[dict]:
+    rows = []
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        buf = encode_points(data)
+        t_json = _best_of(lambda: json.loads(raw))
+        t_bin = _best_of(lambda: decode_points(buf))
+        t_head = _best_of(lambda: PointsBinary(buf, verify_crc=False))
+        rows.append({
+            "file": os.path.basename(path),
+            "json_bytes": len(raw), "json_gzip": len(gzip.compress(raw, 6)),
+            "bin_bytes": len(buf), "bin_gzip": len(gzip.compress(buf, 6)),
+            "json_parse_ms": t_json * 1000, "bin_decode_ms": t_bin * 1000, "bin_open_ms": t_head * 1000,
+        })
+    print(f"{'文件':<28}{'JSON':>10}{'JSON.gz':>10}{'BIN':>10}{'BIN.gz':>10}{'压缩比':>8}"
+          f"{'JSON解析':>10}{'BIN解码':>10}{'BIN打开':>10}")
+    for r in rows:
+        print(f"{r['file']:<28}{r['json_bytes'] / 1e6:>9.2f}M{r['json_gzip'] / 1e6:>9.2f}M"
+              f"{r['bin_bytes'] / 1e6:>9.2f}M{r['bin_gzip'] / 1e6:>9.2f}M{r['json_bytes'] / r['bin_bytes']:>7.1f}x"
+              f"{r['json_parse_ms']:>8.1f}ms{r['bin_decode_ms']:>8.1f}ms{r['bin_open_ms']:>8.2f}ms")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="点位二进制容器：编码 / 解码 / 校验 / 基准")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("encode", help="*_points.json -> .bin")
+    p.add_argument("files", nargs="+")
+    p.add_argument("-o", "--output", help="输出路径（仅单个输入时），默认与输入同名 .bin")
+    p.add_argument("--no-crc", action="store_true", help="不写 CRC32")
+    p.add_argument("--no-km", action="store_true", help="不写 sections_km 列")
+    p = sub.add_parser("decode", help=".bin -> JSON")
+    p.add_argument("file")
+    p.add_argument("-o", "--output", required=True)
+    p = sub.add_parser("validate", help="编码后解码逐点比对")
+    p.add_argument("files", nargs="+")
+    p = sub.add_parser("bench", help="与 JSON 比较体积与解析耗时")
+    p.add_argument("files", nargs="*", help="默认 rivers_config 中全部点位文件")
+    p.add_argument("--report", help="结果写成 JSON")
+    args = parser.parse_args()
+
+    if args.cmd == "encode":
+        for path in args.files:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            buf = encode_points(data, crc=not args.no_crc, with_km=not args.no_km)
+            out = args.output if args.output and len(args.files) == 1 else binary_path(path)
+            with open(out, "wb") as f:
+                f.write(buf)
+            print(f"💾 {out}: {os.path.getsize(path) / 1e6:.2f} MB → {len(buf) / 1e6:.2f} MB")
+    elif args.cmd == "decode":
+        dec = read_points_binary(args.file).to_dict()
+        dec["sections_points"] = [s.tolist() for s in dec["sections_points"]]
+        if "sections_km" in dec:
+            dec["sections_km"] = [k.tolist() for k in dec["sections_km"]]
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(dec, ensure_ascii=False, separators=(",", ":")))
+        print(f"💾 {args.output}")
+    elif args.cmd == "validate":
+        failed = 0
+        for path in args.files:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            errors = validate(data, encode_points(data))
+            failed += bool(errors)
+            print(f"{'✅' if not errors else '❌'} {os.path.basename(path)}" + ("" if not errors else f": {errors[:5]}"))
+        sys.exit(1 if failed else 0)
+    else:
+        rows = bench(args.files or _config_points_paths())
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+按 sub_section 切片的点位分片：每段一个小 JSON（points 与可选的 km），外加一个索引文件，
+记录各分片路径、点数、包围盒与里程范围。App 启动 / 切换河流时只需读索引与当前段及相邻段的分片，
+内存占用与河流长度无关。
+
+目录：assets/json/rivers/shards/<base>/
+  <base>_index.json    {"river_name", "correction_coefficient", "section_count", "point_count", "shards": [...]}
+  <base>_000.json ...  {"section_index", "sub_section_id", "points": [[lng, lat], ...], "km": [...]}
+
+pubspec.yaml 只打包 assets/json/rivers/ 这一层，分片子目录要被 App 使用时需在 pubspec 中单独列出。
+由 align_and_split.py --shards 生成；也可 python3 tools/points_shards.py <base> 查看索引摘要。
+"""
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+
+SHARD_ROOT = "assets/json/rivers/shards"
+# 分片文本格式变化时加一，旧分片在增量模式下一并重写
+SHARD_VERSION = 1
+
+_SEPARATORS = (',', ':')
+
+
+def shard_dir(base: str) -> str:
+    return f"{SHARD_ROOT}/{base}"
+
+
+def index_path(base: str) -> str:
+    return f"{shard_dir(base)}/{base}_index.json"
+
+
+def shard_path(base: str, i: int) -> str:
+    return f"{shard_dir(base)}/{base}_{i:03d}.json"
+
+
+def shard_signature(header: dict, sub: dict, km_tag: str | None) -> str:
+    """
+    分片中与点下标范围无关、却决定分片内容的因素：格式版本、是否带 km 及其取值依据、sub_section_id、索引头字段。
+    增量模式下只有范围与签名都没变的分片才可跳过。
+    """
+    return json.dumps([SHARD_VERSION, km_tag, sub.get("sub_section_id"), header],
+                      ensure_ascii=False, sort_keys=True, separators=_SEPARATORS)
+
+
+def build_shards(base: str, header: dict, coords, km, ranges, sub_sections):
+    """
+    coords: (N, 2) 全程点；km: (N,) 每点累计挑战里程或 None；ranges: 每段 (start, stop) 或 None。
+    返回 (索引 dict, [(分片路径, 生成分片文本的函数), ...])，文本按需生成，调用方可跳过未变化的段。
+    """
+    entries, shards = [], []
+    for i, rng in enumerate(ranges):
+        sub = sub_sections[i] if i < len(sub_sections) else {}
+        start, stop = rng if rng else (0, 0)
+        pts = coords[start:stop]
+        entry = {
+            "index": i,
+            "sub_section_id": sub.get("sub_section_id"),
+            "path": shard_path(base, i),
+            "points": int(stop - start),
+            "bbox": np.round(np.r_[pts.min(axis=0), pts.max(axis=0)], 6).tolist() if len(pts) else None,
+            "km_range": [float(km[start]), float(km[stop - 1])] if km is not None and len(pts) else None,
+        }
+        entries.append(entry)
+
+        def text(i=i, start=start, stop=stop, sub=sub):
+            shard = {"section_index": i, "sub_section_id": sub.get("sub_section_id"),
+                     "points": coords[start:stop].tolist()}
+            if km is not None:
+                shard["km"] = km[start:stop].tolist()
+            return json.dumps(shard, ensure_ascii=False, separators=_SEPARATORS)
+        shards.append((entry["path"], text))
+    index = {
+        **header,
+        "section_count": len(ranges),
+        "point_count": int(sum(e["points"] for e in entries)),
+        "shards": entries,
+    }
+    return index, shards
+
+
+def stale_shards(base: str, count: int) -> list[str]:
+    """段数减少后残留的多余分片。"""
+    keep = {os.path.normpath(shard_path(base, i)) for i in range(count)}
+    keep.add(os.path.normpath(index_path(base)))
+    return [p for p in glob.glob(f"{shard_dir(base)}/{base}_*.json") if os.path.normpath(p) not in keep]
+
+
+def load_index(base: str) -> dict:
+    with open(index_path(base), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_shard(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def shard_for_km(index: dict, km: float) -> int:
+    """按 km_range 二分查找里程所在分片下标（超出范围时夹到首尾）。"""
+    ends = [e["km_range"][1] if e["km_range"] else float("-inf") for e in index["shards"]]
+    lo, hi = 0, len(ends) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if ends[mid] < km:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="点位分片索引摘要")
+    parser.add_argument("base", help='河流基础名，如 "nu_river"')
+    parser.add_argument("--km", type=float, help="查询该里程所在分片")
+    args = parser.parse_args()
+    index = load_index(args.base)
+    sizes = [os.path.getsize(e["path"]) for e in index["shards"] if os.path.isfile(e["path"])]
+    print(f"📦 {index['river_name']}: {index['section_count']} 个分片 / {index['point_count']} 点，"
+          f"单片 {min(sizes) / 1e3:.1f}–{max(sizes) / 1e3:.1f} KB，索引 {os.path.getsize(index_path(args.base)) / 1e3:.1f} KB")
+    if args.km is not None:
+        e = index["shards"][shard_for_km(index, args.km)]
+        print(f"📍 {args.km} km → #{e['index']} {e['path']} ({e['points']} 点, {e['km_range']})")
+
+
+if __name__ == "__main__":
+    main()
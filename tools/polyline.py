@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Google Encoded Polyline 编解码（精度 5 或 6 位小数），NumPy 向量化实现。
+点序按算法约定为 (lat, lng)，本模块对外统一收发 [[lng, lat], ...]，内部转换。
+
+纯 ASCII（字符 63–126），可直接嵌入 HTML / JSON / 分享链接，适合二进制容器不方便的场合；
+6 位小数的点位用 precision=6 无损，precision=5 约 1 m 精度、体积再小一些。
+
+用法（在项目根目录）:
+  python3 tools/polyline.py encode assets/json/rivers/yangtze_points.json -o /tmp/yangtze_polyline.json
+  python3 tools/polyline.py decode /tmp/yangtze_polyline.json -o /tmp/yangtze_points.json
+  python3 tools/polyline.py bench                         # config 中全部点位文件
+JS 解码见 JS_DECODER（visualize_final.py --polyline 内嵌使用）。
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from points_binary import unzigzag, zigzag
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(ROOT, "assets", "json", "rivers", "rivers_config.json")
+
+DEFAULT_PRECISION = 6
+_MAX_CHUNKS = 7
+
+JS_DECODER = """
+function decodePolyline(str, precision) {
+  var factor = Math.pow(10, precision), index = 0, lat = 0, lng = 0, out = [];
+  while (index < str.length) {
+    var vals = [0, 0];
+    for (var k = 0; k < 2; k++) {
+      var shift = 0, result = 0, b;
+      do { b = str.charCodeAt(index++) - 63; result += (b & 0x1f) * Math.pow(2, shift); shift += 5; } while (b >= 0x20);
+      vals[k] = (result % 2) ? -(result + 1) / 2 : result / 2;
+    }
+    lat += vals[0]; lng += vals[1];
+    out.push([lat / factor, lng / factor]);
+  }
+  return out;
+}
+"""
+
+
+def _chunks_encode(z: np.ndarray) -> bytes:
+    """无符号整数 -> 5 位一组、低位在前，非末组置 0x20，每组 +63。"""
+    z = np.asarray(z, dtype=np.uint64)
+    if len(z) == 0:
+        return b""
+    n = np.ones(len(z), dtype=np.int64)
+    for k in range(1, _MAX_CHUNKS):
+        n += z >= np.uint64(1 << (5 * k))
+    pos = np.cumsum(n) - n
+    out = np.zeros(int(n.sum()), dtype=np.uint8)
+    for k in range(int(n.max())):
+        m = n > k
+        c = (z[m] >> np.uint64(5 * k)) & np.uint64(0x1F)
+        c |= np.where(n[m] > k + 1, np.uint64(0x20), np.uint64(0))
+        out[pos[m] + k] = (c + np.uint64(63)).astype(np.uint8)
+    return out.tobytes()
+
+
+def _chunks_decode(b: np.ndarray) -> np.ndarray:
+    v = b.astype(np.int64) - 63
+    if len(v) and (v.min() < 0 or v.max() > 63):
+        raise ValueError("非法的 polyline 字符")
+    ends = np.flatnonzero(v < 0x20)
+    if len(v) and (len(ends) == 0 or ends[-1] != len(v) - 1):
+        raise ValueError("polyline 被截断")
+    starts = np.r_[0, ends[:-1] + 1].astype(np.int64)
+    width = ends - starts + 1
+    out = np.zeros(len(ends), dtype=np.uint64)
+    for k in range(int(width.max()) if len(width) else 0):
+        m = width > k
+        out[m] |= (v[starts[m] + k].astype(np.uint64) & np.uint64(0x1F)) << np.uint64(5 * k)
+    return out
+
+
+def encode_polyline(coords, precision: int = DEFAULT_PRECISION) -> str:
+    """[[lng, lat], ...] -> polyline 字符串。"""
+    c = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(c) == 0:
+        return ""
+    # 与参考实现的 Math.round 一致：四舍五入（0.5 向上）
+    q = np.floor(c[:, ::-1] * 10 ** precision + 0.5).astype(np.int64)
+    d = np.diff(q, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return _chunks_encode(zigzag(d.ravel())).decode("ascii")
+
+
+def decode_polyline(text: str, precision: int = DEFAULT_PRECISION) -> np.ndarray:
+    """polyline 字符串 -> (N, 2) [[lng, lat], ...]。"""
+    b = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    if len(b) == 0:
+        return np.zeros((0, 2))
+    vals = unzigzag(_chunks_decode(b))
+    if len(vals) % 2:
+        raise ValueError("polyline 数值个数为奇数")
+    q = np.cumsum(vals.reshape(-1, 2), axis=0)
+    return q[:, ::-1] / 10 ** precision
+
+
+def encode_file(data: dict, precision: int = DEFAULT_PRECISION) -> dict:
+    """点位文件（sections_points）或原始路径文件（coordinates）-> polyline 版本，其余字段原样保留。"""
+    out = {k: v for k, v in data.items() if k not in ("sections_points", "coordinates")}
+    out["polyline_precision"] = precision
+    if "sections_points" in data:
+        out["sections_polyline"] = [encode_polyline(s, precision) for s in data["sections_points"]]
+    else:
+        out["polyline"] = encode_polyline(data["coordinates"], precision)
+    return out
+
+
+def decode_file(data: dict) -> dict:
+    precision = int(data.get("polyline_precision", DEFAULT_PRECISION))
+    out = {k: v for k, v in data.items() if k not in ("sections_polyline", "polyline", "polyline_precision")}
+    if "sections_polyline" in data:
+        out["sections_points"] = [decode_polyline(s, precision).tolist() for s in data["sections_polyline"]]
+    else:
+        out["coordinates"] = decode_polyline(data["polyline"], precision).tolist()
+    return out
+
+
+def _decode_arrays(data: dict) -> list[np.ndarray]:
+    """基准用：解码到 NumPy 数组为止（消费方通常直接用数组，不再转 Python 列表）。"""
+    precision = int(data.get("polyline_precision", DEFAULT_PRECISION))
+    lines = data["sections_polyline"] if "sections_polyline" in data else [data["polyline"]]
+    return [decode_polyline(s, precision) for s in lines]
+
+
+def _config_points_paths() -> list[str]:
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        rivers = json.load(f).get("rivers") or []
+    return [os.path.join(ROOT, *r["points_json_path"].split("/")) for r in rivers]
+
+
+def _best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench(paths, precisions=(5, 6)) -> list[dict]:
+    rows = []
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        key = "sections_points" if "sections_points" in data else "coordinates"
+        row = {"file": os.path.basename(path), "json_bytes": len(raw),
+               "json_parse_ms": _best_of(lambda: json.loads(raw)) * 1000}
+        for p in precisions:
+            enc = json.dumps(encode_file(data, p), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            row[f"p{p}_bytes"] = len(enc)
+            row[f"p{p}_decode_ms"] = _best_of(lambda: _decode_arrays(json.loads(enc))) * 1000
+            dec = decode_file(json.loads(enc))[key]
+            orig = data[key] if key == "coordinates" else [pt for s in data[key] for pt in s]
+            flat = dec if key == "coordinates" else [pt for s in dec for pt in s]
+            row[f"p{p}_max_err_deg"] = float(np.max(np.abs(np.asarray(orig)[:, :2] - np.asarray(flat)))) if orig else 0.0
+        rows.append(row)
+    print(f"{'文件':<28}{'JSON':>9}{'解析':>9}" + "".join(f"{'P' + str(p):>9}{'节省':>7}{'解码':>9}{'误差°':>10}" for p in precisions))
+    for r in rows:
+        line = f"{r['file']:<28}{r['json_bytes'] / 1e6:>8.2f}M{r['json_parse_ms']:>7.1f}ms"
+        for p in precisions:
+            line += (f"{r[f'p{p}_bytes'] / 1e6:>8.2f}M{(1 - r[f'p{p}_bytes'] / r['json_bytes']) * 100:>6.0f}%"
+                     f"{r[f'p{p}_decode_ms']:>7.1f}ms{r[f'p{p}_max_err_deg']:>10.1e}")
+        print(line)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encoded Polyline 编解码 / 基准")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("encode", help="点位 / 原始路径 JSON -> polyline JSON")
+    p.add_argument("file")
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("--precision", type=int, choices=[5, 6], default=DEFAULT_PRECISION)
+    p = sub.add_parser("decode", help="polyline JSON -> 坐标数组 JSON")
+    p.add_argument("file")
+    p.add_argument("-o", "--output", required=True)
+    p = sub.add_parser("bench", help="与 JSON 比较体积与解码耗时")
+    p.add_argument("files", nargs="*", help="默认 rivers_config 中全部点位文件")
+    p.add_argument("--report", help="结果写成 JSON")
+    args = parser.parse_args()
+
+    if args.cmd in ("encode", "decode"):
+        with open(args.file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        out = encode_file(data, args.precision) if args.cmd == "encode" else decode_file(data)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(out, ensure_ascii=False, separators=(",", ":")))
+        print(f"💾 {args.output}: {os.path.getsize(args.file) / 1e6:.2f} MB → {os.path.getsize(args.output) / 1e6:.2f} MB")
+    else:
+        rows = bench(args.files or _config_points_paths())
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
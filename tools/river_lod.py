@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+河流几何的多分辨率金字塔（LOD）：每条河一个文件，按固定分辨率分级，
+每级逐个 sub_section 用 Douglas–Peucker 简化（段首尾点保留，段间衔接不断），最大偏差不超过该级分辨率。
+只存比点位文件更粗的各级：需要 50 m 全量精度时直接读 *_points.json，不在 LOD 里再存一份。
+
+文件：assets/json/rivers/lod/<base>_lod.json
+  {"river_name", "correction_coefficient",
+   "levels": [{"resolution_m", "tolerance_m", "points", "max_dev_m", "mean_dev_m", "sections": [[[lng, lat], ...], ...]}, ...]}
+levels 按分辨率由细到粗排列。消费方按视野挑一级：全流域概览用 5 km / 50 km 级，几百个点即可；
+没有足够细的一级时回退到全量点位。
+与分片一样放在子目录，pubspec 未列出前不会打进 App 包。
+
+用法（在项目根目录）:
+  python3 tools/river_lod.py yangtze
+  python3 tools/river_lod.py --all --levels 200,2000,20000
+  align_and_split.py 中: --lod
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from simplify import douglas_peucker, line_stats, merge_stats
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RIVERS_DIR = os.path.join(ROOT, "assets", "json", "rivers")
+LOD_DIR = os.path.join(RIVERS_DIR, "lod")
+CONFIG_PATH = os.path.join(RIVERS_DIR, "rivers_config.json")
+
+DEFAULT_LEVELS_M = (500, 5000, 50000)
+
+
+def lod_path(base: str) -> str:
+    return os.path.join(LOD_DIR, f"{base}_lod.json")
+
+
+def build_lod(header: dict, sections, levels_m=DEFAULT_LEVELS_M) -> dict:
+    """sections: 各段 (N, 2) 点；返回 LOD 文件内容。"""
+    sections = [np.asarray(s, dtype=np.float64).reshape(-1, 2) for s in sections]
+    levels = []
+    for res in sorted(levels_m):
+        # 各级以分辨率为容差
+        tol = float(res)
+        out, stats = [], []
+        for s in sections:
+            keep = douglas_peucker(s, tol)
+            out.append(s[keep].tolist())
+            stats.append(line_stats(s, keep))
+        st = merge_stats(stats)
+        levels.append({
+            "resolution_m": res,
+            "tolerance_m": tol,
+            "points": st["points_out"],
+            "max_dev_m": st["max_dev_m"],
+            "mean_dev_m": st["mean_dev_m"],
+            "sections": out,
+        })
+    return {**header, "levels": levels}
+
+
+def write_lod(base: str, lod: dict) -> str:
+    os.makedirs(LOD_DIR, exist_ok=True)
+    path = lod_path(base)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(lod, ensure_ascii=False, separators=(",", ":")))
+    return path
+
+
+def pick_level(lod: dict, resolution_m: float):
+    """分辨率不超过 resolution_m 的最粗一级；都比它粗时返回 None（由调用方回退到全量点位）。"""
+    levels = sorted(lod["levels"], key=lambda lv: lv["resolution_m"])
+    chosen = None
+    for lv in levels:
+        if lv["resolution_m"] <= resolution_m:
+            chosen = lv
+    return chosen
+
+
+def load_lod_sections(base: str, resolution_m: float):
+    """读取 LOD 文件并返回匹配分辨率那一级的 (sections, 该级元数据)；文件不存在或没有足够细的一级时返回 (None, None)。"""
+    path = lod_path(base)
+    if not os.path.isfile(path):
+        return None, None
+    with open(path, "r", encoding="utf-8") as f:
+        lod = json.load(f)
+    lv = pick_level(lod, resolution_m)
+    if lv is None:
+        return None, None
+    return lv["sections"], {k: v for k, v in lv.items() if k != "sections"}
+
+
+def build_from_points(base: str, levels_m=DEFAULT_LEVELS_M) -> dict:
+    with open(os.path.join(RIVERS_DIR, f"{base}_points.json"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    header = {"river_name": data.get("river_name"), "correction_coefficient": data.get("correction_coefficient")}
+    return build_lod(header, data["sections_points"], levels_m)
+
+
+def print_table(base: str, lod: dict, path: str):
+    print(f"🗺️ {base}: {path} ({os.path.getsize(path) / 1e6:.2f} MB)")
+    for lv in lod["levels"]:
+        print(f"   {lv['resolution_m']:>6} m  {lv['points']:>7} 点  偏差 max {lv['max_dev_m']:.1f} m / 平均 {lv['mean_dev_m']:.1f} m")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成河流几何 LOD 金字塔")
+    parser.add_argument("bases", nargs="*", help='河流基础名，如 "yangtze"')
+    parser.add_argument("--all", action="store_true", help="rivers_config 中全部河流")
+    parser.add_argument("--levels", default=",".join(str(v) for v in DEFAULT_LEVELS_M), help="各级分辨率(米)，逗号分隔")
+    args = parser.parse_args()
+    levels = tuple(float(v) if "." in v else int(v) for v in args.levels.split(","))
+    bases = list(args.bases)
+    if args.all:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            rivers = json.load(f).get("rivers") or []
+        bases += [os.path.basename(r["points_json_path"]).replace("_points.json", "") for r in rivers]
+    if not bases:
+        parser.error("需要河流基础名或 --all")
+    for base in bases:
+        lod = build_from_points(base, levels)
+        print_table(base, lod, write_lod(base, lod))
+
+
+if __name__ == "__main__":
+    main()
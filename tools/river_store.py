@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+河流几何的内存映射存储：每个点位文件只解析一次，转成平铺的 .npy，之后用 np.load(mmap_mode='r') 打开，
+各段取的是映射数组上的切片（零拷贝），不再每次整份 json.load。
+
+目录：tools/out/store/<key>/（本地缓存，不入库）。assets/json/rivers 下的点位文件 key 即基础名（yangtze），
+其他位置的文件（如 --points 指向的临时副本）key 为「基础名-源路径哈希」，不会覆盖正式河流的 store。
+  coords.npy   float64 (N, 2)  各段点依次拼接 [[lng, lat], ...]（相邻段共用的收尾点各存一份，段切片与点位文件完全一致）
+  offsets.npy  int32 (S + 1)   第 i 段为 coords[offsets[i]:offsets[i + 1]]
+  km.npy       float64 (N,)    点位文件带 sections_km 时才有
+  meta.json    river_name / correction_coefficient 等标量字段，以及源点位文件的路径、大小、mtime、SHA-256
+
+打开时先比对源文件大小与 mtime（只 stat 不读文件），不一致再算 SHA-256，内容真的变了才重建；
+全部河流打开只需几毫秒。align_and_split.py 不碰 store：点位文件更新后，下次 open_points 发现过期时自动重建，
+也可运行本脚本预先构建。
+只读的可视化 / 校验脚本用 load_points：store 新鲜时内存映射，否则在内存中解析点位 JSON，不构建、不改写 store。
+
+用法（在项目根目录）:
+  python3 tools/river_store.py                 # config 中全部河流：按需重建并报告打开耗时
+  python3 tools/river_store.py yangtze --rebuild
+代码中:
+  from river_store import open_points
+  store = open_points("assets/json/rivers/yangtze_points.json")
+  store.section(3)      # (n, 2) 只读视图
+  store = load_points(path)   # 只读脚本：不写 tools/out/store
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from segment_cache import file_sha256
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(ROOT, "tools", "out", "store")
+RIVERS_DIR = os.path.join(ROOT, "assets", "json", "rivers")
+CONFIG_PATH = os.path.join(RIVERS_DIR, "rivers_config.json")
+STORE_VERSION = 1
+
+_ARRAYS = ("coords", "offsets", "km")
+
+
+def store_base(points_path: str) -> str:
+    """yangtze_points.json -> yangtze"""
+    name = os.path.basename(points_path)
+    return name[:-len("_points.json")] if name.endswith("_points.json") else os.path.splitext(name)[0]
+
+
+def store_key(points_path: str) -> str:
+    """store 目录名：assets/json/rivers 下的文件为基础名，其他位置加源路径哈希，同名文件互不覆盖。"""
+    base = store_base(points_path)
+    src = os.path.realpath(points_path)
+    if os.path.dirname(src) == os.path.realpath(RIVERS_DIR):
+        return base
+    return f"{base}-{hashlib.sha1(src.encode('utf-8')).hexdigest()[:8]}"
+
+
+def store_dir(key: str) -> str:
+    return os.path.join(STORE_DIR, key)
+
+
+def store_files(key: str) -> list[str]:
+    """store 中已存在的 .npy 文件。"""
+    return [p for p in (os.path.join(store_dir(key), f"{a}.npy") for a in _ARRAYS) if os.path.isfile(p)]
+
+
+def _source_stat(points_path: str) -> dict:
+    st = os.stat(points_path)
+    return {"path": os.path.abspath(points_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _replace_with(path: str, write, mode: str = "wb"):
+    """写独立的临时文件再原子替换：并发打开同一条河时不会读到或覆盖半成品。"""
+    with tempfile.NamedTemporaryFile(mode, dir=os.path.dirname(path), prefix=os.path.basename(path) + ".",
+                                     suffix=".tmp", delete=False, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        tmp = f.name
+        try:
+            write(f)
+        except BaseException:
+            f.close(); os.remove(tmp); raise
+    os.replace(tmp, path)
+
+
+def _save_array(path: str, arr: np.ndarray):
+    _replace_with(path, lambda f: np.save(f, arr))
+
+
+def _save_meta(d: str, meta: dict):
+    _replace_with(os.path.join(d, "meta.json"), lambda f: json.dump(meta, f, ensure_ascii=False, indent=1), "w")
+
+
+def _scalar_header(header: dict) -> dict:
+    return {k: v for k, v in header.items() if not isinstance(v, (list, dict))}
+
+
+def _pack(sections, sections_km=None):
+    """各段点（与里程）拼成 (coords, offsets, km)，km 无则为 None。"""
+    sections = [np.asarray(s, dtype=np.float64).reshape(-1, 2) for s in sections]
+    counts = np.array([len(s) for s in sections], dtype=np.int64)
+    offsets = np.r_[0, np.cumsum(counts)]
+    if offsets[-1] > np.iinfo(np.int32).max:
+        raise ValueError(f"点数 {offsets[-1]} 超出 int32 偏移表范围")
+    coords = np.ascontiguousarray(np.concatenate(sections)) if sections else np.zeros((0, 2))
+    km = None
+    if sections_km is not None:
+        km = np.concatenate([np.asarray(s, dtype=np.float64).ravel() for s in sections_km]) if sections_km else np.zeros(0)
+        if len(km) != len(coords):
+            raise ValueError(f"sections_km 点数 {len(km)} 与 sections_points 点数 {len(coords)} 不一致")
+    return coords, offsets.astype(np.int32), km
+
+
+def write_store(points_path: str, header: dict, sections, sections_km=None, sha256: str | None = None) -> str:
+    """
+    sections: 各段 (n, 2) 点；sections_km: 各段 (n,) 累计挑战里程或 None。
+    header 中的标量字段原样记入 meta.json。返回 store 目录。
+    """
+    d = store_dir(store_key(points_path))
+    os.makedirs(d, exist_ok=True)
+    coords, offsets, km = _pack(sections, sections_km)
+    _save_array(os.path.join(d, "coords.npy"), coords)
+    _save_array(os.path.join(d, "offsets.npy"), offsets)
+    km_path = os.path.join(d, "km.npy")
+    if km is not None:
+        _save_array(km_path, km)
+    elif os.path.isfile(km_path):
+        os.remove(km_path)
+    meta = {
+        "version": STORE_VERSION,
+        "header": _scalar_header(header),
+        "source": {**_source_stat(points_path), "sha256": sha256 or file_sha256(points_path)},
+        "sections": len(offsets) - 1,
+        "points": int(offsets[-1]),
+    }
+    _save_meta(d, meta)
+    return d
+
+
+def _read_points(points_path: str):
+    """整份解析点位 JSON，返回 (data, sections_points, sections_km 或 None)。"""
+    with open(points_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    sections = data["sections_points"]
+    sections_km = data.get("sections_km")
+    if sections_km and [len(s) for s in sections_km] != [len(s) for s in sections]:
+        print(f"⚠️ {os.path.basename(points_path)}: sections_km 与 sections_points 段长不一致，忽略里程")
+        sections_km = None
+    return data, sections, sections_km or None
+
+
+def build_store(points_path: str) -> str:
+    """从点位 JSON 构建 store（唯一一次整份解析）。"""
+    data, sections, sections_km = _read_points(points_path)
+    return write_store(points_path, data, sections, sections_km)
+
+
+def _load_meta(key: str) -> dict | None:
+    try:
+        with open(os.path.join(store_dir(key), "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == STORE_VERSION else None
+
+
+def is_fresh(points_path: str, meta: dict | None, update: bool = True) -> bool:
+    """
+    store 与点位文件一致：大小与 mtime 相同直接认定；否则按 SHA-256 判断，
+    update=True 时顺手更新记录的 stat（原子替换 meta.json），只读调用方传 False。
+    """
+    d = store_dir(store_key(points_path))
+    if meta is None or not os.path.isfile(os.path.join(d, "coords.npy")):
+        return False
+    src = meta["source"]
+    cur = _source_stat(points_path)
+    if src.get("path") != cur["path"] or src.get("size") != cur["size"]:
+        return False
+    if src.get("mtime_ns") == cur["mtime_ns"]:
+        return True
+    if file_sha256(points_path) != src.get("sha256"):
+        return False
+    if update:
+        meta["source"].update(cur)
+        _save_meta(d, meta)
+    return True
+
+
+class RiverStore:
+    """一条河的只读映射视图；section(i) / section_km(i) 返回映射数组上的切片，不复制数据。"""
+
+    def __init__(self, key: str, meta: dict | None = None):
+        self.key = key
+        self.meta = meta or _load_meta(key)
+        if self.meta is None:
+            raise FileNotFoundError(f"store 不存在: {store_dir(key)}")
+        d = store_dir(key)
+        self.coords = np.load(os.path.join(d, "coords.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(d, "offsets.npy"), mmap_mode="r")
+        km_path = os.path.join(d, "km.npy")
+        self.km = np.load(km_path, mmap_mode="r") if os.path.isfile(km_path) else None
+
+    @classmethod
+    def in_memory(cls, key: str, header: dict, sections, sections_km=None) -> "RiverStore":
+        """不落盘的同构实例：数组在内存中拼好，接口与映射视图一致。"""
+        self = cls.__new__(cls)
+        self.key = key
+        self.meta = {"version": STORE_VERSION, "header": _scalar_header(header)}
+        self.coords, self.offsets, self.km = _pack(sections, sections_km)
+        return self
+
+    @property
+    def header(self) -> dict:
+        return self.meta["header"]
+
+    @property
+    def river_name(self):
+        return self.header.get("river_name")
+
+    @property
+    def correction_coefficient(self):
+        return self.header.get("correction_coefficient")
+
+    @property
+    def has_km(self) -> bool:
+        return self.km is not None
+
+    @property
+    def point_count(self) -> int:
+        return len(self.coords)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def section(self, i: int) -> np.ndarray:
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def section_km(self, i: int) -> np.ndarray | None:
+        return None if self.km is None else self.km[self.offsets[i]:self.offsets[i + 1]]
+
+    def sections(self):
+        for i in range(len(self)):
+            yield self.section(i)
+
+    def section_ids(self) -> np.ndarray:
+        """每点所属段下标 (N,)。"""
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    def distance_km(self, section_lengths) -> np.ndarray:
+        """
+        每点累计挑战里程 (N,)：有 km 列直接返回；否则按段内等间距反推（与 fetch_river_pois 原有算法逐位一致）。
+        section_lengths: [(section_length_km, accumulated_length_km), ...]，与各段一一对应。
+        """
+        if len(section_lengths) != len(self):
+            raise ValueError(f"sections_points 数量 {len(self)} 与 master 中 sub_sections 数量 {len(section_lengths)} 不一致")
+        if self.km is not None:
+            return self.km
+        lengths = np.array([s[0] for s in section_lengths], dtype=np.float64)
+        acc = np.array([s[1] for s in section_lengths], dtype=np.float64)
+        acc_start = np.r_[0.0, acc[:-1]]
+        counts = np.diff(self.offsets).astype(np.int64)
+        sec = self.section_ids()
+        j = np.arange(self.point_count) - np.repeat(np.asarray(self.offsets[:-1], dtype=np.int64), counts)
+        denom = np.maximum(counts - 1, 1)[sec]
+        ratio = j / denom
+        return np.where(counts[sec] > 1, acc_start[sec] + ratio * lengths[sec], acc_start[sec])
+
+
+def open_points(points_path: str, rebuild: bool = False) -> RiverStore:
+    """按点位文件打开 store，缺失或过期时先重建。"""
+    key = store_key(points_path)
+    meta = None if rebuild else _load_meta(key)
+    if rebuild or not is_fresh(points_path, meta):
+        build_store(points_path)
+        meta = None
+    return RiverStore(key, meta)
+
+
+def load_points(points_path: str) -> RiverStore:
+    """只读打开：store 新鲜时用内存映射，否则在内存中解析点位 JSON；不构建、不改写 tools/out/store。"""
+    key = store_key(points_path)
+    meta = _load_meta(key)
+    if is_fresh(points_path, meta, update=False):
+        return RiverStore(key, meta)
+    data, sections, sections_km = _read_points(points_path)
+    return RiverStore.in_memory(key, data, sections, sections_km)
+
+
+def config_points_paths() -> dict:
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        rivers = json.load(f).get("rivers") or []
+    return {store_base(r["points_json_path"]): os.path.join(ROOT, *r["points_json_path"].split("/")) for r in rivers}
+
+
+def open_all(bases=None, rebuild: bool = False) -> dict:
+    """{base: RiverStore}，默认 rivers_config 中全部河流。"""
+    paths = config_points_paths()
+    return {b: open_points(paths[b], rebuild) for b in (bases or paths)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="河流几何内存映射存储：构建 / 打开耗时")
+    parser.add_argument("bases", nargs="*", help='河流基础名，如 "yangtze"；默认 config 中全部')
+    parser.add_argument("--rebuild", action="store_true", help="忽略现有 store 强制重建")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    stores = open_all(args.bases or None, args.rebuild)
+    t_first = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    open_all(args.bases or None)
+    t_open = time.perf_counter() - t0
+
+    total = 0
+    for base, s in stores.items():
+        size = sum(os.path.getsize(p) for p in store_files(s.key))
+        total += size
+        print(f"🗄️ {base:<16} {len(s):>4} 段 {s.point_count:>8} 点  {'含里程' if s.has_km else '无里程'}  {size / 1e6:.2f} MB")
+    print(f"⏱️ 首次（含按需构建）{t_first * 1000:.1f} ms，再次打开全部 {len(stores)} 条 {t_open * 1000:.1f} ms，共 {total / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+原始线段解析缓存：以源文件内容的 SHA-256 为键，把提取出的线段存成 tools/out/cache/segments/<sha>.npz，
+内含打包的 float64 坐标、每段起止偏移、测地长度与包围盒。源文件不变时再次运行
+merge_rivers / analyze_discrepancy / visualize_raw_segments 直接读 npz，跳过 JSON 解析与长度计算，
+调 --spacing、拼接阈值等参数时几乎零成本。
+
+用法:
+  segs = load_segment_set("tools/mekong_river.geojson")
+  for coords, length_m in zip(segs, segs.lengths): ...
+  sets = load_segment_sets(paths, jobs=8)   # 多文件并行解析，结果按 paths 顺序返回
+  python3 tools/segment_cache.py --clear   # 清空缓存
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from geodesy import segment_lengths
+from geojson_stream import iter_segments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(ROOT, "tools", "out", "cache", "segments")
+# 缓存格式或提取规则变化时递增，旧缓存自动失效
+CACHE_VERSION = 1
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class SegmentSet:
+    """
+    一个源文件的全部线段：coords 为所有段首尾相接的 (M, 2) 数组，第 i 段为 coords[offsets[i]:offsets[i+1]]；
+    lengths[i] 为测地长度（米），bboxes[i] 为 [min_lng, min_lat, max_lng, max_lat]。
+    """
+
+    def __init__(self, coords, offsets, lengths, bboxes):
+        self.coords = coords
+        self.offsets = offsets
+        self.lengths = lengths
+        self.bboxes = bboxes
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, i) -> np.ndarray:
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def total_length(self) -> float:
+        return float(np.sum(self.lengths))
+
+    @classmethod
+    def from_segments(cls, segments) -> "SegmentSet":
+        segments = list(segments)
+        counts = np.array([len(s) for s in segments], dtype=np.int64)
+        offsets = np.zeros(len(segments) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        coords = np.concatenate(segments) if segments else np.zeros((0, 2))
+        # 整体算一次相邻点距离（含跨段的那一步），按段切片求和时跳过跨段步
+        steps = segment_lengths(coords)
+        lengths = np.array([np.sum(steps[a:b - 1]) for a, b in zip(offsets[:-1], offsets[1:])], dtype=np.float64)
+        bboxes = np.array(
+            [[s[:, 0].min(), s[:, 1].min(), s[:, 0].max(), s[:, 1].max()] for s in segments],
+            dtype=np.float64,
+        ).reshape(-1, 4)
+        return cls(coords, offsets, lengths, bboxes)
+
+    def save(self, path: str):
+        # 每次写独立的临时文件再原子替换：多个进程同时缓存相同内容时互不覆盖半成品
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                                         suffix=".tmp", delete=False) as f:
+            tmp = f.name
+            try:
+                np.savez(f, version=CACHE_VERSION, coords=self.coords, offsets=self.offsets,
+                         lengths=self.lengths, bboxes=self.bboxes)
+            except BaseException:
+                f.close()
+                os.remove(tmp)
+                raise
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SegmentSet | None":
+        with np.load(path) as z:
+            if int(z["version"]) != CACHE_VERSION:
+                return None
+            return cls(z["coords"], z["offsets"], z["lengths"], z["bboxes"])
+
+
+def load_segment_set(path: str, use_cache: bool = True) -> SegmentSet:
+    """读取源文件的线段；命中缓存时不解析 JSON，未命中则流式解析后写入缓存。"""
+    cache_path = None
+    if use_cache:
+        cache_path = os.path.join(CACHE_DIR, file_sha256(path) + ".npz")
+        if os.path.isfile(cache_path):
+            try:
+                cached = SegmentSet.load(cache_path)
+            except (OSError, ValueError, KeyError):
+                cached = None
+            if cached is not None:
+                return cached
+    segs = SegmentSet.from_segments(iter_segments(path))
+    if cache_path:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        segs.save(cache_path)
+    return segs
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def _load_one(args):
+    path, use_cache = args
+    return load_segment_set(path, use_cache=use_cache)
+
+
+def load_segment_sets(paths, use_cache: bool = True, jobs: int | None = None) -> list[SegmentSet]:
+    """
+    并行读取多个源文件：每个 worker 独立完成解析 / 测长 / 写缓存，只把打包好的数组传回主进程。
+    jobs <= 1 或只有一个文件时在当前进程顺序执行；返回顺序与 paths 一致，保证后续拼接结果确定。
+    """
+    paths = list(paths)
+    jobs = default_jobs() if jobs is None else jobs
+    jobs = min(jobs, len(paths))
+    if jobs <= 1:
+        return [load_segment_set(p, use_cache=use_cache) for p in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_load_one, [(p, use_cache) for p in paths]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="原始线段解析缓存管理")
+    parser.add_argument("--clear", action="store_true", help="清空缓存目录")
+    args = parser.parse_args()
+    if args.clear:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        print(f"已清空: {CACHE_DIR}")
+        return
+    files = sorted(os.listdir(CACHE_DIR)) if os.path.isdir(CACHE_DIR) else []
+    size = sum(os.path.getsize(os.path.join(CACHE_DIR, f)) for f in files)
+    print(f"缓存目录: {CACHE_DIR}，{len(files)} 个文件，共 {size / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+误差有界的折线简化（Douglas–Peucker，容差单位为米），全部在 NumPy 数组上完成。
+
+实现按「层」推进：每一轮对所有尚未收敛的区间一次性算出区间内各点到弦的距离，
+用 reduceat 取每个区间的最远点，超出容差的区间在该点处劈开，直到没有区间需要再分。
+结果与经典递归实现完全一致（同距离取靠前的点），轮数约为递归深度。
+点到弦的距离在以弦起点为原点的局部等距平面上计算（球面半径 6371008.8 m），
+简化后再对每个被删点精算一次到所属弦的偏差，报告最大 / 平均偏差与顶点缩减比例。
+
+简化后的点不再等间距：依赖「点序号 ∝ 里程」的消费方（如 App 内按下标插值定位）需先改为按里程插值，
+因此点位文件的后处理默认写到 tools/out/simplified/，确认后再用 --in-place 覆盖。
+
+用法（在项目根目录）:
+  python3 tools/simplify.py assets/json/rivers/songhua_river_points.json --tolerance-m 5
+  python3 tools/simplify.py assets/json/rivers/yangtze_raw_path_50m.json --tolerance-m 2 --in-place
+  merge_rivers.py 中: --simplify-m 5（重采样后立即简化，原始路径即为自适应密度）
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from geodesy import EARTH_RADIUS_M, as_lnglat, line_length
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT_DIR = os.path.join(ROOT, "tools", "out", "simplified")
+
+_M_PER_DEG = EARTH_RADIUS_M * np.pi / 180.0
+
+
+def chord_deviation(c: np.ndarray, a, b, p) -> np.ndarray:
+    """点 c[p] 到弦 c[a]→c[b] 的距离（米），a、b、p 为等长下标数组。"""
+    ax, ay = c[a, 0], c[a, 1]
+    cos_lat = np.cos(np.radians((ay + c[b, 1]) / 2.0))
+    bx, by = (c[b, 0] - ax) * cos_lat * _M_PER_DEG, (c[b, 1] - ay) * _M_PER_DEG
+    px, py = (c[p, 0] - ax) * cos_lat * _M_PER_DEG, (c[p, 1] - ay) * _M_PER_DEG
+    den = bx * bx + by * by
+    t = np.divide(px * bx + py * by, den, out=np.zeros_like(den), where=den > 0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(px - t * bx, py - t * by)
+
+
+def douglas_peucker(coords, tolerance_m: float) -> np.ndarray:
+    """返回保留顶点的布尔掩码；首尾点总是保留。"""
+    c = as_lnglat(coords)
+    n = len(c)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    active = np.arange(1, n - 1)
+    while len(active):
+        kept = np.flatnonzero(keep)
+        pos = np.searchsorted(kept, active)
+        a, b = kept[pos - 1], kept[pos]
+        d = chord_deviation(c, a, b, active)
+        # active 有序，同一区间的点连续排列，区间以左端点 a 区分
+        new_grp = np.empty(len(a), dtype=bool)
+        new_grp[0] = True
+        new_grp[1:] = a[1:] != a[:-1]
+        starts = np.flatnonzero(new_grp)
+        grp = np.cumsum(new_grp) - 1
+        dmax = np.maximum.reduceat(d, starts)
+        at_max = np.flatnonzero(d == dmax[grp])
+        first = at_max[np.r_[True, grp[at_max][1:] != grp[at_max][:-1]]]
+        split = dmax > tolerance_m
+        if not split.any():
+            break
+        keep[active[first[split]]] = True
+        active = active[split[grp] & ~keep[active]]
+    return keep
+
+
+def deviations(coords, keep: np.ndarray) -> np.ndarray:
+    """每个被删顶点到简化后所在弦的偏差（米）。"""
+    c = as_lnglat(coords)
+    kept = np.flatnonzero(keep)
+    removed = np.flatnonzero(~keep)
+    if len(removed) == 0:
+        return np.zeros(0)
+    pos = np.searchsorted(kept, removed)
+    return chord_deviation(c, kept[pos - 1], kept[pos], removed)
+
+
+def simplify_line(coords, tolerance_m: float) -> tuple[np.ndarray, dict]:
+    """简化一条折线，返回 (简化后的 (M, 2) 数组, 统计)。"""
+    c = as_lnglat(coords)
+    keep = douglas_peucker(c, tolerance_m)
+    return c[keep], line_stats(c, keep)
+
+
+def line_stats(c: np.ndarray, keep: np.ndarray) -> dict:
+    dev = deviations(c, keep)
+    return {
+        "points_in": int(len(c)),
+        "points_out": int(keep.sum()),
+        "max_dev_m": float(dev.max()) if len(dev) else 0.0,
+        "dev_sum_m": float(dev.sum()),
+        "length_in_m": line_length(c),
+        "length_out_m": line_length(c[keep]),
+    }
+
+
+def merge_stats(stats: list[dict]) -> dict:
+    """合并多条线的统计：平均偏差按被删顶点数加权。"""
+    pin = sum(s["points_in"] for s in stats)
+    pout = sum(s["points_out"] for s in stats)
+    removed = pin - pout
+    len_in = sum(s["length_in_m"] for s in stats)
+    len_out = sum(s["length_out_m"] for s in stats)
+    return {
+        "points_in": pin,
+        "points_out": pout,
+        "reduction": round(1.0 - pout / pin, 4) if pin else 0.0,
+        "max_dev_m": round(max((s["max_dev_m"] for s in stats), default=0.0), 3),
+        "mean_dev_m": round(sum(s["dev_sum_m"] for s in stats) / removed, 3) if removed else 0.0,
+        "length_change_m": round(len_out - len_in, 1),
+    }
+
+
+def format_stats(s: dict) -> str:
+    return (f"顶点 {s['points_in']} → {s['points_out']}（减少 {s['reduction'] * 100:.1f}%），"
+            f"偏差 max {s['max_dev_m']:.2f} m / 平均 {s['mean_dev_m']:.2f} m，"
+            f"总长变化 {s['length_change_m']:+.1f} m")
+
+
+def simplify_file(path: str, tolerance_m: float) -> tuple[dict, dict]:
+    """
+    简化点位文件（逐个 sections_points 独立简化，段首尾点保留，段间衔接点不变）
+    或原始路径文件（coordinates 整体简化），返回 (新文件内容, 统计)。
+    点位文件带 sections_km 时按同一保留掩码逐段取里程，两列点数始终一致。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    stats = []
+    if "sections_points" in data:
+        kms = data.get("sections_km")
+        if kms is not None and [len(k) for k in kms] != [len(p) for p in data["sections_points"]]:
+            print(f"⚠️ {os.path.basename(path)}: sections_km 与 sections_points 段长不一致，输出中去掉里程列")
+            kms = None
+            del data["sections_km"]
+        sections, sections_km = [], []
+        for i, pts in enumerate(data["sections_points"]):
+            c = as_lnglat(pts)
+            keep = douglas_peucker(c, tolerance_m)
+            sections.append(c[keep].tolist())
+            if kms is not None:
+                sections_km.append(np.asarray(kms[i], dtype=np.float64)[keep].tolist())
+            stats.append(line_stats(c, keep))
+        data["sections_points"] = sections
+        if kms is not None:
+            data["sections_km"] = sections_km
+    else:
+        c, s = simplify_line(data["coordinates"], tolerance_m)
+        data["coordinates"] = c.tolist()
+        if "point_count" in data:
+            data["point_count"] = len(c)
+        stats.append(s)
+    return data, merge_stats(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="误差有界的折线简化（Douglas–Peucker，米制容差）")
+    parser.add_argument("files", nargs="+", help="*_points.json 或 *_raw_path_*.json")
+    parser.add_argument("--tolerance-m", type=float, default=5.0, help="最大允许偏差（米），默认 5")
+    parser.add_argument("--out-dir", default=OUT_DIR, help="输出目录，默认 tools/out/simplified")
+    parser.add_argument("--in-place", action="store_true", help="直接覆盖原文件")
+    args = parser.parse_args()
+
+    for path in args.files:
+        data, s = simplify_file(path, args.tolerance_m)
+        out = path if args.in_place else os.path.join(args.out_dir, os.path.basename(path))
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        size_in = os.path.getsize(path)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"✂️ {os.path.basename(path)} (容差 {args.tolerance_m:g} m): {format_stats(s)}")
+        print(f"   文件 {size_in / 1e6:.2f} MB → {os.path.getsize(out) / 1e6:.2f} MB  💾 {out}")
+
+
+if __name__ == "__main__":
+    main()
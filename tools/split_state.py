@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+align_and_split 的增量分割状态：每个点位文件旁记一份边界表 tools/out/split_state/<points 文件名>，
+内含原始路径的 SHA-256、点位文件的 SHA-256，每一列（sections_points / sections_km）各 sub_section 的点下标范围与其 JSON 文本在点位文件中的位置，
+以及上次写出的各分片签名（--shards）。
+
+重新分割时，原始路径与点位文件都未被改动、且某段的点下标范围没变，该段直接沿用旧文件中的原文，
+只有边界移动过的段重新编码；整份文本与全量编码逐字节相同，内容没变时不重写文件。
+设计调整 sub_section_length_km 后，评审只需看报告中列出的变更段。
+边界表是本地缓存（已在 .gitignore 中，不入库）：缺失或与点位文件不一致时自动退回全量，输出与增量逐字节相同，
+所以换机器或清掉 tools/out 只影响首次分割的耗时。
+"""
+import hashlib
+import json
+import os
+
+from segment_cache import file_sha256
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_DIR = os.path.join(ROOT, "tools", "out", "split_state")
+STATE_VERSION = 2
+
+_SEPARATORS = (',', ':')
+
+
+def state_path(points_path: str) -> str:
+    return os.path.join(STATE_DIR, os.path.basename(points_path))
+
+
+def load_state(points_path: str, raw_sha: str) -> dict | None:
+    """读取边界表；原始路径变了、点位文件被其他方式改过或版本不符时返回 None（走全量）。"""
+    path = state_path(points_path)
+    if not (os.path.isfile(path) and os.path.isfile(points_path)):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != STATE_VERSION or state.get("raw_sha256") != raw_sha:
+        return None
+    if state.get("points_sha256") != file_sha256(points_path):
+        return None
+    return state
+
+
+def encode_points(header: dict, columns, ranges, state: dict | None, points_path: str):
+    """
+    header: 点位文件的标量字段（按输出顺序）；ranges: 每段 (start, stop) 或 None（空段）。
+    columns: [(字段名, 按点排列的数组, tag), ...]，每列按 ranges 切段输出为二维列表，
+    tag 描述该列取值的依据（如修正系数），与上次不同则整列重新编码。
+    返回 (完整 JSON 文本, 列状态, 变更段下标列表)；文本与 json.dumps 整体编码逐字节相同。
+    """
+    old_text, old_columns = None, {}
+    if state is not None:
+        with open(points_path, 'r', encoding='utf-8', newline='') as f:
+            old_text = f.read()
+        old_columns = state.get("columns") or {}
+
+    head = json.dumps(header, ensure_ascii=False, separators=_SEPARATORS)
+    pieces = [head[:-1]]
+    pos = len(pieces[0])
+    column_states, changed = {}, set()
+    for key, values, tag in columns:
+        old_col = old_columns.get(key) or {}
+        old_sections = (old_col.get("sections") or []) if old_col.get("tag") == tag else []
+        lead = (',' if pos > 1 else '') + json.dumps(key, ensure_ascii=False) + ':['
+        pieces.append(lead)
+        pos += len(lead)
+        sections = []
+        for j, rng in enumerate(ranges):
+            rng_key = list(rng) if rng else None
+            old = old_sections[j] if j < len(old_sections) else None
+            if old is not None and old.get("range") == rng_key:
+                text = old_text[old["offset"]:old["offset"] + old["length"]]
+            else:
+                text = '[]' if rng is None else json.dumps(values[rng[0]:rng[1]].tolist(), separators=_SEPARATORS)
+                changed.add(j)
+            if j:
+                pieces.append(',')
+                pos += 1
+            sections.append({"range": rng_key, "offset": pos, "length": len(text)})
+            pieces.append(text)
+            pos += len(text)
+        pieces.append(']')
+        pos += 1
+        column_states[key] = {"tag": tag, "sections": sections}
+        if state is not None and len(old_col.get("sections") or []) > len(ranges):
+            changed.update(range(len(ranges), len(old_col["sections"])))
+    pieces.append('}')
+    return ''.join(pieces), column_states, sorted(changed)
+
+
+def save_state(points_path: str, raw_sha: str, text: str, column_states: dict, shard_signatures: list | None = None):
+    """shard_signatures: 本次写出的各分片签名（见 points_shards.shard_signature）；未生成分片时为 None，下次 --shards 全部重写。"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    state = {
+        "version": STATE_VERSION,
+        "points_file": os.path.basename(points_path),
+        "raw_sha256": raw_sha,
+        "points_sha256": hashlib.sha256(text.encode('utf-8')).hexdigest(),
+        "columns": column_states,
+        "shards": shard_signatures,
+    }
+    tmp = state_path(points_path) + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, separators=_SEPARATORS)
+    os.replace(tmp, state_path(points_path))
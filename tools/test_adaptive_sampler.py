@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+adaptive_sampler 自测：首轮粗采样含末点、两端相同的区间不再加密、变化处二分到相邻下标为止、失败端点的区间记为未决。
+
+用法（在项目根目录）:
+  python3 tools/test_adaptive_sampler.py
+"""
+from adaptive_sampler import AdaptiveSampler
+
+
+def _run(sampler, key_of, fail=()):
+    """按轮请求直到采样完成，返回各轮下标。"""
+    rounds = []
+    while True:
+        batch = sampler.next_round()
+        if not batch:
+            return rounds
+        assert batch == sorted(batch) and not set(batch) & set(sampler.keys)
+        rounds.append(batch)
+        for i in batch:
+            sampler.record(i, None if i in fail else key_of(i))
+
+
+def test_first_round():
+    assert AdaptiveSampler(101, every=10).next_round() == list(range(0, 101, 10))
+    assert AdaptiveSampler(95, every=10).next_round() == list(range(0, 95, 10)) + [94]
+    assert AdaptiveSampler(1, every=10).next_round() == [0]
+    assert AdaptiveSampler(0, every=10).next_round() == []
+    try:
+        AdaptiveSampler(10, every=0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("every=0 未被拒绝")
+
+
+def test_constant_stops_after_first_round():
+    s = AdaptiveSampler(500, every=20)
+    rounds = _run(s, lambda i: "同一地址")
+    assert len(rounds) == 1 and s.rounds == 1
+    assert s.requested == 26 and s.unresolved == 0
+
+
+def test_bisects_to_adjacent():
+    # 两处变化：37|38 与 71|72，二分须把两处都收敛到相邻下标
+    key_of = lambda i: 0 if i <= 37 else (1 if i <= 71 else 2)
+    s = AdaptiveSampler(101, every=16)
+    rounds = _run(s, key_of)
+    assert {37, 38, 71, 72} <= set(s.keys)
+    # 收敛后每个剩余区间要么两端相同、要么已相邻
+    for lo, hi in s.intervals:
+        assert hi - lo == 1 or key_of(lo) == key_of(hi)
+    # 每轮最多两个中点（每处变化一个），轮数约为 log2(16)
+    assert all(len(r) <= 2 for r in rounds[1:])
+    assert s.rounds == len(rounds) == 1 + 4
+    assert s.requested < 101 // 4
+
+
+def test_every_one_is_exhaustive():
+    s = AdaptiveSampler(30, every=1)
+    assert _run(s, lambda i: i % 3) == [list(range(30))]
+
+
+def test_failed_endpoint_is_unresolved():
+    key_of = lambda i: i >= 50
+    s = AdaptiveSampler(101, every=10)
+    # 下标 50 失败：以它为端点的 (40, 50)、(50, 60) 都不拆，记为未决；其余区间两端相同，不再请求
+    _run(s, key_of, fail={50})
+    assert s.unresolved == 2
+    # 只请求了首轮粗采样点（失败的 50 也计入已请求）
+    assert sorted(s.keys) == list(range(0, 101, 10)) and s.requested == 11
+
+
+if __name__ == "__main__":
+    test_first_round()
+    test_constant_stops_after_first_round()
+    test_bisects_to_adjacent()
+    test_every_one_is_exhaustive()
+    test_failed_endpoint_is_unresolved()
+    print("✅ adaptive_sampler 全部通过")
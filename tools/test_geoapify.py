@@ -3,20 +3,28 @@
 Geoapify API独立测试工具：先验证API有效性，再跑主脚本，避免反复折腾
 用法：
   python3 test_geoapify.py --key 你的GeoapifyKey --lat 21.185887 --lon 100.699552
+本脚本用于验证 Key，默认不读写响应缓存，每次都真实联网；只想看某坐标的返回内容、不在乎 Key 时可加 --use-cache
+（读写 tools/out/cache/geocode.db，命中则不联网）。
 """
 import argparse
 import json
-import ssl
 import urllib.parse
-import urllib.request
 
-# macOS 证书兼容（和主脚本一致）
-def _http_context():
-    try:
-        import certifi
-        return ssl.create_default_context(cafile=certifi.where())
-    except ImportError:
-        return ssl._create_unverified_context()
+from geocode_cache import add_cache_args, configure_from_args as configure_cache, get_cache
+from http_client import HttpError, get_client
+
+PROVIDER = "geoapify_reverse"
+# 影响响应内容的请求参数（不含 apiKey 与坐标），作为缓存键的一部分
+PARAMS = {"format": "json", "include": "pois", "pois_radius": 1000, "pois_limit": 20}
+
+def _print_summary(data: dict):
+    # 解析地址
+    if data.get("results") and len(data["results"]) > 0:
+        props = data["results"][0]
+        print(f"📌 地址: {props.get('formatted') or '无'}")
+    # 解析POI
+    poi_count = len(data.get("pois", []))
+    print(f"📍 POI数量: {poi_count}")
 
 def test_geoapify_single_point(api_key: str, lat: float, lon: float) -> dict:
     lat_str = f"{lat:.6f}"
@@ -27,10 +35,7 @@ def test_geoapify_single_point(api_key: str, lat: float, lon: float) -> dict:
         "lat": lat_str,
         "lon": lon_str,
         "apiKey": api_key,
-        "format": "json",
-        "include": "pois",
-        "pois_radius": 1000,
-        "pois_limit": 20
+        **PARAMS,
     })
     request_url = f"https://api.geoapify.com/v1/geocode/reverse?{params}"
 
@@ -42,34 +47,37 @@ def test_geoapify_single_point(api_key: str, lat: float, lon: float) -> dict:
 
     result = {"success": False, "data": None, "error": None, "status_code": None}
 
+    body = get_cache().get(PROVIDER, lat, lon, PARAMS)
+    if body is not None:
+        data = json.loads(body)
+        result.update(success=True, data=data, status_code=200)
+        print("✅ 缓存命中（未联网，未验证 Key；去掉 --use-cache 即可真实请求）")
+        _print_summary(data)
+        print("-" * 50)
+        return result
+
     try:
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "application/json"
         }
-        req = urllib.request.Request(request_url, headers=headers, method="GET")
-        with urllib.request.urlopen(req, timeout=15, context=_http_context()) as resp:
-            result["status_code"] = resp.getcode()
-            if resp.getcode() == 200:
-                data = json.loads(resp.read().decode("utf-8"))
-                result["success"] = True
-                result["data"] = data
-                print(f"✅ 请求成功（状态码: 200）")
-                # 解析地址
-                if data.get("results") and len(data["results"]) > 0:
-                    props = data["results"][0]
-                    print(f"📌 地址: {props.get('formatted') or '无'}")
-                # 解析POI
-                poi_count = len(data.get("pois", []))
-                print(f"📍 POI数量: {poi_count}")
-            else:
-                result["error"] = f"状态码错误: {resp.getcode()}"
-                print(f"❌ {result['error']}")
+        resp = get_client().get(request_url, headers=headers)
+        result["status_code"] = resp.status
+        if resp.status == 200:
+            data = resp.json()
+            result["success"] = True
+            result["data"] = data
+            get_cache().put(PROVIDER, lat, lon, PARAMS, resp.body)
+            print(f"✅ 请求成功（状态码: 200，{resp.elapsed_ms:.0f} ms，{'复用连接' if resp.reused else '新建连接'}）")
+            _print_summary(data)
+        else:
+            result["error"] = f"状态码错误: {resp.status}"
+            print(f"❌ {result['error']}")
 
-    except urllib.error.HTTPError as e:
-        result["status_code"] = e.code
-        error_detail = e.read().decode("utf-8") if hasattr(e, "read") else "无"
-        result["error"] = f"HTTP {e.code}: {error_detail}"
+    except HttpError as e:
+        result["status_code"] = e.status
+        error_detail = e.text() or "无"
+        result["error"] = f"HTTP {e.status}: {error_detail}"
         print(f"❌ {result['error']}")
     except Exception as e:
         result["error"] = f"未知错误: {str(e)}"
@@ -90,6 +98,8 @@ def batch_test_geoapify(api_key: str, coordinate_list: list[tuple[float, float]]
             success_count += 1
     print(f"\n=== 批量测试完成 ===")
     print(f"✅ 成功: {success_count} 个 | ❌ 失败: {len(coordinate_list)-success_count} 个")
+    print(get_client().format_stats())
+    print(get_cache().format_stats())
 
 if __name__ == "__main__":
     # 命令行参数
@@ -98,7 +108,12 @@ if __name__ == "__main__":
     parser.add_argument("--lat", type=float, required=True, help="测试纬度（如21.185887）")
     parser.add_argument("--lon", type=float, required=True, help="测试经度（如100.699552）")
     parser.add_argument("--batch", action="store_true", help="是否批量测试湄公河常用坐标")
+    add_cache_args(parser)
+    # 校验 Key 的脚本默认关闭缓存：否则已缓存的坐标会让失效或输错的 Key 也显示成功
+    parser.add_argument("--use-cache", dest="no_cache", action="store_false", help="读写响应缓存（命中时不联网，不能用来验证 Key）")
+    parser.set_defaults(no_cache=True)
     args = parser.parse_args()
+    configure_cache(args)
 
     # 单坐标测试
     test_result = test_geoapify_single_point(args.key, args.lat, args.lon)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+geocode_cache 自测：读写往返、网格量化、参数哈希区分、TTL 过期、统计累加与 --no-cache 占位。
+缓存库建在临时目录，不动 tools/out/cache。
+
+用法（在项目根目录）:
+  python3 tools/test_geocode_cache.py
+"""
+import os
+import sqlite3
+import tempfile
+
+import geocode_cache
+from geocode_cache import GeocodeCache, NullCache, params_hash
+
+PARAMS = {"radius": 1000, "extensions": "all"}
+
+
+def test_round_trip_and_params():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = GeocodeCache(os.path.join(tmp, "sub", "geocode.db"))
+        assert cache.get("amap", 30.0, 120.0, PARAMS) is None
+        cache.put("amap", 30.0, 120.0, PARAMS, "响应体".encode("utf-8"))
+        assert cache.get("amap", 30.0, 120.0, PARAMS) == "响应体".encode("utf-8")
+        # 参数顺序无关，参数值或服务商不同即未命中
+        assert cache.get("amap", 30.0, 120.0, dict(reversed(list(PARAMS.items())))) is not None
+        assert cache.get("amap", 30.0, 120.0, {**PARAMS, "radius": 500}) is None
+        assert cache.get("geoapify", 30.0, 120.0, PARAMS) is None
+        assert params_hash(None) == params_hash({})
+        assert cache.counters["amap"] == {"hits": 2, "misses": 2, "expired": 0, "stores": 1}
+        cache.close()
+
+
+def test_grid_quantization():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = GeocodeCache(os.path.join(tmp, "geocode.db"), grid_deg=1e-4)
+        cache.put("amap", 30.0, 120.0, None, b"x")
+        # 同一网格（四舍五入到 1e-4°）命中，相邻网格未命中
+        assert cache.get("amap", 30.00004, 119.99996) == b"x"
+        assert cache.get("amap", 30.00006, 120.0) is None
+        assert cache.get("amap", 30.0, 120.0001) is None
+        cache.close()
+        # 网格不同的缓存互不命中（grid_e7 是键的一部分）
+        fine = GeocodeCache(os.path.join(tmp, "geocode.db"), grid_deg=1e-5)
+        assert fine.get("amap", 30.0, 120.0) is None
+        fine.close()
+    try:
+        GeocodeCache(":memory:", grid_deg=0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("grid_deg=0 未被拒绝")
+
+
+def _age(path, seconds):
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE responses SET fetched_at = fetched_at - ?", (seconds,))
+    conn.commit()
+    conn.close()
+
+
+def test_ttl_expiry():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "geocode.db")
+        cache = GeocodeCache(path, ttl_days=1)
+        cache.put("amap", 30.0, 120.0, None, b"old")
+        _age(path, 0.5 * 86400)
+        assert cache.get("amap", 30.0, 120.0) == b"old"
+        _age(path, 0.6 * 86400)
+        assert cache.get("amap", 30.0, 120.0) is None
+        assert cache.counters["amap"]["expired"] == 1
+        # 重新请求后覆盖，又能命中
+        cache.put("amap", 30.0, 120.0, None, b"new")
+        assert cache.get("amap", 30.0, 120.0) == b"new"
+        cache.close()
+        # ttl_days=0 永不过期
+        _age(path, 10 * 365 * 86400)
+        forever = GeocodeCache(path, ttl_days=0)
+        assert forever.get("amap", 30.0, 120.0) == b"new"
+        forever.close()
+
+
+def test_stats_persist():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "geocode.db")
+        for _ in range(2):
+            cache = GeocodeCache(path)
+            cache.get("amap", 1.0, 2.0)
+            cache.put("amap", 1.0, 2.0, None, b"x")
+            cache.get("amap", 1.0, 2.0)
+            cache.close()
+            cache.close()  # 重复关闭无副作用
+        conn = sqlite3.connect(path)
+        assert conn.execute("SELECT hits, misses, stores FROM stats WHERE provider='amap'").fetchone() == (3, 1, 2)
+        conn.close()
+
+
+def test_null_cache_and_configure():
+    null = NullCache()
+    null.put("amap", 1.0, 2.0, None, b"x")
+    assert null.get("amap", 1.0, 2.0) is None
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = geocode_cache.configure(os.path.join(tmp, "geocode.db"))
+        assert isinstance(shared, GeocodeCache) and geocode_cache.get_cache() is shared
+        assert isinstance(geocode_cache.configure(None), NullCache)
+        assert shared._conn is None  # 旧缓存已关闭
+
+
+if __name__ == "__main__":
+    test_round_trip_and_params()
+    test_grid_quantization()
+    test_ttl_expiry()
+    test_stats_persist()
+    test_null_cache_and_configure()
+    print("✅ geocode_cache 全部通过")
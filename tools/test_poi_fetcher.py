@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+poi_fetcher 自测（不联网）：乱序完成的请求按输入顺序回调、FetchError 作为结果交给回调、缓存命中不占令牌、令牌桶限速。
+
+用法（在项目根目录）:
+  python3 tools/test_poi_fetcher.py
+"""
+import random
+import threading
+import time
+
+from poi_fetcher import FetchError, fetch_ordered
+
+
+def test_ordered_results():
+    rng = random.Random(1)
+    delays = [rng.uniform(0, 0.02) for _ in range(60)]
+    seen, threads = [], set()
+
+    def fetch(i):
+        threads.add(threading.get_ident())
+        time.sleep(delays[i])
+        return i * i
+
+    stats = fetch_ordered(range(60), fetch, lambda i, item, r: seen.append((i, item, r)),
+                          qps=1000, concurrency=8, window=5)
+    assert seen == [(i, i, i * i) for i in range(60)]
+    assert stats["requests"] == 60 and stats["cached"] == 0 and stats["errors"] == 0
+    # 阻塞调用确实进了线程池，回调在调用方线程
+    assert threading.get_ident() not in threads
+
+
+def test_fetch_error_propagates():
+    def fetch(i):
+        if i % 4 == 1:
+            raise FetchError(f"配额用尽 #{i}")
+        return f"ok{i}"
+
+    seen = []
+    stats = fetch_ordered(range(10), fetch, lambda i, item, r: seen.append(r), qps=1000, concurrency=3)
+    assert stats["errors"] == 3
+    for i, r in enumerate(seen):
+        if i % 4 == 1:
+            assert isinstance(r, FetchError) and str(r) == f"配额用尽 #{i}"
+        else:
+            assert r == f"ok{i}"
+
+
+def test_lookup_skips_fetch():
+    fetched = []
+
+    def fetch(i):
+        fetched.append(i)
+        return "net"
+
+    seen = []
+    stats = fetch_ordered(range(12), fetch, lambda i, item, r: seen.append(r), qps=1000, concurrency=4,
+                          lookup=lambda i: "cache" if i % 3 == 0 else None)
+    assert sorted(fetched) == [i for i in range(12) if i % 3]
+    assert seen == ["cache" if i % 3 == 0 else "net" for i in range(12)]
+    assert stats["cached"] == 4 and stats["requests"] == 8
+
+
+def test_rate_limit():
+    # 桶初始为空、容量 1：n 个请求至少需要 n / qps 秒，与并发数无关
+    qps, n = 40.0, 12
+    stats = fetch_ordered(range(n), lambda i: i, lambda i, item, r: None, qps=qps, concurrency=8)
+    assert stats["elapsed_s"] >= n / qps * 0.9
+    assert stats["qps"] <= qps * 1.1
+
+
+def test_empty_and_bad_args():
+    stats = fetch_ordered([], lambda i: i, lambda i, item, r: None, qps=1)
+    assert stats["requests"] == 0
+    try:
+        fetch_ordered([1], lambda i: i, lambda i, item, r: None, qps=1, concurrency=0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("concurrency=0 未被拒绝")
+
+
+if __name__ == "__main__":
+    test_ordered_results()
+    test_fetch_error_propagates()
+    test_lookup_skips_fetch()
+    test_rate_limit()
+    test_empty_and_bad_args()
+    print("✅ poi_fetcher 全部通过")
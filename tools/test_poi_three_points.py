@@ -8,13 +8,17 @@
   # 高德（数据通常更细致）
   python3 tools/test_poi_three_points.py --provider amap --key YOUR_AMAP_KEY
   python3 tools/test_poi_three_points.py --river yangtze --step 5 --provider amap --key YOUR_KEY
+成功的响应写入本地缓存 tools/out/cache/geocode.db（与 fetch_river_pois 共用），重复运行不再联网；--no-cache 强制请求。
 """
 
 import argparse
 import json
 import os
 import urllib.parse
-import urllib.request
+
+from geocode_cache import add_cache_args, configure_from_args as configure_cache, get_cache
+from http_client import get_client
+from river_store import open_points
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -30,19 +34,9 @@ def load_master_section_lengths(master_path: str):
 
 
 def load_points_with_distance_km(points_path: str, section_lengths: list):
-    with open(points_path, "r", encoding="utf-8") as f:
-        p = json.load(f)
-    sections = p["sections_points"]
-    out = []
-    for i, section in enumerate(sections):
-        sec_len, _ = section_lengths[i]
-        acc_start = 0.0 if i == 0 else section_lengths[i - 1][1]
-        n = len(section)
-        for j, pt in enumerate(section):
-            lng, lat = float(pt[0]), float(pt[1])
-            dist = acc_start + (j / (n - 1) if n > 1 else 0) * sec_len
-            out.append((lat, lng, dist))
-    return out
+    store = open_points(points_path)
+    coords = store.coords
+    return list(zip(coords[:, 1].tolist(), coords[:, 0].tolist(), store.distance_km(section_lengths).tolist()))
 
 
 def sample_by_km(points: list, step_km: float):
@@ -66,22 +60,32 @@ def sample_by_km(points: list, step_km: float):
     return sampled
 
 
+def _get_json_cached(provider: str, lat: float, lon: float, params: dict, url: str, ok) -> dict:
+    """先查本地响应缓存（与 fetch_river_pois 共用），未命中再请求；ok(data) 为真才写入缓存。"""
+    cache = get_cache()
+    body = cache.get(provider, lat, lon, params)
+    if body is not None:
+        print("（缓存命中，未联网）")
+        return json.loads(body)
+    body = get_client().get(url).body
+    data = json.loads(body.decode("utf-8"))
+    if ok(data):
+        cache.put(provider, lat, lon, params, body)
+    return data
+
+
 def request_tianditu_raw(lat: float, lon: float, tk: str) -> dict:
     """天地图逆地理，返回完整响应。"""
     post_str = f"{{'lon': {lon}, 'lat': {lat}, 'ver': 1}}"
     url = f"http://api.tianditu.gov.cn/geocoder?type=geocode&tk={tk}&postStr={urllib.parse.quote(post_str)}"
-    req = urllib.request.Request(url, headers={"User-Agent": "RivtrekPOI/1.0"})
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        return json.loads(resp.read().decode())
+    return _get_json_cached("tianditu_geocoder", lat, lon, {"type": "geocode", "ver": 1}, url, lambda d: str(d.get("status")) == "0")
 
 
 def request_amap_raw(lat: float, lon: float, key: str) -> dict:
     """高德逆地理，返回完整响应。location=经度,纬度；extensions=base 仅地址，all 含周边 POI。"""
     location = f"{lon},{lat}"
     url = f"https://restapi.amap.com/v3/geocode/regeo?key={urllib.parse.quote(key)}&location={location}&extensions=all"
-    req = urllib.request.Request(url, headers={"User-Agent": "RivtrekPOI/1.0"})
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        return json.loads(resp.read().decode())
+    return _get_json_cached("amap_regeo", lat, lon, {"extensions": "all"}, url, lambda d: d.get("status") == "1" and bool(d.get("regeocode")))
 
 
 def main():
@@ -91,7 +95,9 @@ def main():
     parser.add_argument("--key", default=None, help="高德 Web 服务 Key（provider=amap 时必填）")
     parser.add_argument("--river", default="yangtze", help="河流 id")
     parser.add_argument("--step", type=float, default=5.0, help="采样间隔(km)")
+    add_cache_args(parser)
     args = parser.parse_args()
+    cache = configure_cache(args)
 
     if args.provider == "tianditu" and not args.tk:
         raise SystemExit("使用天地图时请提供 --tk")
@@ -122,6 +128,8 @@ def main():
         except Exception as e:
             print(f"请求失败: {e}")
         print()
+    print(get_client().format_stats())
+    print(cache.format_stats())
     print("以上为逆地理完整返回。确认无误后可用 fetch_river_pois.py 全量（加 --provider 与 --tk/--key，可选 --from 0 --to N）。")
 
 
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+points_binary 自测：.bin 编码→解码逐点还原、CRC 与 magic 校验、varint / zigzag 边界值。
+
+用法（在项目根目录）:
+  python3 tools/test_points_binary.py
+"""
+import numpy as np
+
+from points_binary import (COORD_SCALE, PointsBinary, decode_points, encode_points, unzigzag, validate,
+                           varint_decode, varint_encode, zigzag)
+
+
+def _sample_data() -> dict:
+    rng = np.random.default_rng(7)
+    sections, kms = [], []
+    lng, lat, km = 97.123456, 33.654321, 0.0
+    for n in (120, 1, 0, 57):
+        steps = rng.normal(0, 3e-4, size=(n, 2))
+        pts = np.round(np.array([lng, lat]) + np.cumsum(steps, axis=0), 6)
+        sections.append(pts.tolist())
+        seg_km = np.round(km + np.cumsum(rng.uniform(0.01, 0.06, size=n)), 3)
+        kms.append(seg_km.tolist())
+        if n:
+            lng, lat = pts[-1]
+            km = float(seg_km[-1])
+    # 跨越 0 度经线与南半球，覆盖负数的 zigzag
+    sections.append([[-0.000001, -12.5], [0.000002, -12.499999], [179.999999, -89.999999]])
+    kms.append([km + 0.001, km + 0.002, km + 0.003])
+    return {"river_name": "测试河", "correction_coefficient": 1.0234, "sections_points": sections, "sections_km": kms}
+
+
+def test_round_trip():
+    data = _sample_data()
+    buf = encode_points(data)
+    assert validate(data, buf) == []
+    dec = decode_points(buf)
+    assert dec["river_name"] == "测试河"
+    assert dec["correction_coefficient"] == 1.0234
+    assert len(dec["sections_points"]) == len(data["sections_points"])
+    for a, b in zip(data["sections_points"], dec["sections_points"]):
+        assert np.array_equal(np.asarray(a, dtype=np.float64).reshape(-1, 2), b)
+    for a, b in zip(data["sections_km"], dec["sections_km"]):
+        assert np.array_equal(np.asarray(a, dtype=np.float64), b)
+    pb = PointsBinary(buf)
+    assert pb.point_count == sum(len(s) for s in data["sections_points"])
+    assert pb.section(2).shape == (0, 2)
+
+
+def test_without_km_and_crc():
+    data = _sample_data()
+    buf = encode_points(data, crc=False, with_km=False)
+    pb = PointsBinary(buf)
+    assert not pb.has_km and pb.section_km(0) is None
+    assert "sections_km" not in pb.to_dict()
+    assert len(encode_points(data, crc=True, with_km=False)) == len(buf) + 4
+
+
+def test_crc_rejects_corruption():
+    buf = bytearray(encode_points(_sample_data()))
+    buf[len(buf) // 2] ^= 0x01
+    try:
+        PointsBinary(bytes(buf))
+    except ValueError as e:
+        assert "CRC" in str(e)
+    else:
+        raise AssertionError("损坏的数据未被 CRC 拒绝")
+    # 关闭校验时照常打开（由调用方自行承担风险）
+    PointsBinary(bytes(buf), verify_crc=False)
+
+
+def test_bad_magic():
+    buf = bytearray(encode_points(_sample_data()))
+    buf[:4] = b"XXXX"
+    try:
+        PointsBinary(bytes(buf))
+    except ValueError as e:
+        assert "magic" in str(e)
+    else:
+        raise AssertionError("magic 不符未被拒绝")
+
+
+def test_varint_zigzag_extremes():
+    v = np.array([0, 1, -1, 63, -64, 64, 127, 128, -129, 2 ** 31 - 1, -2 ** 31, 180 * COORD_SCALE, -180 * COORD_SCALE],
+                 dtype=np.int64)
+    z = zigzag(v)
+    assert (z >= 0).all()
+    assert np.array_equal(unzigzag(z), v)
+    assert np.array_equal(varint_decode(varint_encode(z)), z)
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_without_km_and_crc()
+    test_crc_rejects_corruption()
+    test_bad_magic()
+    test_varint_zigzag_extremes()
+    print("✅ points_binary 全部通过")
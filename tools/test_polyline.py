@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+polyline 自测：Google 文档中的参考向量、precision 6 无损往返、文件级编解码。
+
+用法（在项目根目录）:
+  python3 tools/test_polyline.py
+"""
+import numpy as np
+
+from polyline import decode_file, decode_polyline, encode_file, encode_polyline
+
+# https://developers.google.com/maps/documentation/utilities/polylinealgorithm 的示例（lat, lng）
+REFERENCE_LATLNG = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+REFERENCE_TEXT = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_reference_vector():
+    lnglat = [[lng, lat] for lat, lng in REFERENCE_LATLNG]
+    assert encode_polyline(lnglat, precision=5) == REFERENCE_TEXT
+    assert np.array_equal(decode_polyline(REFERENCE_TEXT, precision=5), lnglat)
+
+
+def test_round_trip_precision6():
+    rng = np.random.default_rng(3)
+    c = np.round(np.array([100.5, 25.0]) + np.cumsum(rng.normal(0, 5e-4, size=(2000, 2)), axis=0), 6)
+    c[100] = [-0.000001, -0.000001]  # 负数与极小值
+    dec = decode_polyline(encode_polyline(c, precision=6), precision=6)
+    assert dec.shape == c.shape
+    assert np.array_equal(np.round(dec, 6), c)
+    assert np.max(np.abs(dec - c)) < 1e-9
+
+
+def test_empty_and_odd():
+    assert encode_polyline([]) == ""
+    assert decode_polyline("").shape == (0, 2)
+    try:
+        decode_polyline("_p~iF")  # 只有纬度、缺经度
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("奇数个数值未被拒绝")
+
+
+def test_file_round_trip():
+    data = {"river_name": "测试河", "sections_points": [[[120.1, 30.2], [120.100001, 30.200002]], [], [[121.0, 31.0]]]}
+    enc = encode_file(data)
+    assert enc["river_name"] == "测试河" and enc["polyline_precision"] == 6
+    assert enc["sections_polyline"][1] == ""
+    assert decode_file(enc) == data
+    raw = {"coordinates": [[120.1, 30.2], [120.3, 30.4]]}
+    assert decode_file(encode_file(raw, precision=5)) == raw
+
+
+if __name__ == "__main__":
+    test_reference_vector()
+    test_round_trip_precision6()
+    test_empty_and_odd()
+    test_file_round_trip()
+    print("✅ polyline 全部通过")
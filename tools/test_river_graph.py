@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+river_graph 自测：端点吸附、断缺桥接、图直径取主干（不纳入支流）、按水流方向定向与拼接。
+用一组手工构造的小河网（约 120°E 30°N，0.01° ≈ 1 km）。
+
+用法（在项目根目录）:
+  python3 tools/test_river_graph.py
+"""
+import numpy as np
+
+from geodesy import line_length
+from river_graph import BRIDGE, RiverGraph, extract_main_stem
+
+A, B, C = [120.00, 30.00], [120.05, 30.00], [120.10, 30.00]
+D = [120.07, 30.01]
+E, F = [120.11, 30.00], [120.16, 30.00]
+
+
+def _line(p, q, n=6):
+    return np.linspace(p, q, n).tolist()
+
+
+def _network(reverse=False):
+    """A→B→C 为主干，D→B 为支流（末端比 B 偏约 1 m），E→F 与 C 之间断开约 1 km；各线按水流方向绘制。"""
+    b_off = [B[0] + 1e-5, B[1]]
+    segments = [_line(A, B), _line(B, C), _line(D, b_off), _line(E, F)]
+    if reverse:
+        segments = [s[::-1] for s in segments]
+    return segments, [line_length(s) for s in segments]
+
+
+def test_snap_and_bridge():
+    segments, lengths = _network()
+    g = RiverGraph(segments, lengths, snap_m=30.0, gap_m=5000.0)
+    assert len(g.nodes) == 6  # A, B(含支流末端), C, D, E, F
+    assert g.end_node[1] == g.end_node[2] == g.end_node[5]
+    assert g.n_bridges == 1
+    assert len(set(g.components())) == 1
+    assert sum(1 for u in range(len(g.nodes)) for _, _, s in g.adj[u] if s == BRIDGE) == 2
+
+
+def test_main_stem_is_diameter():
+    segments, lengths = _network()
+    stem, stats = extract_main_stem(segments, lengths, snap_m=30.0, gap_m=5000.0)
+    assert stats["bridges"] == 1 and stats["path_edges"] == 4
+    assert np.array_equal(stem[0], A) and np.array_equal(stem[-1], F)
+    # 支流 D 不在主干上；B 处的衔接点只出现一次，桥接 C→E 为直连、不增删点
+    assert not (np.abs(stem - D).sum(axis=1) < 1e-9).any()
+    assert len(stem) == sum(len(s) for s in (segments[0], segments[1], segments[3])) - 1
+    gap = line_length([C, E])
+    assert abs(stats["path_km"] * 1000 - (lengths[0] + lengths[1] + gap + lengths[3])) < 1e-6
+
+
+def test_orient_by_flow():
+    segments, lengths = _network(reverse=True)
+    stem, _ = extract_main_stem(segments, lengths, snap_m=30.0, gap_m=5000.0)
+    assert np.array_equal(stem[0], F) and np.array_equal(stem[-1], A)
+
+
+def test_without_bridge_uses_largest_component():
+    segments, lengths = _network()
+    stem, stats = extract_main_stem(segments, lengths, snap_m=30.0, gap_m=0)
+    assert stats["components"] == 2 and stats["bridges"] == 0
+    assert np.array_equal(stem[0], A) and np.array_equal(stem[-1], C)
+
+
+def test_explicit_source_and_mouth():
+    segments, lengths = _network()
+    stem, stats = extract_main_stem(segments, lengths, gap_m=5000.0, source=D, mouth=A)
+    assert stats["path_edges"] == 2
+    assert np.array_equal(stem[0], D) and np.array_equal(stem[-1], A)
+    try:
+        extract_main_stem(segments, lengths, gap_m=0, source=A, mouth=F)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("不连通的源头与入海口未报错")
+
+
+if __name__ == "__main__":
+    test_snap_and_bridge()
+    test_main_stem_is_diameter()
+    test_orient_by_flow()
+    test_without_bridge_uses_largest_component()
+    test_explicit_source_and_mouth()
+    print("✅ river_graph 全部通过")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+simplify 自测：按层向量化的 Douglas–Peucker 与经典递归实现逐点一致，且被删点偏差不超过容差。
+
+用法（在项目根目录）:
+  python3 tools/test_simplify.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from simplify import chord_deviation, douglas_peucker, simplify_file, simplify_line
+
+
+def _dp_recursive(c: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """参考实现：逐区间递归，取最远点（同距离取靠前的点）劈开。"""
+    keep = np.zeros(len(c), dtype=bool)
+    if len(c) == 0:
+        return keep
+    keep[0] = keep[-1] = True
+
+    def split(a, b):
+        if b - a < 2:
+            return
+        p = np.arange(a + 1, b)
+        d = chord_deviation(c, np.full(len(p), a), np.full(len(p), b), p)
+        k = int(np.argmax(d))
+        if d[k] > tolerance_m:
+            m = a + 1 + k
+            keep[m] = True
+            split(a, m)
+            split(m, b)
+
+    split(0, len(c) - 1)
+    return keep
+
+
+def _random_walk(n: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.array([118.0, 32.0]) + np.cumsum(rng.normal(0, 2e-4, size=(n, 2)), axis=0)
+
+
+def test_matches_recursive():
+    for seed in range(5):
+        c = _random_walk(1500, seed)
+        for tol in (0.5, 5.0, 50.0, 500.0):
+            assert np.array_equal(douglas_peucker(c, tol), _dp_recursive(c, tol)), (seed, tol)
+
+
+def test_ties_and_collinear():
+    # 共线点全部删除；对称的锯齿两侧等距时取靠前的点
+    line = np.column_stack([np.linspace(120.0, 120.01, 11), np.full(11, 30.0)])
+    assert douglas_peucker(line, 0.1).tolist() == [True] + [False] * 9 + [True]
+    zigzag = np.array([[120.0, 30.0], [120.001, 30.001], [120.002, 30.0], [120.003, 30.001], [120.004, 30.0]])
+    assert np.array_equal(douglas_peucker(zigzag, 1.0), _dp_recursive(zigzag, 1.0))
+
+
+def test_tolerance_bound():
+    c = _random_walk(3000, 11)
+    for tol in (1.0, 10.0):
+        out, stats = simplify_line(c, tol)
+        assert stats["max_dev_m"] <= tol
+        assert stats["points_out"] == len(out) < stats["points_in"]
+        assert np.array_equal(out[0], c[0]) and np.array_equal(out[-1], c[-1])
+
+
+def test_short_lines():
+    assert douglas_peucker(np.zeros((0, 2)), 1.0).tolist() == []
+    assert douglas_peucker([[120.0, 30.0]], 1.0).tolist() == [True]
+    assert douglas_peucker([[120.0, 30.0], [120.1, 30.1]], 1.0).tolist() == [True, True]
+
+
+def test_file_keeps_km_aligned():
+    # 带 sections_km 的点位文件：里程列按同一掩码删点，逐点仍对应原来的里程
+    sections = [_random_walk(400, 21), _random_walk(1, 22), _random_walk(250, 23)]
+    kms = [np.round(np.linspace(10.0 * i, 10.0 * i + 9.9, len(s)), 3) for i, s in enumerate(sections)]
+    data = {"river_name": "测试河", "correction_coefficient": 1.0,
+            "sections_points": [s.tolist() for s in sections], "sections_km": [k.tolist() for k in kms]}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "test_points.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        out, stats = simplify_file(path, 5.0)
+        assert stats["points_out"] < stats["points_in"]
+        for pts, km, src, src_km in zip(out["sections_points"], out["sections_km"], sections, kms):
+            assert len(pts) == len(km)
+            keep = douglas_peucker(src, 5.0)
+            assert km == src_km[keep].tolist()
+        # 段长不一致的输入：去掉里程列，而不是输出错位的两列
+        data["sections_km"][0] = data["sections_km"][0][:-1]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        out, _ = simplify_file(path, 5.0)
+        assert "sections_km" not in out
+
+
+if __name__ == "__main__":
+    # 参考实现递归深度最坏约为点数
+    sys.setrecursionlimit(10000)
+    test_matches_recursive()
+    test_ties_and_collinear()
+    test_tolerance_bound()
+    test_short_lines()
+    test_file_keeps_km_aligned()
+    print("✅ simplify 全部通过")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+split_state 自测：增量拼接的文本与整体 json.dumps 逐字节相同，只报告边界移动过的段；原始路径或点位文件变了即退回全量。
+边界表写到临时目录，不动 tools/out/split_state。
+
+用法（在项目根目录）:
+  python3 tools/test_split_state.py
+"""
+import contextlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import split_state
+from split_state import encode_points, load_state, save_state
+
+HEADER = {"river_name": "测试河", "correction_coefficient": 1.05}
+
+
+def _columns(coef: float = 1.05):
+    rng = np.random.default_rng(5)
+    pts = np.round(np.array([110.0, 30.0]) + np.cumsum(rng.normal(0, 1e-3, size=(60, 2)), axis=0), 6)
+    km = np.round(np.linspace(0, 12.3, 60) * coef, 3)
+    return [("sections_points", pts, None), ("sections_km", km, coef)]
+
+
+def _full_text(header, columns, ranges) -> str:
+    doc = dict(header)
+    for key, values, _ in columns:
+        doc[key] = [values[r[0]:r[1]].tolist() if r else [] for r in ranges]
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
+
+
+@contextlib.contextmanager
+def _temp_state_dir():
+    """边界表与点位文件都放进临时目录，结束后恢复 STATE_DIR。"""
+    old = split_state.STATE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        split_state.STATE_DIR = os.path.join(tmp, "state")
+        try:
+            yield tmp
+        finally:
+            split_state.STATE_DIR = old
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def test_incremental():
+    with _temp_state_dir() as tmp:
+        points_path = os.path.join(tmp, "test_points.json")
+        columns = _columns()
+        ranges = [(0, 20), (19, 40), None, (39, 60)]
+
+        text, col_states, changed = encode_points(HEADER, columns, ranges, None, points_path)
+        assert text == _full_text(HEADER, columns, ranges)
+        assert changed == [0, 1, 2, 3]
+        _write(points_path, text)
+        save_state(points_path, "raw-1", text, col_states)
+
+        # 什么都没变：逐字节相同、无变更段
+        state = load_state(points_path, "raw-1")
+        assert state is not None
+        text2, _, changed = encode_points(HEADER, columns, ranges, state, points_path)
+        assert text2 == text and changed == []
+
+        # 只移动第 1、3 段之间的边界
+        moved = [(0, 20), (19, 45), None, (44, 60)]
+        text3, col_states3, changed = encode_points(HEADER, columns, moved, state, points_path)
+        assert text3 == _full_text(HEADER, columns, moved)
+        assert changed == [1, 3]
+
+        # 里程列的 tag（修正系数）变了：该列整列重编码
+        text4, _, changed = encode_points(HEADER, _columns(1.10), ranges, state, points_path)
+        assert text4 == _full_text(HEADER, _columns(1.10), ranges)
+        assert changed == [0, 1, 2, 3]
+
+        # 段数减少：多出的旧段也算变更
+        _, _, changed = encode_points(HEADER, columns, ranges[:2], state, points_path)
+        assert changed == [2, 3]
+
+
+def test_invalidation():
+    with _temp_state_dir() as tmp:
+        points_path = os.path.join(tmp, "test_points.json")
+        columns = _columns()
+        ranges = [(0, 30), (29, 60)]
+        text, col_states, _ = encode_points(HEADER, columns, ranges, None, points_path)
+        _write(points_path, text)
+        save_state(points_path, "raw-1", text, col_states, shard_signatures=["a", "b"])
+        assert load_state(points_path, "raw-1")["shards"] == ["a", "b"]
+        # 原始路径变了
+        assert load_state(points_path, "raw-2") is None
+        # 点位文件被其他方式改过
+        _write(points_path, text.replace("测试河", "别的河"))
+        assert load_state(points_path, "raw-1") is None
+        # 点位文件不存在
+        os.remove(points_path)
+        assert load_state(points_path, "raw-1") is None
+
+
+if __name__ == "__main__":
+    test_incremental()
+    test_invalidation()
+    print("✅ split_state 全部通过")
@@ -10,10 +10,10 @@ import json
 import sqlite3
 import time
 import urllib.parse
-import urllib.request
 import hashlib
 import random
-import ssl
+
+from http_client import add_http_args, configure_from_args, get_client
 
 # 与你脚本一致的中国坐标范围（核心判断海外）
 CHINA_LON_MIN = 73.66
@@ -78,10 +78,8 @@ def translate_baidu(text, api_key, secret_key):
             f"https://fanyi-api.baidu.com/api/trans/vip/translate"
             f"?q={urllib.parse.quote(text)}&from=en&to=zh&appid={api_key}&salt={salt}&sign={sign}"
         )
-        req = urllib.request.Request(url, headers={"User-Agent": "RivtrekPOI/1.0"})
-        ctx = ssl._create_unverified_context()
-        with urllib.request.urlopen(req, timeout=10, context=ctx) as resp:
-            data = json.loads(resp.read().decode())
+        # 共享客户端：证书按 certifi 校验，连接复用（原先每次新建未验证的 SSL 上下文）
+        data = get_client().get_json(url)
         if "trans_result" in data and len(data["trans_result"]) > 0:
             return data["trans_result"][0]["dst"]
     except Exception as e:
@@ -113,7 +111,9 @@ def main():
     parser.add_argument("--baidu-key", default="", help="百度翻译API Key")
     parser.add_argument("--baidu-secret", default="", help="百度翻译Secret Key")
     parser.add_argument("--delay", type=float, default=0.3, help="翻译请求间隔（秒）")
+    add_http_args(parser, default_timeout=10)
     args = parser.parse_args()
+    client = configure_from_args(args, default_pool_size=1)
 
     # 校验百度翻译参数
     if args.use_baidu and (not args.baidu_key or not args.baidu_secret):
@@ -192,6 +192,8 @@ def main():
     conn.commit()
     conn.close()
     print(f"\n翻译完成！共翻译 {translated_count} 条海外英文记录")
+    if args.use_baidu:
+        print(client.format_stats())
     print(f"验证方法：sqlite3 {args.db} \"SELECT distance_km, formatted_address FROM river_pois WHERE river_id='{args.river}' AND latitude={lat} LIMIT 1;\"")
 
 if __name__ == "__main__":
@@ -13,6 +13,9 @@ DB 的 distance_km 与 fetch_river_pois 写入一致，为挑战累计里程；
   2. before = 查 numeric_id = ? AND distance_km <= path_km，ORDER BY distance_km DESC，limit 1
   3. after  = 查 numeric_id = ? AND distance_km >= path_km，ORDER BY distance_km ASC，limit 1
   4. 若 before 空则返回 after（或 null）；若 after 空则返回 before；否则取离 path_km 更近的一条
+
+另按当前点位（river_store 只读打开，不写 store）给出 path_km 处的河道点，并报告所选 POI 行与它的距离，
+距离异常大说明 DB 与现行几何 / 里程不一致，需要重新打库。
 """
 
 import argparse
@@ -21,6 +24,12 @@ import os
 import sys
 import sqlite3
 
+import numpy as np
+
+from fetch_river_pois import load_master_section_lengths, resolve_config_path
+from geodesy import haversine
+from river_store import load_points
+
 
 def _first_poi_name(pois_json_str: str | None) -> str:
     """从 pois_json 取第一个 POI 的 name，供输出预览。"""
@@ -70,6 +79,23 @@ def resolve_river(rivers: list, river_arg: str) -> dict | None:
         return None
 
 
+def load_river_km(river_cfg: dict):
+    """(store, 每点累计挑战里程)；点位或 master 文件缺失时返回 (None, None)。"""
+    points_path = resolve_config_path(river_cfg.get("points_json_path") or "")
+    master_path = resolve_config_path(river_cfg.get("master_json_path") or "")
+    if not (os.path.isfile(points_path) and os.path.isfile(master_path)):
+        return None, None
+    store = load_points(points_path)
+    return store, store.distance_km(load_master_section_lengths(master_path))
+
+
+def river_point_at_km(store, km: np.ndarray, path_km: float) -> tuple[float, float]:
+    """path_km 处的河道点 (lat, lng)：逐点里程上二分，取第一个不小于 path_km 的点。"""
+    i = min(int(np.searchsorted(km, path_km)), len(km) - 1)
+    lng, lat = store.coords[i]
+    return float(lat), float(lng)
+
+
 def main():
     parser = argparse.ArgumentParser(description="验证 getNearestPoi 查库逻辑")
     parser.add_argument("--db", default=None, help="rivtrek_base.db 路径（默认 assets/db 或 tools/out）")
@@ -120,6 +146,9 @@ def main():
         conn.close()
         raise SystemExit(1)
     print(f"river_pois 范围: distance_km ∈ [{row['lo']}, {row['hi']}], 共 {row['n']} 条", flush=True)
+    store, river_km = load_river_km(river_cfg)
+    if store is None:
+        print("（未找到点位 / master 文件，不核对河道位置）", flush=True)
     print(flush=True)
 
     cols = [r[1] for r in conn.execute("PRAGMA table_info(river_pois)").fetchall()]
@@ -162,6 +191,10 @@ def main():
         poi_name = _first_poi_name(pois_json)
         poi_suffix = f"  POI: {poi_name}" if poi_name else ""
         print(f"  accumulated_km={acc_km:.1f}  path_km={path_km:.2f}  -> distance_km={dist} ({side})  {addr_preview}{poi_suffix}", flush=True)
+        if store is not None:
+            lat, lng = river_point_at_km(store, river_km, path_km)
+            off_km = float(haversine(lng, lat, chosen["longitude"], chosen["latitude"])) / 1000.0
+            print(f"      河道点 ({lat:.6f}, {lng:.6f})，与该 POI 行相距 {off_km:.2f} km", flush=True)
     conn.close()
     print(flush=True)
     print("若 0 有结果、大里程无结果，常见原因：", flush=True)
@@ -2,7 +2,13 @@ import json
 import os
 import argparse
 
-def visualize_result(river_base):
+import numpy as np
+
+from polyline import JS_DECODER, encode_polyline
+from river_lod import load_lod_sections
+from river_store import load_points
+
+def visualize_result(river_base, lod_m=None, polyline=False):
     master_path = f'assets/json/rivers/{river_base}_master.json'
     points_path = f'assets/json/rivers/{river_base}_points.json'
     
@@ -12,13 +18,24 @@ def visualize_result(river_base):
 
     with open(master_path, 'r', encoding='utf-8') as f:
         master = json.load(f)
-    with open(points_path, 'r', encoding='utf-8') as f:
-        points_data = json.load(f)
 
     print(f"📈 正在生成 {river_base} 的合并结果验证页面...")
 
-    # 提取所有子路段点位
-    sections_points = points_data['sections_points']
+    # 提取所有子路段点位；指定 lod_m 时先取 LOD 金字塔中匹配的一级，找到时不打开全量 50 m 点位
+    lod_sections = None
+    if lod_m:
+        lod_sections, level = load_lod_sections(river_base, lod_m)
+        if lod_sections is None:
+            print(f"⚠️ 未找到 LOD 文件或没有不超过 {lod_m:g} m 的级别，改用全量点位（可先运行 tools/river_lod.py {river_base}）")
+    if lod_sections is not None:
+        sections_points = lod_sections
+        header = {}  # LOD 文件的头字段取自点位文件（river_name / correction_coefficient），本就没有 total_km
+        print(f"🗺️ 使用 LOD {level['resolution_m']} m 级，{level['points']} 点")
+    else:
+        # 点位经 river_store 只读打开（不构建、不改写 store），各段为数组视图
+        store = load_points(points_path)
+        sections_points = list(store.sections())
+        header = store.header
     
     html_template = f"""
     <!DOCTYPE html>
@@ -36,7 +53,7 @@ def visualize_result(river_base):
         <div class="info-panel">
             <h3>{master['game_challenge_name']}</h3>
             <p><b>总里程 (业务):</b> {master['total_length_km']} km</p>
-            <p><b>实际里程 (路径):</b> {points_data.get('total_km', 'N/A')} km</p>
+            <p><b>实际里程 (路径):</b> {header.get('total_km', 'N/A')} km</p>
             <p><b>修正系数:</b> {master.get('correction_coefficient', 'N/A')}</p>
             <hr>
             <div id="section-list"></div>
@@ -49,6 +66,9 @@ def visualize_result(river_base):
             var colors = ['#e6194b', '#3cb44b', '#ffe119', '#4363d8', '#f58231', '#911eb4', '#46f0f0', '#f032e6', '#bcf60c', '#fabebe', '#008080', '#e6beff', '#9a6324', '#fffac8', '#800000', '#aaffc3', '#808000', '#ffd8b1', '#000075', '#808080'];
             var bounds = [];
     """
+    if polyline:
+        # 坐标以 Encoded Polyline 字符串内嵌（约为 JSON 数组的 1/5），页面加载时在浏览器端解码
+        html_template += JS_DECODER
 
     # 展平业务段名称
     all_sub_names = []
@@ -57,8 +77,8 @@ def visualize_result(river_base):
             all_sub_names.append(sub['sub_section_name'])
 
     for i, pts in enumerate(sections_points):
-        if not pts: continue
-        latlngs = [[p[1], p[0]] for p in pts]
+        if len(pts) == 0: continue
+        latlngs = f"decodePolyline({json.dumps(encode_polyline(pts))}, 6)" if polyline else np.asarray(pts)[:, ::-1].tolist()
         name = all_sub_names[i] if i < len(all_sub_names) else f"段 {i}"
         html_template += f"""
             var line_{i} = L.polyline({latlngs}, {{color: colors[{i} % colors.length], weight: 5}})
@@ -87,5 +107,7 @@ def visualize_result(river_base):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('river_base', help='河流基础名，如 songhua_river')
+    parser.add_argument('--lod-m', type=float, default=None, help='使用 LOD 金字塔中分辨率不超过该值(米)的一级')
+    parser.add_argument('--polyline', action='store_true', help='坐标以 Encoded Polyline 内嵌，页面体积约为原来的 1/5')
     args = parser.parse_args()
-    visualize_result(args.river_base)
+    visualize_result(args.river_base, args.lod_m, args.polyline)
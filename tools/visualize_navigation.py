@@ -2,6 +2,8 @@ import json
 import webbrowser
 import os
 
+from river_store import load_points
+
 # 路径定义
 CONFIG_PATH = 'assets/json/rivers/yangtze_master.json'
 POINTS_PATH = 'assets/json/rivers/yangtze_points.json'
@@ -14,8 +16,8 @@ def generate():
 
     with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
         config = json.load(f)
-    with open(POINTS_PATH, 'r', encoding='utf-8') as f:
-        points_data = json.load(f)
+    # 点位经 river_store 只读打开（不构建 store），按段取切片
+    store = load_points(POINTS_PATH)
 
     # 准备给 JS 使用的数据
     # 将业务信息和坐标合并到一个对象中
@@ -28,7 +30,7 @@ def generate():
             "name": s['section_name'],
             "start_km": start_km,
             "end_km": start_km + length,
-            "coords": [[p[1], p[0]] for p in points_data['sections_points'][i]] # [lat, lng]
+            "coords": store.section(i)[:, ::-1].tolist() # [lat, lng]
         })
         start_km += length
 
@@ -1,18 +1,15 @@
 import json
 import os
-import glob
 import argparse
 import random
 
-def generate_map(pattern, output_html="river_inspection.html"):
+from geojson_stream import find_source_files
+from segment_cache import load_segment_set
+
+def generate_map(pattern, output_html="river_inspection.html", use_cache=True):
     print(f"🔍 正在搜集原始数据: {pattern}")
     
-    files = []
-    for p in pattern.split('|'):
-        glob_p = p if '*' in p or '?' in p else f"{p}*"
-        files.extend(glob.glob(f"tools/{glob_p}.geojson"))
-        files.extend(glob.glob(f"tools/{glob_p}.json"))
-    files = sorted(list(set(files)))
+    files = find_source_files(pattern)
 
     if not files:
         print("⚠️ 未找到匹配的文件")
@@ -39,32 +36,20 @@ def generate_map(pattern, output_html="river_inspection.html"):
     """
 
     for f_path in files:
-        if '_raw_path_' in f_path or '_points' in f_path: continue
-        with open(f_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            segs = []
-            # 兼容多种格式
-            if isinstance(data, dict) and 'coordinates' in data:
-                segs = data['coordinates']
-            elif isinstance(data, dict) and 'features' in data:
-                for feat in data['features']:
-                    if feat['geometry']['type'] == 'LineString':
-                        segs.append(feat['geometry']['coordinates'])
-            
-            if not segs: continue
-            
-            color = "colors[colorIdx % colors.length]"
-            filename = os.path.basename(f_path)
-            
-            # 将经纬度转换并添加到地图
-            for i, seg in enumerate(segs):
-                # Leaflet 需要 [lat, lng]
-                latlngs = [[p[1], p[0]] for p in seg]
-                html_template += f"""
+        color = "colors[colorIdx % colors.length]"
+        filename = os.path.basename(f_path)
+        n_segs = 0
+        # 兼容 FeatureCollection / MultiLineString / GeoJSONSeq 等格式，源文件未变时直接读解析缓存
+        for i, seg in enumerate(load_segment_set(f_path, use_cache=use_cache)):
+            # Leaflet 需要 [lat, lng]
+            latlngs = seg[:, ::-1].tolist()
+            html_template += f"""
                 L.polyline({latlngs}, {{color: {color}, weight: 3}})
                     .addTo(map)
                     .bindPopup("<b>文件:</b> {filename}<br><b>段索引:</b> {i}<br><b>点数:</b> {len(seg)}");
                 """
+            n_segs += 1
+        if n_segs:
             html_template += "colorIdx++;\n"
 
     html_template += """
@@ -82,5 +67,6 @@ def generate_map(pattern, output_html="river_inspection.html"):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('pattern', help='匹配模式，如 "松花江"')
+    parser.add_argument('--no-cache', action='store_true', help='不读写线段解析缓存')
     args = parser.parse_args()
-    generate_map(args.pattern)
+    generate_map(args.pattern, use_cache=not args.no_cache)
@@ -3,30 +3,30 @@
 import json
 import os
 import argparse
-from pyproj import Geod
 
-ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+import numpy as np
 
+from geodesy import cumulative_distance
+from river_lod import load_lod_sections
+from river_store import load_points
 
-def geod_dist_km(p1, p2):
-    """两点 [lng, lat] 的球面距离，单位 km。"""
-    geod = Geod(ellps="WGS84")
-    _, _, d = geod.inv(p1[0], p1[1], p2[0], p2[1])
-    return d / 1000.0
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 def sample_by_spacing_km(all_points, spacing_km):
-    """按累计里程每隔 spacing_km 取一个点。all_points: [[lng,lat], ...]。"""
-    if not all_points or spacing_km <= 0:
-        return list(all_points) if all_points else []
-    out = [all_points[0]]
-    acc_km = 0.0
-    for i in range(1, len(all_points)):
-        acc_km += geod_dist_km(all_points[i - 1], all_points[i])
-        if acc_km >= spacing_km:
-            out.append(all_points[i])
-            acc_km = 0.0
-    if all_points and out[-1] != all_points[-1]:
+    """按累计里程每隔 spacing_km 取一个点。all_points: [[lng,lat], ...] 或 (N, 2) 数组。
+    累计里程一次批量算出，再用 searchsorted 逐个跳到「距上一个取点 ≥ spacing_km」的顶点。"""
+    if len(all_points) == 0 or spacing_km <= 0:
+        return list(all_points)
+    cum_km = cumulative_distance(all_points) / 1000.0
+    picked = [0]
+    while True:
+        i = int(np.searchsorted(cum_km, cum_km[picked[-1]] + spacing_km, side="left"))
+        if i >= len(all_points):
+            break
+        picked.append(max(i, picked[-1] + 1))
+    out = [all_points[i] for i in picked]
+    if tuple(out[-1]) != tuple(all_points[-1]):
         out.append(all_points[-1])
     return out
 
@@ -79,9 +79,10 @@ def make_projector(lng_min, lng_max, lat_min, lat_max, width, height, padding=20
     return project
 
 
-def generate_svg(river_base, spacing_km=30, stroke_width=16, width=1200, height=800, output_path=None, padding=20, segmented=True):
+def generate_svg(river_base, spacing_km=30, stroke_width=16, width=1200, height=800, output_path=None, padding=20, segmented=True, lod=False):
     """
     segmented: True=分段多色绘制（每 sub_section 一色），False=一条完整线路单色绘制。
+    lod: 从 LOD 金字塔中取分辨率不超过采样间距的最粗一级，代替全量 50 m 点（需先运行 river_lod.py）。
     """
     master_path = os.path.join(ROOT, "assets", "json", "rivers", river_base + "_master.json")
     points_path = os.path.join(ROOT, "assets", "json", "rivers", river_base + "_points.json")
@@ -90,19 +91,26 @@ def generate_svg(river_base, spacing_km=30, stroke_width=16, width=1200, height=
         return
     with open(master_path, "r", encoding="utf-8") as f:
         master = json.load(f)
-    with open(points_path, "r", encoding="utf-8") as f:
-        points_data = json.load(f)
-    sections_points = points_data["sections_points"]
-    all_points = []
-    for pts in sections_points:
-        all_points.extend(pts)
-    if not all_points:
+    # 先取 LOD：找到时完全不打开全量点位
+    lod_sections = None
+    if lod:
+        lod_sections, level = load_lod_sections(river_base, spacing_km * 1000)
+        if lod_sections is None:
+            print("未找到 LOD 文件或没有足够细的级别，改用全量点位（可先运行 tools/river_lod.py %s）" % river_base)
+    if lod_sections is not None:
+        sections_points = [np.asarray(pts, dtype=np.float64).reshape(-1, 2) for pts in lod_sections]
+        all_points = np.concatenate(sections_points) if sections_points else np.zeros((0, 2))
+        print("使用 LOD %s m 级，%d 点" % (level["resolution_m"], level["points"]))
+    else:
+        # 点位经 river_store 只读打开（不构建、不改写 store），各段为数组视图
+        store = load_points(points_path)
+        sections_points = list(store.sections())
+        all_points = store.coords
+    if len(all_points) == 0:
         print("无坐标点")
         return
-    lng_min = min(p[0] for p in all_points)
-    lng_max = max(p[0] for p in all_points)
-    lat_min = min(p[1] for p in all_points)
-    lat_max = max(p[1] for p in all_points)
+    lng_min, lat_min = (float(v) for v in all_points.min(axis=0))
+    lng_max, lat_max = (float(v) for v in all_points.max(axis=0))
     project = make_projector(lng_min, lng_max, lat_min, lat_max, width, height, padding)
 
     path_elements = []
@@ -111,7 +119,7 @@ def generate_svg(river_base, spacing_km=30, stroke_width=16, width=1200, height=
     if segmented:
         # 分段多色：每段一条 path，按 SECTION_COLORS 循环
         for i, pts in enumerate(sections_points):
-            if not pts:
+            if len(pts) == 0:
                 continue
             sampled = sample_by_spacing_km(pts, spacing_km)
             total_sampled += len(sampled)
@@ -162,6 +170,7 @@ def main():
     parser.add_argument("-o", "--output", help="输出 SVG 路径")
     parser.add_argument("--unified", action="store_true",
                        help="一条完整线路单色绘制；不传则分段多色绘制")
+    parser.add_argument("--lod", action="store_true", help="从 LOD 金字塔取与采样间距匹配的一级，不读全量点位")
     args = parser.parse_args()
     generate_svg(
         args.river_base,
@@ -171,6 +180,7 @@ def main():
         height=args.height,
         output_path=args.output,
         segmented=not args.unified,
+        lod=args.lod,
     )
 
 